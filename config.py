@@ -3,6 +3,12 @@ import sys
 
 # Global variable to store the result
 _INSPECT_QUERY = False
+_FAST_NLP = False
+_EMBEDDER = "gemini"
+_LLM_CACHE = True
+_LLM_BATCH = False
+_LLM_SUMMARIES = False
+_TELEMETRY_DIR = None
 
 def inspect_query() -> bool:
     """
@@ -11,15 +17,71 @@ def inspect_query() -> bool:
     global _INSPECT_QUERY
     return _INSPECT_QUERY
 
+def fast_nlp() -> bool:
+    """
+    Returns whether spaCy pipelines use the rule-based sentencizer instead of the trained model.
+    """
+    global _FAST_NLP
+    return _FAST_NLP
+
+def embedder_name() -> str:
+    """
+    Returns the text embedder selected on the command line: gemini, hashing or sentence-transformers.
+    """
+    global _EMBEDDER
+    return _EMBEDDER
+
+def llm_cache_enabled() -> bool:
+    """
+    Returns whether LLM responses are served from the persistent response cache.
+    """
+    global _LLM_CACHE
+    return _LLM_CACHE
+
+def llm_batch_enabled() -> bool:
+    """
+    Returns whether non-interactive LLM work (graph summaries asked for with --llm-summaries, feature
+    backfills) is sent as batch jobs.
+    """
+    global _LLM_BATCH
+    return _LLM_BATCH
+
+def llm_summaries_enabled() -> bool:
+    """
+    Returns whether the knowledge graph's entity, relationship and community descriptions are
+    summarized by the LLM instead of joined.
+    """
+    global _LLM_SUMMARIES
+    return _LLM_SUMMARIES
+
+def telemetry_dir():
+    """
+    Returns the directory LLM and embedding call telemetry is exported to, None when not exported.
+    """
+    global _TELEMETRY_DIR
+    return _TELEMETRY_DIR
+
 def _parse_args():
-    global _INSPECT_QUERY
+    global _INSPECT_QUERY, _FAST_NLP, _EMBEDDER, _LLM_CACHE, _LLM_BATCH, _LLM_SUMMARIES, _TELEMETRY_DIR
 
     parser = argparse.ArgumentParser(add_help=False)
     parser.add_argument('-i', '--inspect-query', action='store_true', help='Enable query inspection mode.')
+    parser.add_argument('--fast-nlp', action='store_true', help='Use the rule-based sentencizer instead of the spaCy model.')
+    parser.add_argument('--embedder', choices=['gemini', 'hashing', 'sentence-transformers'], default='gemini', help='Text embedder to use, the local ones need no network.')
+    parser.add_argument('--no-llm-cache', action='store_true', help='Send every LLM request to the provider instead of replaying cached responses.')
+    parser.add_argument('--llm-batch', action='store_true', help='Send non-interactive LLM work as batch jobs, slower to answer but cheaper.')
+    parser.add_argument('--llm-summaries', action='store_true', help='Summarize knowledge graph descriptions with the LLM instead of joining them.')
+    parser.add_argument('--telemetry-dir', default=None, help='Directory to write every LLM and embedding call (calls.jsonl) and their totals (totals.jsonl, metrics.prom) to.')
 
     # Parse only known args to avoid interfering with other modules
     args, _ = parser.parse_known_args(sys.argv[1:])
     _INSPECT_QUERY = args.inspect_query
+    _FAST_NLP = args.fast_nlp
+    _EMBEDDER = args.embedder
+    _LLM_CACHE = not args.no_llm_cache
+    _LLM_BATCH = args.llm_batch
+    _LLM_SUMMARIES = args.llm_summaries
+    _TELEMETRY_DIR = args.telemetry_dir
 
 # Run argument parsing once at import time
 _parse_args()
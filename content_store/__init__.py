@@ -0,0 +1,5 @@
+from .file_content_store import FileContentStore
+
+__all__ = [
+    "FileContentStore"
+]
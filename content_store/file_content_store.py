@@ -0,0 +1,110 @@
+import hashlib
+import os
+import tempfile
+from collections import OrderedDict
+from threading import Lock
+from typing import Iterable, Iterator
+
+from entities.document import content_hash
+from entities.interfaces import ContentStore, iter_blocks
+
+
+class FileContentStore(ContentStore):
+    """
+    Content-addressed store that keeps each content string in its own file, named after
+    the sha256 of the text, and serves reads through a size-bounded LRU cache.
+    Streamed reads go through the files a block at a time and bypass the cache.
+    """
+
+    shareable = True
+
+    def __init__(self, root: str, max_cached_chars: int = 64 * 1024 * 1024):
+        """
+        Args:
+            root: Directory where the content files are kept.
+            max_cached_chars: Upper bound, in characters, for the contents kept in memory.
+        """
+        self.root = root
+        self.max_cached_chars = max_cached_chars
+        self._cache: "OrderedDict[str, str]" = OrderedDict()
+        self._cached_chars = 0
+        self._lock = Lock()
+        os.makedirs(root, exist_ok=True)
+
+    def put(self, content: str) -> str:
+        handle = content_hash(content)
+        path = self._path(handle)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Write to a temporary file first so readers never see partial contents
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(content)
+            os.replace(tmp_path, path)
+        return handle
+
+    def put_stream(self, pieces: Iterable[str]) -> str:
+        # Hash while writing, the content is only named after its hash once complete
+        os.makedirs(self.root, exist_ok=True)
+        digest = hashlib.sha256()
+        fd, tmp_path = tempfile.mkstemp(dir=self.root)
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                for piece in pieces:
+                    digest.update(piece.encode("utf-8"))
+                    f.write(piece)
+            handle = digest.hexdigest()
+            path = self._path(handle)
+            if os.path.exists(path):
+                os.remove(tmp_path)
+            else:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        return handle
+
+    def get(self, handle: str) -> str:
+        with self._lock:
+            if handle in self._cache:
+                self._cache.move_to_end(handle)
+                return self._cache[handle]
+
+        with open(self._path(handle), "r", encoding="utf-8") as f:
+            content = f.read()
+
+        self._remember(handle, content)
+        return content
+
+    def iter_content(self, handle: str) -> Iterator[str]:
+        with self._lock:
+            cached = self._cache.get(handle)
+        if cached is not None:
+            yield from iter_blocks(cached, self.BLOCK_CHARS)
+            return
+
+        with open(self._path(handle), "r", encoding="utf-8") as f:
+            while block := f.read(self.BLOCK_CHARS):
+                yield block
+
+    def __reduce__(self):
+        # Worker processes get a store over the same files, with a cache of their own
+        return type(self), (self.root, self.max_cached_chars)
+
+    def _remember(self, handle: str, content: str) -> None:
+        size = len(content)
+        if size > self.max_cached_chars:
+            return
+        with self._lock:
+            if handle in self._cache:
+                return
+            self._cache[handle] = content
+            self._cached_chars += size
+            while self._cached_chars > self.max_cached_chars:
+                _, evicted = self._cache.popitem(last=False)
+                self._cached_chars -= len(evicted)
+
+    def _path(self, handle: str) -> str:
+        return os.path.join(self.root, handle[:2], handle[2:] + ".txt")
@@ -1,22 +1,18 @@
-import random
-import time
 import re
 import xml.etree.ElementTree as ET
-from io import BytesIO
 from typing import Set, Dict, Any
-import requests
-from PyPDF2 import PdfReader
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from controller.interfaces.doc_recoverer import DocRecoverer
 from entities.document import Document
-from doc_recoverers.doc_utils.doc_cleaner import DocumentContentCleaner
+from doc_recoverers.doc_utils.pdf_content import PdfContentExtractor
+from doc_recoverers.doc_utils.http import get_with_retry
+from resilience import RetryPolicy, circuit_breaker
 
 
 class ArXivRecoverer(DocRecoverer):
-    BACKOFF_MIN = 3.0
-    BACKOFF_MAX = 5.0
     TIMEOUT = 15
-    MAX_RETRIES = 100
+    # arXiv asks for 3 seconds between requests
+    RETRY_POLICY = RetryPolicy(max_attempts=8, base_delay=6.0, max_delay=60.0, deadline=300.0, circuit_breaker=circuit_breaker("export.arxiv.org"))
     BASE_SEARCH_URL = "http://export.arxiv.org/api/query"
     PDF_THREADS = 20
 
@@ -55,13 +51,9 @@ class ArXivRecoverer(DocRecoverer):
 
     def _process_entry(self, entry: Dict[str, Any]) -> Document | None:
         try:
-            resp = requests.get(entry["pdf_url"], timeout=self.TIMEOUT)
-            resp.raise_for_status()
-            reader = PdfReader(BytesIO(resp.content))
-            raw = "\n".join(page.extract_text() or "" for page in reader.pages)
-            content = DocumentContentCleaner.clean_document(raw)
+            content_handle = PdfContentExtractor.store_pdf(entry["pdf_url"], timeout=self.TIMEOUT)
 
-            if not content:
+            if not content_handle:
                 return None
 
             return Document(
@@ -69,7 +61,7 @@ class ArXivRecoverer(DocRecoverer):
                 title=entry["title"],
                 abstract=entry["summary"],
                 authors=entry["authors"],
-                content=content
+                content_handle=content_handle
             )
         except Exception:
             return None
@@ -92,24 +84,10 @@ class ArXivRecoverer(DocRecoverer):
             "sortOrder": "descending"
         }
 
-        for attempt in range(self.MAX_RETRIES):
-            try:
-                resp = requests.get(self.BASE_SEARCH_URL, params=params, timeout=self.TIMEOUT)
-                if resp.status_code in {429, 503, 301}:
-                    sleep_time = self._get_sleep_time(resp)
-                    time.sleep(sleep_time)
-                    continue
-                resp.raise_for_status()
-                return self._parse_response(resp.content)
-            except requests.HTTPError as e:
-                if e.response.status_code in {429, 503, 301}:
-                    sleep_time = self._get_sleep_time(e.response)
-                    time.sleep(sleep_time)
-                else:
-                    return []
-            except requests.RequestException:
-                time.sleep(random.uniform(self.BACKOFF_MIN, self.BACKOFF_MAX))
-        return []
+        resp = get_with_retry(self.BASE_SEARCH_URL, self.RETRY_POLICY, params=params, timeout=self.TIMEOUT)
+        if resp is None:
+            return []
+        return self._parse_response(resp.content)
 
     def _parse_response(self, xml_content: bytes) -> list[Dict[str, Any]]:
         """Parse arXiv API response XML into document metadata.
@@ -141,15 +119,6 @@ class ArXivRecoverer(DocRecoverer):
 
         return entries
 
-    def _get_sleep_time(self, response) -> float:
-        retry_after = response.headers.get('Retry-After')
-        if retry_after:
-            try:
-                return float(retry_after) + random.uniform(0.1, 0.5)
-            except ValueError:
-                pass
-        return random.uniform(self.BACKOFF_MIN, self.BACKOFF_MAX)
-
     @staticmethod
     def _extract_arxiv_id(url: str) -> str:
         """Extract arXiv ID from URL.
@@ -0,0 +1,29 @@
+from typing import Optional
+
+import requests
+
+from resilience import CircuitOpenError, RetryPolicy
+
+
+def get_with_retry(url: str, policy: RetryPolicy, **kwargs) -> Optional[requests.Response]:
+    """
+    GET a URL, retrying throttled, unavailable and unreachable responses as the policy allows.
+
+    Args:
+        url: URL to request.
+        policy: Retry policy of the endpoint, with its circuit breaker.
+        **kwargs: Arguments of `requests.get`, e.g. params and timeout.
+
+    Returns:
+        The successful response, or None when the request failed for good, was not retryable
+        or the endpoint's circuit is open.
+    """
+    def request() -> requests.Response:
+        resp = requests.get(url, **kwargs)
+        resp.raise_for_status()
+        return resp
+
+    try:
+        return policy.call(request)
+    except (requests.RequestException, CircuitOpenError):
+        return None
@@ -0,0 +1,82 @@
+import tempfile
+from typing import IO, Iterator, Optional
+
+import requests
+from PyPDF2 import PdfReader
+
+from doc_recoverers.doc_utils.doc_cleaner import DocumentContentCleaner
+from entities.document import get_content_store
+
+
+class PdfContentExtractor:
+    """Stream PDF text page by page from the download into the content store."""
+
+    # PDFs up to this size are downloaded to memory, larger ones spill to a temporary file
+    SPOOL_BYTES = 8 * 1024 * 1024
+    PAGE_SEPARATOR = " "
+
+    @classmethod
+    def download(cls, url: str, timeout: float) -> IO[bytes]:
+        """Download a PDF into a seekable, size-bounded buffer.
+
+        Args:
+            url: PDF download URL
+            timeout: Request timeout in seconds
+
+        Returns:
+            Binary file object positioned at the start of the PDF
+        """
+        pdf_file = tempfile.SpooledTemporaryFile(max_size=cls.SPOOL_BYTES)
+        with requests.get(url, timeout=timeout, stream=True) as resp:
+            resp.raise_for_status()
+            for block in resp.iter_content(chunk_size=64 * 1024):
+                pdf_file.write(block)
+        pdf_file.seek(0)
+        return pdf_file
+
+    @staticmethod
+    def iter_clean_pages(pdf_file: IO[bytes]) -> Iterator[str]:
+        """Extract and clean the text of each page, skipping pages without text.
+
+        Args:
+            pdf_file: Binary file object with the PDF
+
+        Yields:
+            Cleaned text of each page
+        """
+        reader = PdfReader(pdf_file)
+        for page in reader.pages:
+            cleaned = DocumentContentCleaner.clean_document(page.extract_text() or "")
+            if cleaned:
+                yield cleaned
+
+    @classmethod
+    def iter_content(cls, pdf_file: IO[bytes]) -> Iterator[str]:
+        """Cleaned pages with their separators, the concatenation is the document content."""
+        for i, page in enumerate(cls.iter_clean_pages(pdf_file)):
+            if i:
+                yield cls.PAGE_SEPARATOR
+            yield page
+
+    @classmethod
+    def store_pdf(cls, url: str, timeout: float) -> Optional[str]:
+        """Download a PDF and stream its cleaned text into the content store, one page at a time.
+
+        Args:
+            url: PDF download URL
+            timeout: Request timeout in seconds
+
+        Returns:
+            Content handle of the text, or None if the PDF has no text after cleaning
+        """
+        with cls.download(url, timeout) as pdf_file:
+            pieces = cls.iter_content(pdf_file)
+            first = next(pieces, None)
+            if first is None:
+                return None
+
+            def content():
+                yield first
+                yield from pieces
+
+            return get_content_store().put_stream(content())
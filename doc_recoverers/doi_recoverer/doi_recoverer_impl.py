@@ -1,11 +1,9 @@
 from typing import Set
 import requests
 import xml.etree.ElementTree as ET
-from io import BytesIO
-from PyPDF2 import PdfReader
 from controller.interfaces.doc_recoverer import DocRecoverer
 from entities.document import Document
-from doc_recoverers.doc_utils.doc_cleaner import DocumentContentCleaner
+from doc_recoverers.doc_utils.pdf_content import PdfContentExtractor
 
 CROSSREF_API = "https://api.crossref.org/works/"
 
@@ -47,14 +45,9 @@ class DOIRecoverer(DocRecoverer):
             )
             head.raise_for_status()
 
-            pdf_resp = requests.get(head.url, timeout=15)
-            pdf_resp.raise_for_status()
+            content_handle = PdfContentExtractor.store_pdf(head.url, timeout=15)
 
-            reader = PdfReader(BytesIO(pdf_resp.content))
-            raw = "\n".join(page.extract_text() or "" for page in reader.pages)
-            content = DocumentContentCleaner.clean_document(raw)
-
-            if not content:
+            if not content_handle:
                 raise ValueError("No text after cleaning PDF.")
 
             return {
@@ -63,7 +56,7 @@ class DOIRecoverer(DocRecoverer):
                     title=title,
                     abstract=abstract,
                     authors=authors,
-                    content=content,
+                    content_handle=content_handle,
                 )
             }
         except Exception:
@@ -123,13 +116,9 @@ class DOIRecoverer(DocRecoverer):
         )
 
         try:
-            pdf_resp = requests.get(pdf_url, timeout=15)
-            pdf_resp.raise_for_status()
-            reader = PdfReader(BytesIO(pdf_resp.content))
-            raw = "\n".join(page.extract_text() or "" for page in reader.pages)
-            content = DocumentContentCleaner.clean_document(raw)
+            content_handle = PdfContentExtractor.store_pdf(pdf_url, timeout=15)
 
-            if not content:
+            if not content_handle:
                 return set()
 
             return {
@@ -138,7 +127,7 @@ class DOIRecoverer(DocRecoverer):
                     title=title,
                     abstract=abstract,
                     authors=authors,
-                    content=content,
+                    content_handle=content_handle,
                 )
             }
         except Exception:
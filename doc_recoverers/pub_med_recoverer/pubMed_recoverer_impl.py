@@ -1,23 +1,18 @@
-import random
-import time
 import xml.etree.ElementTree as ET
-from io import BytesIO
 from typing import Set, Dict, Any
 import requests
-from PyPDF2 import PdfReader
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from controller.interfaces.doc_recoverer import DocRecoverer
 from entities.document import Document
-from doc_recoverers.doc_utils.doc_cleaner import DocumentContentCleaner
+from doc_recoverers.doc_utils.pdf_content import PdfContentExtractor
+from doc_recoverers.doc_utils.http import get_with_retry
+from resilience import RetryPolicy, circuit_breaker
 
 
 class PubMedRecoverer(DocRecoverer):
-    PUBMED_BACKOFF_MIN = 1.0
-    PUBMED_BACKOFF_MAX = 2.0
-    ARXIV_BACKOFF_MIN = 3.0
-    ARXIV_BACKOFF_MAX = 5.0
     TIMEOUT = 15
-    MAX_RETRIES = 100
+    PUBMED_RETRY_POLICY = RetryPolicy(max_attempts=8, base_delay=1.5, max_delay=60.0, deadline=300.0, circuit_breaker=circuit_breaker("eutils.ncbi.nlm.nih.gov"))
+    ARXIV_RETRY_POLICY = RetryPolicy(max_attempts=8, base_delay=6.0, max_delay=60.0, deadline=300.0, circuit_breaker=circuit_breaker("export.arxiv.org"))
     PDF_THREADS = 20
     ESEARCH_URL = "https://eutils.ncbi.nlm.nih.gov/entrez/eutils/esearch.fcgi"
     EFETCH_URL = "https://eutils.ncbi.nlm.nih.gov/entrez/eutils/efetch.fcgi"
@@ -92,24 +87,10 @@ class PubMedRecoverer(DocRecoverer):
         """
         params = {"db": "pubmed", "term": query, "retmax": k, "retmode": "json"}
 
-        for attempt in range(self.MAX_RETRIES):
-            try:
-                resp = requests.get(self.ESEARCH_URL, params=params, timeout=self.TIMEOUT)
-                if resp.status_code in {429, 503, 301}:
-                    sleep_time = self._get_sleep_time(resp, self.PUBMED_BACKOFF_MIN, self.PUBMED_BACKOFF_MAX)
-                    time.sleep(sleep_time)
-                    continue
-                resp.raise_for_status()
-                return resp.json().get("esearchresult", {}).get("idlist", [])
-            except requests.HTTPError as e:
-                if e.response.status_code in {429, 503, 301}:
-                    sleep_time = self._get_sleep_time(e.response, self.PUBMED_BACKOFF_MIN, self.PUBMED_BACKOFF_MAX)
-                    time.sleep(sleep_time)
-                else:
-                    return []
-            except requests.RequestException:
-                time.sleep(random.uniform(self.PUBMED_BACKOFF_MIN, self.PUBMED_BACKOFF_MAX))
-        return []
+        resp = get_with_retry(self.ESEARCH_URL, self.PUBMED_RETRY_POLICY, params=params, timeout=self.TIMEOUT)
+        if resp is None:
+            return []
+        return resp.json().get("esearchresult", {}).get("idlist", [])
 
     def _fetch_metadata(self, pmid: str) -> Dict[str, Any]:
         """Fetch metadata for a PubMed document.
@@ -122,43 +103,30 @@ class PubMedRecoverer(DocRecoverer):
         """
         params = {"db": "pubmed", "id": pmid, "retmode": "xml"}
 
-        for attempt in range(self.MAX_RETRIES):
-            try:
-                resp = requests.get(self.EFETCH_URL, params=params, timeout=self.TIMEOUT)
-                if resp.status_code in {429, 503, 301}:
-                    sleep_time = self._get_sleep_time(resp, self.PUBMED_BACKOFF_MIN, self.PUBMED_BACKOFF_MAX)
-                    time.sleep(sleep_time)
-                    continue
-                resp.raise_for_status()
-                root = ET.fromstring(resp.content)
-                article = root.find(".//Article")
-
-                if article is None:
-                    return {"title": "", "abstract": "", "authors": [], "doi": None}
-
-                title = article.find("ArticleTitle").text or ""
-                abstract = " ".join(e.text or "" for e in article.findall(".//AbstractText")).strip()
-                authors = [
-                    f"{a.findtext('ForeName', '')} {a.findtext('LastName', '')}".strip()
-                    for a in article.findall(".//Author")
-                ]
-
-                doi = None
-                for a in root.findall(".//ArticleId"):
-                    if a.attrib.get("IdType") == "doi":
-                        doi = a.text.strip()
-                        break
-
-                return {"title": title, "abstract": abstract, "authors": authors, "doi": doi}
-            except requests.HTTPError as e:
-                if e.response.status_code in {429, 503, 301}:
-                    sleep_time = self._get_sleep_time(e.response, self.PUBMED_BACKOFF_MIN, self.PUBMED_BACKOFF_MAX)
-                    time.sleep(sleep_time)
-                else:
-                    return {"title": "", "abstract": "", "authors": [], "doi": None}
-            except requests.RequestException:
-                time.sleep(random.uniform(self.PUBMED_BACKOFF_MIN, self.PUBMED_BACKOFF_MAX))
-        return {"title": "", "abstract": "", "authors": [], "doi": None}
+        resp = get_with_retry(self.EFETCH_URL, self.PUBMED_RETRY_POLICY, params=params, timeout=self.TIMEOUT)
+        if resp is None:
+            return {"title": "", "abstract": "", "authors": [], "doi": None}
+
+        root = ET.fromstring(resp.content)
+        article = root.find(".//Article")
+
+        if article is None:
+            return {"title": "", "abstract": "", "authors": [], "doi": None}
+
+        title = article.find("ArticleTitle").text or ""
+        abstract = " ".join(e.text or "" for e in article.findall(".//AbstractText")).strip()
+        authors = [
+            f"{a.findtext('ForeName', '')} {a.findtext('LastName', '')}".strip()
+            for a in article.findall(".//Author")
+        ]
+
+        doi = None
+        for a in root.findall(".//ArticleId"):
+            if a.attrib.get("IdType") == "doi":
+                doi = a.text.strip()
+                break
+
+        return {"title": title, "abstract": abstract, "authors": authors, "doi": doi}
 
     def _fetch_via_doi(
             self, doi: str, *, identifier: str, title: str, abstract: str, authors: list[str]
@@ -183,14 +151,9 @@ class PubMedRecoverer(DocRecoverer):
                 timeout=self.TIMEOUT
             )
             head.raise_for_status()
-            pdf_resp = requests.get(head.url, timeout=self.TIMEOUT)
-            pdf_resp.raise_for_status()
+            content_handle = PdfContentExtractor.store_pdf(head.url, timeout=self.TIMEOUT)
 
-            reader = PdfReader(BytesIO(pdf_resp.content))
-            raw = "\n".join(page.extract_text() or "" for page in reader.pages)
-            content = DocumentContentCleaner.clean_document(raw)
-
-            if not content:
+            if not content_handle:
                 return None
 
             return Document(
@@ -198,7 +161,7 @@ class PubMedRecoverer(DocRecoverer):
                 title=title,
                 abstract=abstract,
                 authors=authors,
-                content=content
+                content_handle=content_handle
             )
         except Exception:
             return None
@@ -214,27 +177,12 @@ class PubMedRecoverer(DocRecoverer):
         """
         search_q = f"id:{query.split('/')[-1]}" if (":" in query or "arxiv.org" in query) else f"all:{query}"
 
-        for attempt in range(self.MAX_RETRIES):
-            try:
-                resp = requests.get(
-                    f"{self.ARXIV_API}?search_query={search_q}&start=0&max_results=1",
-                    timeout=self.TIMEOUT
-                )
-                if resp.status_code in {429, 503, 301}:
-                    sleep_time = self._get_sleep_time(resp, self.ARXIV_BACKOFF_MIN, self.ARXIV_BACKOFF_MAX)
-                    time.sleep(sleep_time)
-                    continue
-                resp.raise_for_status()
-                break
-            except requests.HTTPError as e:
-                if e.response.status_code in {429, 503, 301}:
-                    sleep_time = self._get_sleep_time(e.response, self.ARXIV_BACKOFF_MIN, self.ARXIV_BACKOFF_MAX)
-                    time.sleep(sleep_time)
-                else:
-                    return set()
-            except requests.RequestException:
-                time.sleep(random.uniform(self.ARXIV_BACKOFF_MIN, self.ARXIV_BACKOFF_MAX))
-        else:
+        resp = get_with_retry(
+            f"{self.ARXIV_API}?search_query={search_q}&start=0&max_results=1",
+            self.ARXIV_RETRY_POLICY,
+            timeout=self.TIMEOUT
+        )
+        if resp is None:
             return set()
 
         ns = {"atom": "http://www.w3.org/2005/Atom"}
@@ -252,13 +200,9 @@ class PubMedRecoverer(DocRecoverer):
              ), f"https://arxiv.org/pdf/{arxiv_id}.pdf")
 
         try:
-            r = requests.get(pdf_url, timeout=self.TIMEOUT)
-            r.raise_for_status()
-            reader = PdfReader(BytesIO(r.content))
-            raw = "\n".join(p.extract_text() or "" for p in reader.pages)
-            content = DocumentContentCleaner.clean_document(raw)
+            content_handle = PdfContentExtractor.store_pdf(pdf_url, timeout=self.TIMEOUT)
 
-            if not content:
+            if not content_handle:
                 return set()
 
             return {
@@ -267,17 +211,8 @@ class PubMedRecoverer(DocRecoverer):
                     title=title,
                     abstract=abstract,
                     authors=authors,
-                    content=content
+                    content_handle=content_handle
                 )
             }
         except Exception:
             return set()
-
-    def _get_sleep_time(self, response, min_backoff, max_backoff) -> float:
-        retry_after = response.headers.get('Retry-After')
-        if retry_after:
-            try:
-                return float(retry_after) + random.uniform(0.1, 0.5)
-            except ValueError:
-                pass
-        return random.uniform(min_backoff, max_backoff)
\ No newline at end of file
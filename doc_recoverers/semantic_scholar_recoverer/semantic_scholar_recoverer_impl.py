@@ -1,23 +1,18 @@
-import random
 import time
 import xml.etree.ElementTree as ET
-from io import BytesIO
 from typing import Set
-import requests
-from PyPDF2 import PdfReader
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from controller.interfaces.doc_recoverer import DocRecoverer
 from entities.document import Document
-from doc_recoverers.doc_utils.doc_cleaner import DocumentContentCleaner
+from doc_recoverers.doc_utils.pdf_content import PdfContentExtractor
+from doc_recoverers.doc_utils.http import get_with_retry
+from resilience import RetryPolicy, circuit_breaker
 
 
 class SemanticScholarRecoverer(DocRecoverer):
-    SEMANTIC_BACKOFF_MIN = 1.0
-    SEMANTIC_BACKOFF_MAX = 3.0
-    ARXIV_BACKOFF_MIN = 3.0
-    ARXIV_BACKOFF_MAX = 5.0
     TIMEOUT = 15
-    MAX_RETRIES = 100
+    SEMANTIC_RETRY_POLICY = RetryPolicy(max_attempts=8, base_delay=2.0, max_delay=60.0, deadline=300.0, circuit_breaker=circuit_breaker("api.semanticscholar.org"))
+    ARXIV_RETRY_POLICY = RetryPolicy(max_attempts=8, base_delay=6.0, max_delay=60.0, deadline=300.0, circuit_breaker=circuit_breaker("export.arxiv.org"))
     PDF_THREADS = 20
     BASE_URL = "https://api.semanticscholar.org/graph/v1/paper/search"
 
@@ -40,25 +35,7 @@ class SemanticScholarRecoverer(DocRecoverer):
             Set of recovered Document objects
         """
         params = {"query": query, "fields": "title,abstract,authors,openAccessPdf", "limit": k}
-        resp = None
-
-
-
-        for attempt in range(self.MAX_RETRIES):
-            try:
-                resp = requests.get(self.BASE_URL, params=params, timeout=self.TIMEOUT)
-                if resp.status_code in {429, 503, 301}:
-                    sleep_time = self._get_sleep_time(resp, self.SEMANTIC_BACKOFF_MIN, self.SEMANTIC_BACKOFF_MAX)
-                    time.sleep(sleep_time)
-                    continue
-                if resp.status_code == 200:
-                    break
-                else:
-                    break
-            except requests.RequestException:
-                time.sleep(random.uniform(self.SEMANTIC_BACKOFF_MIN, self.SEMANTIC_BACKOFF_MAX))
-
-
+        resp = get_with_retry(self.BASE_URL, self.SEMANTIC_RETRY_POLICY, params=params, timeout=self.TIMEOUT)
 
         if not resp or resp.status_code != 200:
             return set()
@@ -112,7 +89,7 @@ class SemanticScholarRecoverer(DocRecoverer):
                     title=title,
                     abstract=abstract,
                     authors=authors,
-                    content=pdf_doc.content
+                    content_handle=pdf_doc.content_handle
                 )
 
         # Fallback to arXiv if no PDF available and title exists
@@ -128,7 +105,7 @@ class SemanticScholarRecoverer(DocRecoverer):
                     title=title or doc.title,
                     abstract=abstract or doc.abstract,
                     authors=authors or doc.authors,
-                    content=doc.content
+                    content_handle=doc.content_handle
                 )
 
         # If no content available, return document with metadata only (optional)
@@ -161,16 +138,12 @@ class SemanticScholarRecoverer(DocRecoverer):
             Document object or None if processing fails
         """
         try:
-            r = requests.get(url, timeout=self.TIMEOUT)
-            r.raise_for_status()
-            reader = PdfReader(BytesIO(r.content))
-            raw = "\n".join(page.extract_text() or "" for page in reader.pages)
-            content = DocumentContentCleaner.clean_document(raw)
+            content_handle = PdfContentExtractor.store_pdf(url, timeout=self.TIMEOUT)
 
-            if not content:
+            if not content_handle:
                 return None
 
-            return Document(id=paper_id, title="", abstract="", authors=[], content=content)
+            return Document(id=paper_id, title="", abstract="", authors=[], content_handle=content_handle)
         except Exception:
             return None
 
@@ -189,27 +162,12 @@ class SemanticScholarRecoverer(DocRecoverer):
         else:
             search_q = f"all:{query}"
 
-        for attempt in range(self.MAX_RETRIES):
-            try:
-                resp = requests.get(
-                    f"http://export.arxiv.org/api/query?search_query={search_q}&start=0&max_results=1",
-                    timeout=self.TIMEOUT
-                )
-                if resp.status_code in {429, 503, 301}:
-                    sleep_time = self._get_sleep_time(resp, self.ARXIV_BACKOFF_MIN, self.ARXIV_BACKOFF_MAX)
-                    time.sleep(sleep_time)
-                    continue
-                resp.raise_for_status()
-                break
-            except requests.HTTPError as e:
-                if e.response.status_code in {429, 503, 301}:
-                    sleep_time = self._get_sleep_time(e.response, self.ARXIV_BACKOFF_MIN, self.ARXIV_BACKOFF_MAX)
-                    time.sleep(sleep_time)
-                else:
-                    return set()
-            except requests.RequestException:
-                time.sleep(random.uniform(self.ARXIV_BACKOFF_MIN, self.ARXIV_BACKOFF_MAX))
-        else:
+        resp = get_with_retry(
+            f"http://export.arxiv.org/api/query?search_query={search_q}&start=0&max_results=1",
+            self.ARXIV_RETRY_POLICY,
+            timeout=self.TIMEOUT
+        )
+        if resp is None:
             return set()
 
         ns = {"atom": "http://www.w3.org/2005/Atom"}
@@ -229,13 +187,9 @@ class SemanticScholarRecoverer(DocRecoverer):
         )
 
         try:
-            r = requests.get(pdf_url, timeout=self.TIMEOUT)
-            r.raise_for_status()
-            reader = PdfReader(BytesIO(r.content))
-            raw = "\n".join(p.extract_text() or "" for p in reader.pages)
-            content = DocumentContentCleaner.clean_document(raw)
+            content_handle = PdfContentExtractor.store_pdf(pdf_url, timeout=self.TIMEOUT)
 
-            if not content:
+            if not content_handle:
                 return set()
 
             return {
@@ -244,17 +198,8 @@ class SemanticScholarRecoverer(DocRecoverer):
                     title=title,
                     abstract=abstract,
                     authors=authors,
-                    content=content
+                    content_handle=content_handle
                 )
             }
         except Exception:
             return set()
-
-    def _get_sleep_time(self, response, min_backoff, max_backoff) -> float:
-        retry_after = response.headers.get('Retry-After')
-        if retry_after:
-            try:
-                return float(retry_after) + random.uniform(0.1, 0.5)
-            except ValueError:
-                pass
-        return random.uniform(min_backoff, max_backoff)
\ No newline at end of file
@@ -1,7 +1,10 @@
-from .document import Document
+from .document import Document, set_content_store, get_content_store
 from .embedding import Embedding
 from .sota_table import SotaTable
+from .llm_task import LlmTask
+from .model_registry import dynamic_model, json_schema, schema_prompt_text, schema_json
 
 __all__ = [
-    "Document", "Embedding", "SotaTable"
+    "Document", "Embedding", "SotaTable", "set_content_store", "get_content_store",
+    "dynamic_model", "json_schema", "schema_prompt_text", "schema_json", "LlmTask"
 ]
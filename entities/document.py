@@ -1,4 +1,48 @@
-from pydantic import BaseModel
+import hashlib
+from typing import Any, Dict, Iterator
+
+from pydantic import BaseModel, model_validator
+
+from entities.interfaces.content_store import ContentStore
+
+
+def content_hash(content: str) -> str:
+    """
+    :return: The content-address (sha256 hex digest) of a content string
+    """
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+class InMemoryContentStore(ContentStore):
+    """Keeps every content string resident, used when no other store is configured."""
+
+    def __init__(self):
+        self._contents: Dict[str, str] = {}
+
+    def put(self, content: str) -> str:
+        handle = content_hash(content)
+        self._contents.setdefault(handle, content)
+        return handle
+
+    def get(self, handle: str) -> str:
+        return self._contents[handle]
+
+
+_content_store: ContentStore = InMemoryContentStore()
+
+
+def set_content_store(store: ContentStore) -> None:
+    """Set the store used by every Document to keep its content."""
+    global _content_store
+    _content_store = store
+
+
+def get_content_store() -> ContentStore:
+    """
+    :return: The store currently used by Documents to keep their content
+    """
+    return _content_store
+
 
 class Document(BaseModel):
     """Represents a recoverable document."""
@@ -15,8 +59,32 @@ class Document(BaseModel):
     authors: list[str]
     """List of authors of the document."""
 
-    content: str
-    """Contents of the document."""
+    content_handle: str = ""
+    """Handle of the document's contents in the configured content store."""
+
+    @model_validator(mode="before")
+    @classmethod
+    def _store_content(cls, data: Any) -> Any:
+        # Documents are still built with `content=...`, the text goes to the store
+        # and only its handle stays in the model
+        if isinstance(data, dict) and "content" in data:
+            data = dict(data)
+            content = data.pop("content") or ""
+            data["content_handle"] = get_content_store().put(content)
+        return data
+
+    @property
+    def content(self) -> str:
+        """Contents of the document, loaded from the content store on access."""
+        if not self.content_handle:
+            return ""
+        return get_content_store().get(self.content_handle)
+
+    def iter_content(self) -> Iterator[str]:
+        """Contents of the document as consecutive pieces, streamed from the content store."""
+        if not self.content_handle:
+            return iter(())
+        return get_content_store().iter_content(self.content_handle)
 
     def __eq__(self, other):
         if not isinstance(other, Document):
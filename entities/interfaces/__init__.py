@@ -0,0 +1,6 @@
+from .content_store import ContentStore, iter_blocks
+
+__all__ = [
+    "ContentStore",
+    "iter_blocks"
+]
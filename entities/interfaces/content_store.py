@@ -0,0 +1,75 @@
+from abc import ABC, abstractmethod
+from typing import Iterable, Iterator
+
+
+class ContentStore(ABC):
+    """
+    Interface for storing document contents outside of the Document objects.
+    Contents are addressed by an opaque handle returned on insertion.
+    """
+
+    # Whether the store can be pickled to worker processes, which then read contents from it
+    # themselves, e.g. because they are kept in files. Other stores hand contents over as strings
+    shareable = False
+    # Characters per piece of a streamed read, about a page of text
+    BLOCK_CHARS = 4096
+
+    @abstractmethod
+    def put(self, content: str) -> str:
+        """
+        Store a content string.
+
+        Args:
+            content: Full text to store.
+
+        Returns:
+            str: Handle that can later be used to load the content.
+        """
+        pass
+
+    @abstractmethod
+    def get(self, handle: str) -> str:
+        """
+        Load a previously stored content string.
+
+        Args:
+            handle: Handle returned by `put`.
+
+        Returns:
+            str: The stored content.
+        """
+        pass
+
+    def put_stream(self, pieces: Iterable[str]) -> str:
+        """
+        Store the concatenation of a stream of strings, e.g. the pages of a document as they
+        are extracted. Stores that can write incrementally override this to avoid holding
+        the whole content in memory.
+
+        Args:
+            pieces: Consecutive parts of the content.
+
+        Returns:
+            str: Handle that can later be used to load the content.
+        """
+        return self.put("".join(pieces))
+
+    def iter_content(self, handle: str) -> Iterator[str]:
+        """
+        Load a previously stored content as a stream of consecutive strings of about
+        `BLOCK_CHARS` characters, so it can be processed piece by piece. Stores that can
+        read incrementally override this to never hold the whole content.
+
+        Args:
+            handle: Handle returned by `put`.
+
+        Yields:
+            str: Consecutive parts of the content.
+        """
+        yield from iter_blocks(self.get(handle), self.BLOCK_CHARS)
+
+
+def iter_blocks(content: str, size: int) -> Iterator[str]:
+    """Consecutive slices of `size` characters of a content string."""
+    for start in range(0, len(content), size):
+        yield content[start:start + size]
@@ -1,14 +1,16 @@
 from abc import ABC, abstractmethod
-from typing import Any, Type
+from typing import Any, Optional, Type
 from pydantic import BaseModel
+from entities.llm_task import LlmTask
 
 class JsonGenerator(ABC):
     @abstractmethod
-    def generate_json(self, query: str, schema: Type[BaseModel]) -> Type[BaseModel]:
+    def generate_json(self, query: str, schema: Type[BaseModel], task: Optional[LlmTask] = None) -> Type[BaseModel]:
         """
         Send a query to the LLM and get back a JSON response.
         :param query: The input prompt or question.
         :param schema: The Pydantic model class to enforce on the response.
+        :param task: Kind of task of the request, lets routing generators pick a model for it.
         :return: A JSON-compatible Python object (dict, list, etc.)
         """
         pass
@@ -0,0 +1,20 @@
+from enum import Enum
+
+
+class LlmTask(str, Enum):
+    """
+    Kind of work a JSON generation request does, passed by call sites so that a routing
+    generator can send it to a model suited to it.
+    """
+
+    SUMMARIZE = "summarize"
+    """Condense given content: descriptions, community reports, round summaries, answers."""
+
+    EXTRACT = "extract"
+    """Pull structured facts out of a text: entities, claims, paper features."""
+
+    CONSOLIDATE = "consolidate"
+    """Merge or deduplicate results already extracted, usually short prompts."""
+
+    DECIDE = "decide"
+    """Reason over the whole board to choose what to do next, usually multi-expert prompts."""
@@ -0,0 +1,70 @@
+import json
+import weakref
+from threading import Lock, RLock
+from typing import Any, Dict, Optional, Tuple, Type
+
+from pydantic import BaseModel, create_model
+
+_models: Dict[Tuple, Type[BaseModel]] = {}
+_models_lock = Lock()
+
+# Keyed by model class, entries go away with models built outside the registry
+_schemas: "weakref.WeakKeyDictionary[type, Dict[Any, Any]]" = weakref.WeakKeyDictionary()
+_schemas_lock = RLock()
+
+
+def dynamic_model(name: str, __base__: Optional[Type[BaseModel]] = None, **fields: Any) -> Type[BaseModel]:
+    """
+    Memoized `pydantic.create_model`: models with the same name, base and field signature
+    (names, order, types and defaults) are built once and shared, so their validators and
+    JSON schemas are not rebuilt on every call.
+
+    Args:
+        name: Name of the model.
+        __base__: Base class of the model.
+        **fields: Field definitions, as for `create_model`.
+
+    Returns:
+        The model class.
+    """
+    key = (name, __base__, tuple(fields.items()))
+    try:
+        hash(key)
+    except TypeError:
+        # Unhashable defaults (e.g. a list) cannot be part of the signature
+        return create_model(name, __base__=__base__, **fields)
+    with _models_lock:
+        model = _models.get(key)
+        if model is None:
+            model = create_model(name, __base__=__base__, **fields)
+            _models[key] = model
+        return model
+
+
+def _cached(schema: Type[BaseModel], variant: Any, build) -> Any:
+    with _schemas_lock:
+        entries = _schemas.setdefault(schema, {})
+        if variant not in entries:
+            entries[variant] = build()
+        return entries[variant]
+
+
+def json_schema(schema: Type[BaseModel]) -> Dict[str, Any]:
+    """
+    :return: The cached `model_json_schema()` of a model, shared between callers and not to be modified
+    """
+    return _cached(schema, None, schema.model_json_schema)
+
+
+def schema_prompt_text(schema: Type[BaseModel]) -> str:
+    """
+    :return: The cached JSON schema of a model as prompts embed it, i.e. `f"{model.model_json_schema()}"`
+    """
+    return _cached(schema, "prompt", lambda: str(json_schema(schema)))
+
+
+def schema_json(schema: Type[BaseModel], indent: Optional[int] = None) -> str:
+    """
+    :return: The cached `json.dumps` of a model's JSON schema with the given indent
+    """
+    return _cached(schema, ("json", indent), lambda: json.dumps(json_schema(schema), indent=indent))
@@ -2,7 +2,8 @@ from typing import Dict, List
 from pydantic import BaseModel
 
 from board.board import Board
-from entities.sota_table import sota_table_to_markdown
+from entities.sota_table import sota_table_to_dataframe
+from entities.llm_task import LlmTask
 
 from .prompts.acquire_context import (
     ExpertAnswerModel,
@@ -19,6 +20,7 @@ from .prompts.pick_action import (
 )
 from .models import Expert, DocumentChunk, ExpertDescription, RoundAction
 from .interfaces import JsonGenerator, KnowledgeRecoverer
+from .utils.prompt_budget import PromptBudgeter
 
 
 EXTRA_CONTEXT_AMOUNT_OF_PAPERS = 2
@@ -38,9 +40,15 @@ class ActionPicker:
         knowledge_recoverer: KnowledgeRecoverer,
     ):
         self.json_generator = json_generator
-        self.sota_table_md = sota_table_to_markdown(board.sota_table)
-        self.thesis_thoughts = self._display_thoughts(board.thesis_knowledge.thoughts)
+        # The table and the thoughts grow every round, they are kept within token budgets
+        self.budgeter = PromptBudgeter()
         self.thesis_description = board.thesis_knowledge.description
+        self.sota_table_section = self.budgeter.table_section(
+            sota_table_to_dataframe(board.sota_table), self.thesis_description
+        )
+        self.thoughts_section = self.budgeter.thoughts_section(
+            board.thesis_knowledge.thoughts, self._display_thoughts
+        )
         self.document_recoverer = knowledge_recoverer
 
     def pick_action(self, experts: List[Expert]) -> PickActionResult:
@@ -52,14 +60,16 @@ class ActionPicker:
         )
 
         answer_model = create_pick_action_prompt_answer_model(expert_descriptions)
-        prompt = pick_action_prompt(
-            id_to_presentation,
-            self.sota_table_md,
-            self.thesis_description,
-            self.thesis_thoughts,
+        prompt = self.budgeter.fit(
+            "pick_action",
+            pick_action_prompt,
+            presentations=id_to_presentation,
+            thesis_desc=self.thesis_description,
+            thesis_thoughts=self.thoughts_section,
+            sota_table_md=self.sota_table_section,
         )
 
-        id_to_intervention = self.json_generator.generate_json(prompt, answer_model)
+        id_to_intervention = self.json_generator.generate_json(prompt, answer_model, task=LlmTask.DECIDE)
 
         chosen_action = self._parse_answer_and_count_votes(id_to_intervention)
 
@@ -80,7 +90,7 @@ class ActionPicker:
             pick_action_prompt, pick_action_answer, chosen_action
         )
 
-        summary = self.json_generator.generate_json(summary_prompt, SummaryAnswerModel)
+        summary = self.json_generator.generate_json(summary_prompt, SummaryAnswerModel, task=LlmTask.SUMMARIZE)
 
         return summary.summary
 
@@ -111,9 +121,9 @@ class ActionPicker:
 
         answ = {
             id: ExpertPresentation(
-                expert_description=expert_descriptions[id],
+                expert_description=self.budgeter.expert(expert_descriptions[id]),
                 extra_context=(
-                    [self._display_chunk(chunk) for chunk in chunks]
+                    self.budgeter.excerpts([self._display_chunk(chunk) for chunk in chunks])
                     if len(chunks) > 0
                     else None
                 ),
@@ -124,7 +134,7 @@ class ActionPicker:
         return answ
 
     def _display_chunk(self, chunk: DocumentChunk) -> str:
-        return "Excerpt from '" + chunk.document_title + "': \n" + chunk.chunk
+        return "Excerpt from '" + chunk.document_title + "': \n" + self.budgeter.text("excerpt", chunk.chunk)
 
     def _acquire_context_if_necessary(
         self,
@@ -137,14 +147,16 @@ class ActionPicker:
         """
 
         answer_model = create_rag_queries_prompt_answer_model(expert_descriptions)
-        prompt = rag_queries_prompt(
-            self.sota_table_md,
-            self.thesis_description,
-            self.thesis_thoughts,
-            expert_descriptions,
+        prompt = self.budgeter.fit(
+            "rag_queries",
+            rag_queries_prompt,
+            thesis_desc=self.thesis_description,
+            experts_model={id: self.budgeter.expert(description) for id, description in expert_descriptions.items()},
+            thoughts_on_thesis=self.thoughts_section,
+            sota_markdown=self.sota_table_section,
         )
 
-        answer = self.json_generator.generate_json(prompt, answer_model)
+        answer = self.json_generator.generate_json(prompt, answer_model, task=LlmTask.DECIDE)
 
         return self._execute_expert_context_search_commands(answer, experts)
 
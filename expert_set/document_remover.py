@@ -4,6 +4,7 @@ from collections import Counter
 
 from board.board import Board
 from entities.sota_table import sota_table_to_dataframe, SotaTable
+from entities.llm_task import LlmTask
 
 from .action_picker import PickActionResult
 from .prompts.remove_document import (
@@ -15,6 +16,7 @@ from .prompts.remove_document import (
 )
 from .models import Expert, ExpertDescription
 from .interfaces import JsonGenerator
+from .utils.prompt_budget import PromptBudgeter, Shrinkable
 
 
 DOCUMENTS_TO_REMOVE = 2  # Maximum number of documents to remove per round
@@ -33,17 +35,21 @@ class DocumentRemover:
         pick_action_result: PickActionResult,
     ):
         self.json_generator = json_generator
-        self.index_to_doc_id, self.sota_table_md = (
+        # The table and the thoughts grow every round, they are kept within token budgets
+        self.budgeter = PromptBudgeter()
+        self.thesis_description = board.thesis_knowledge.description
+        self.index_to_doc_id, self.sota_table_section = (
             self._prepare_sota_table_with_index_mapping(board.sota_table)
         )
-        self.thesis_thoughts = self._display_thoughts(board.thesis_knowledge.thoughts)
-        self.thesis_description = board.thesis_knowledge.description
+        self.thoughts_section = self.budgeter.thoughts_section(
+            board.thesis_knowledge.thoughts, self._display_thoughts
+        )
         self.expert_presentations = pick_action_result.expert_presentations
         self.board = board
 
     def _prepare_sota_table_with_index_mapping(
         self, sota_table: SotaTable
-    ) -> Tuple[Dict[int, str], str]:
+    ) -> Tuple[Dict[int, str], Shrinkable]:
         """
         Creates a dataframe from the SOTA table with document IDs, generates an index-to-document-id mapping,
         and returns both the mapping and the markdown representation of the table.
@@ -54,7 +60,7 @@ class DocumentRemover:
         Returns:
             Tuple containing:
             - Dictionary mapping table indices to document IDs
-            - Markdown representation of the table with indices
+            - Markdown representation of the table with indices, within the table's token budget
         """
         df = sota_table_to_dataframe(sota_table, include_id=True)
 
@@ -63,24 +69,28 @@ class DocumentRemover:
         df = df.drop(columns=["id"])
         df.insert(0, "Index", list(range(len(df))))
 
-        markdown_table = df.to_markdown(index=False)
-        assert markdown_table
+        # The experts pick rows to remove, which are the least relevant ones: every row is kept and
+        # only the cells are shortened to fit the budget
+        table_section = self.budgeter.table_section(df, self.thesis_description, keep_all_rows=True)
+        assert table_section.value
 
-        return index_to_doc_id, markdown_table
+        return index_to_doc_id, table_section
 
     def remove_documents(self, experts: List[Expert]) -> DocumentRemovalResult:
         id_to_expert = self._generate_expert_id_dict(experts)
         expert_descriptions = self._extract_descriptions_from_id_dict(id_to_expert)
 
         answer_model = create_removal_answers_model(expert_descriptions)
-        prompt = remove_document_prompt(
-            self.expert_presentations,
-            self.sota_table_md,
-            self.thesis_description,
-            self.thesis_thoughts,
+        prompt = self.budgeter.fit(
+            "remove_document",
+            remove_document_prompt,
+            presentations=self.expert_presentations,
+            thesis_desc=self.thesis_description,
+            thesis_thoughts=self.thoughts_section,
+            sota_table_md=self.sota_table_section,
         )
 
-        id_to_intervention = self.json_generator.generate_json(prompt, answer_model)
+        id_to_intervention = self.json_generator.generate_json(prompt, answer_model, task=LlmTask.DECIDE)
 
         documents_to_remove_idxs, documents_to_remove_ids = (
             self._parse_answer_and_get_documents_to_delete(id_to_intervention)
@@ -134,7 +144,7 @@ class DocumentRemover:
             remove_document_prompt, remove_document_answer, documents_removed
         )
 
-        summary = self.json_generator.generate_json(summary_prompt, SummaryAnswerModel)
+        summary = self.json_generator.generate_json(summary_prompt, SummaryAnswerModel, task=LlmTask.SUMMARIZE)
 
         return summary.summary
 
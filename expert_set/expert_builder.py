@@ -47,5 +47,4 @@ class ExpertBuilder:
 
     def _chunk_and_store(self, doc: Document, knowledge: KnowledgeRepository):
         chunks = chunk_document(doc)
-        for chunk in chunks:
-            knowledge.store_document(chunk, lambda c: c.chunk)
+        knowledge.store_documents(chunks, lambda c: c.chunk)
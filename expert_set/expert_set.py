@@ -1,9 +1,12 @@
-from typing import List
+import logging
+from typing import List, Optional
 from board.board import Board
 from entities.sota_table import SotaTable
+from entities.llm_task import LlmTask
+from telemetry import get_telemetry, span
 from expert_set.document_remover import DocumentRemover
 from expert_set.paper_adder import PaperAdder
-from .interfaces import KnowledgeRepositoryFactory, JsonGenerator, UserQuerier, KnowledgeRecoverer
+from .interfaces import KnowledgeRepositoryFactory, BatchJsonGenerator, JsonGenerator, UserQuerier, KnowledgeRecoverer
 from .models import RoundAction, BuildExpertCommand
 from .expert_builder import ExpertBuilder
 from .action_picker import ActionPicker, PickActionResult
@@ -26,8 +29,11 @@ class ExpertSet:
             knowledge_repository_factory: KnowledgeRepositoryFactory,
             board: Board,
             user_querier: UserQuerier,
+            batch_json_generator: Optional[BatchJsonGenerator] = None,
     ):
         self.json_generator = json_generator
+        # Non-interactive work (feature extraction over the existing papers) goes through it when given
+        self.batch_json_generator = batch_json_generator
         self.document_recoverer = document_recoverer
         self.board = board
         self.user_querier = user_querier
@@ -47,11 +53,19 @@ class ExpertSet:
             Completed SOTA table
         """
         for round_num in range(MAX_ROUNDS):
-            action_result = self._run_expert_round()
+            try:
+                action_result = self._run_expert_round()
+            except Exception as e:
+                # The experts could not pick an action (e.g. the LLM provider is down and its
+                # calls ran out of retries): the table built so far is returned
+                logging.error(f"Stopping after round {round_num}, no action could be picked: {e}")
+                break
 
             if self._should_terminate(action_result.action):
                 break
 
+        print("LLM and embedding calls:")
+        print(get_telemetry().report())
         return self.board.sota_table
 
     def _run_expert_round(self) -> PickActionResult:
@@ -61,15 +75,22 @@ class ExpertSet:
         Returns:
             Result of the expert decision process
         """
-        action_result = self._make_experts_choose_action()
-
-        if action_result.action == RoundAction.RemoveDocument:
-            self._handle_remove_documents(action_result)
-        elif action_result.action == RoundAction.AskUser:
-            self._handle_user_questions(action_result)
-        elif action_result.action == RoundAction.AddDocument:
-            self._handle_add_documents()
-
+        with span("expert_set.pick_action"):
+            action_result = self._make_experts_choose_action()
+
+        try:
+            if action_result.action == RoundAction.RemoveDocument:
+                with span("expert_set.remove_documents"):
+                    self._handle_remove_documents(action_result)
+            elif action_result.action == RoundAction.AskUser:
+                with span("expert_set.ask_user"):
+                    self._handle_user_questions(action_result)
+            elif action_result.action == RoundAction.AddDocument:
+                with span("expert_set.add_documents"):
+                    self._handle_add_documents()
+        except Exception as e:
+            # An action whose calls ran out of retries ends the round, the board keeps what it already changed
+            logging.error(f"Round action {action_result.action} failed: {e}")
 
         return action_result
 
@@ -113,7 +134,7 @@ class ExpertSet:
             questions_asked=questions,
             user_answers=answers
         )
-        update = self.json_generator.generate_json(prompt, DescriptionUpdate)
+        update = self.json_generator.generate_json(prompt, DescriptionUpdate, task=LlmTask.CONSOLIDATE)
 
         self.board.update_thesis_description(update.updated_description)
 
@@ -145,7 +166,7 @@ class ExpertSet:
             questions_asked=questions,
             user_answers=answers
         )
-        update = self.json_generator.generate_json(prompt, ExpertSetUpdate)
+        update = self.json_generator.generate_json(prompt, ExpertSetUpdate, task=LlmTask.DECIDE)
 
         self._apply_expert_updates(update)
 
@@ -206,7 +227,8 @@ class ExpertSet:
         adder = PaperAdder(
             self.json_generator,
             self.board,
-            self.document_recoverer
+            self.document_recoverer,
+            batch_json_generator=self.batch_json_generator,
         )
         action_resume: PaperAdditionResult = adder.add_papers(self.experts)
         for paper in action_resume.papers_added:
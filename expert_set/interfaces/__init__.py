@@ -1,5 +1,6 @@
 from .knowledge_repository import KnowledgeRepository
 from .json_generator import JsonGenerator
+from .batch_json_generator import BatchJsonGenerator
 from .knowledge_repository_factory import KnowledgeRepositoryFactory
 from .user_querier import UserQuerier
 from .knowledge_recoverer import KnowledgeRecoverer
@@ -7,6 +8,7 @@ from .knowledge_recoverer import KnowledgeRecoverer
 
 __all__ = [
     "JsonGenerator",
+    "BatchJsonGenerator",
     "KnowledgeRepository",
     "KnowledgeRepositoryFactory",
     "UserQuerier",
@@ -0,0 +1,24 @@
+from abc import abstractmethod
+from concurrent.futures import Future
+from typing import Optional, Type
+
+from entities.llm_task import LlmTask
+from .json_generator import JsonGenerator, T
+
+
+class BatchJsonGenerator(JsonGenerator):
+    """
+    JSON generator that also accepts requests without waiting for them, so that work that does not
+    need interactive latency (feature extraction over the existing papers) is submitted in bulk.
+    """
+
+    @abstractmethod
+    def submit_json(self, query: str, schema: Type[T], task: Optional[LlmTask] = None) -> "Future[T]":
+        """
+        Queue a request, to be sent with others.
+        :param query: The input prompt or question.
+        :param schema: The Pydantic model class to enforce on the response.
+        :param task: Kind of task of the request.
+        :return: A future resolved with an instance of the schema once the response arrives.
+        """
+        pass
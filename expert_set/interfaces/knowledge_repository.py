@@ -11,6 +11,14 @@ class KnowledgeRepository(ABC, Generic[T]):
     def store_document(self, document: T, get_content: Callable[[T], str]) -> None:
         pass
 
+    def store_documents(self, documents: List[T], get_content: Callable[[T], str]) -> None:
+        """
+        Store several documents at once, letting implementations batch their work.
+        The default implementation stores the documents one by one.
+        """
+        for document in documents:
+            self.store_document(document, get_content)
+
     @abstractmethod
     def query_knowledge(self, query: str, k: int) -> List[T]:
         pass
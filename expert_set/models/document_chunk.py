@@ -1,3 +1,5 @@
+from typing import Optional
+
 from pydantic import BaseModel
 
 
@@ -5,3 +7,7 @@ class DocumentChunk(BaseModel):
     document_id: str
     document_title: str
     chunk: str
+    start: Optional[int] = None
+    """Offset of the chunk's first character in the document's content."""
+    end: Optional[int] = None
+    """Offset past the chunk's last character in the document's content."""
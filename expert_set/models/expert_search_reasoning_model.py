@@ -1,5 +1,7 @@
 from typing import Dict, List, Tuple
-from pydantic import BaseModel, create_model
+from pydantic import BaseModel
+
+from entities.model_registry import dynamic_model
 
 class ExpertSearchReasoningModel(BaseModel):
     reasoning: str
@@ -11,7 +13,7 @@ def build_expert_search_reasoning_model(expert_names: List[str]):
         expert: (ExpertSearchReasoningModel, ...)
         for expert in expert_names
     }
-    return create_model(
+    return dynamic_model(
         'DynamicExpertSearchReasoningModel',
         **fields
     )
@@ -1,18 +1,21 @@
 import json
-from typing import List, Dict
+from typing import List, Dict, Optional
 import logging
-from pydantic import create_model
 import concurrent.futures
+import contextvars
 from threading import Lock
 
-from entities.sota_table import sota_table_to_markdown, PaperFeaturesModel
+from entities.sota_table import sota_table_to_dataframe, sota_table_to_markdown, PaperFeaturesModel
+from entities.model_registry import dynamic_model
+from entities.llm_task import LlmTask
 from expert_set.models.expert import Expert
 
-from .interfaces import JsonGenerator
+from .interfaces import BatchJsonGenerator, JsonGenerator
 from recoverer_agent import RecovererAgent
 from board.board import Board
 from entities.document import Document
 from .models.expert_search_reasoning_model import build_expert_search_reasoning_model
+from .utils.prompt_budget import PromptBudgeter
 from .prompts.build_expert_search_reasoning_prompt import build_expert_search_reasoning_prompt
 
 from .models.paper_addition_result_model import PaperAdditionResult
@@ -38,21 +41,36 @@ def create_features_extraction_model(feature_list: List[str]):
     # Create fields for each feature
     fields = {feature: (str, "") for feature in feature_list}
     
-    return create_model('FeaturesExtractionModel', **fields)
+    return dynamic_model('FeaturesExtractionModel', **fields)
 
 
 class PaperAdder:
+    # Threads processing chunks, an upper bound on top of the provider's adaptive concurrency limiter
+    LLM_WORKERS = 16
+
     def __init__(
         self,
         json_generator: JsonGenerator,
         board: Board,
         recoverer_agent: RecovererAgent,
-        k: int = 3
+        k: int = 3,
+        batch_json_generator: Optional[BatchJsonGenerator] = None,
     ):
+        """
+        Args:
+            json_generator: Answers the interactive requests.
+            board: Board holding the SOTA table.
+            recoverer_agent: Recovers the papers to add.
+            k: Papers recovered per addition.
+            batch_json_generator: Answers the bulk, non-interactive requests, defaults to `json_generator`.
+        """
         self.json_generator = json_generator
+        self.batch_json_generator = batch_json_generator
         self.recoverer_agent = recoverer_agent
         self.k = k
         self.board = board
+        # The table and the thoughts grow every round, they are kept within token budgets
+        self.budgeter = PromptBudgeter()
 
     def add_papers(self, experts: List[Expert]) -> PaperAdditionResult:
         """
@@ -64,22 +82,27 @@ class PaperAdder:
         expert_search_reasoning_model = build_expert_search_reasoning_model(expert_names)
         
         # Build context for reasoning
-        sota_md = sota_table_to_markdown(self.board.sota_table)
         thesis_desc = self.board.thesis_knowledge.description
-        thesis_thoughts = self.board.thesis_knowledge.thoughts
         expert_context = {
-            expert.name: {"expert_description": expert.expert_model.description}
+            expert.name: {"expert_description": self.budgeter.expert(expert.expert_model).description}
             for expert in experts
         }
         
         # Get search reasoning from experts
-        prompt = build_expert_search_reasoning_prompt(sota_md, thesis_desc, thesis_thoughts, expert_context)
-        expert_searches = self.json_generator.generate_json(prompt, expert_search_reasoning_model)
+        prompt = self.budgeter.fit(
+            "expert_search_reasoning",
+            build_expert_search_reasoning_prompt,
+            thesis_desc=thesis_desc,
+            expert_context=expert_context,
+            thesis_thoughts=self.budgeter.thoughts_section(self.board.thesis_knowledge.thoughts),
+            sota_md=self.budgeter.table_section(sota_table_to_dataframe(self.board.sota_table), thesis_desc),
+        )
+        expert_searches = self.json_generator.generate_json(prompt, expert_search_reasoning_model, task=LlmTask.DECIDE)
         
         # Synthesize search queries
         all_queries = [getattr(expert_searches, name).what_to_search for name in expert_names]
         synthesis_prompt = build_search_query_synthesis_prompt(all_queries)
-        summary_query_model = self.json_generator.generate_json(synthesis_prompt, StringResponseModel)
+        summary_query_model = self.json_generator.generate_json(synthesis_prompt, StringResponseModel, task=LlmTask.CONSOLIDATE)
         summary_query = summary_query_model.response
         # Recover new documents
         new_docs = self.recoverer_agent.recover_docs(summary_query, self.k)
@@ -104,8 +127,13 @@ class PaperAdder:
         summary_prompt = build_addition_summary_prompt(
             added_titles, expert_names, new_features
         )
-        summary_model = self.json_generator.generate_json(summary_prompt, StringResponseModel)
-        summary = summary_model.response
+        try:
+            summary_model = self.json_generator.generate_json(summary_prompt, StringResponseModel, task=LlmTask.SUMMARIZE)
+            summary = summary_model.response
+        except Exception as e:
+            # The papers are already on the board, only the summary of the addition is lost
+            logging.warning(f"Failed to summarize the paper addition: {e}")
+            summary = f"Added {len(added_titles)} papers: {', '.join(added_titles)}"
         
         return PaperAdditionResult(papers_added=added_titles, summary=summary)
 
@@ -185,11 +213,11 @@ class PaperAdder:
             return True
         
         # Execute processing in parallel with thread pool
-        with concurrent.futures.ThreadPoolExecutor(max_workers=5) as executor:
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.LLM_WORKERS) as executor:
             # Create a list of (chunk_idx, chunk) tuples
             chunk_items = list(enumerate(chunks))
             # Submit all chunks for processing and wait for completion
-            futures = [executor.submit(process_chunk, chunk_info) for chunk_info in chunk_items]
+            futures = [executor.submit(contextvars.copy_context().run, process_chunk, chunk_info) for chunk_info in chunk_items]
             concurrent.futures.wait(futures)
 
 
@@ -223,7 +251,7 @@ class PaperAdder:
         )
         FeaturesModel = create_features_extraction_model(self.board.sota_table.features)
         try:
-            response = self.json_generator.generate_json(prompt, FeaturesModel)
+            response = self.json_generator.generate_json(prompt, FeaturesModel, task=LlmTask.EXTRACT)
             extracted_features = {}
             for feature in self.board.sota_table.features:
                 # Accept string or dict, but prefer string (brief description)
@@ -254,7 +282,7 @@ class PaperAdder:
         )
         
         try:
-            response_names = self.json_generator.generate_json(prompt, NewFeaturesListModel)
+            response_names = self.json_generator.generate_json(prompt, NewFeaturesListModel, task=LlmTask.EXTRACT)
             new_features = response_names.new_features
         except Exception as e:
             logging.warning(f"Failed to identify new feature names for expert {expert.name}, chunk {chunk_idx}: {e}")
@@ -271,7 +299,7 @@ class PaperAdder:
                     chunk.chunk
                 )
                 try:
-                    value_response = self.json_generator.generate_json(value_prompt, StringResponseModel)
+                    value_response = self.json_generator.generate_json(value_prompt, StringResponseModel, task=LlmTask.EXTRACT)
                     feature_values[feature] = value_response.response
                 except Exception as e:
                     logging.warning(f"Failed to extract value for new feature '{feature}' for expert {expert.name}, chunk {chunk_idx}: {e}")
@@ -305,8 +333,12 @@ class PaperAdder:
                 prompt = build_feature_consolidation_prompt(
                     feature_name, paper_title, values
                 )
-                consolidated_model = self.json_generator.generate_json(prompt, StringResponseModel)
-                consolidated_value = consolidated_model.response
+                try:
+                    consolidated_model = self.json_generator.generate_json(prompt, StringResponseModel, task=LlmTask.CONSOLIDATE)
+                    consolidated_value = consolidated_model.response
+                except Exception as e:
+                    logging.warning(f"Failed to consolidate feature {feature_name} for {paper_title}, joining its values: {e}")
+                    consolidated_value = "; ".join(dict.fromkeys(values))
             else:
                 consolidated_value = "Not Available"
             
@@ -347,7 +379,8 @@ class PaperAdder:
         try:
             consolidated_features_response = self.json_generator.generate_json(
                 consolidation_prompt, 
-                NewFeaturesListModel
+                NewFeaturesListModel,
+                task=LlmTask.CONSOLIDATE,
             )
             global_new_features = consolidated_features_response.new_features
         except Exception as e:
@@ -403,7 +436,7 @@ class PaperAdder:
         
         try:
             # Step 6: Use the dynamic model to get consolidated values
-            consolidated_response = self.json_generator.generate_json(prompt, GlobalNewFeaturesModel)
+            consolidated_response = self.json_generator.generate_json(prompt, GlobalNewFeaturesModel, task=LlmTask.CONSOLIDATE)
             
             # Extract values from the response
             consolidated = {}
@@ -426,85 +459,100 @@ class PaperAdder:
         return consolidated
 
     def _process_existing_documents_for_new_features(self, new_features: List[str], experts: List[Expert]) -> None:
-        """Process existing documents in the SOTA table to extract values for newly added features"""
+        """
+        Process existing documents in the SOTA table to extract values for newly added features.
+        None of it is interactive: every extraction request is submitted at once, then every
+        consolidation request, as bulk jobs when there is a batch generator.
+        """
         if not self.board.sota_table.document_features or not new_features:
             return
         
         logging.info(f"Processing {len(self.board.sota_table.document_features)} existing documents for {len(new_features)} new features")
-        
-        # Process each existing document
-        for i, (existing_doc, paper_features) in enumerate(self.board.sota_table.document_features):
-            logging.info(f"Processing document {i+1}/{len(self.board.sota_table.document_features)}: {existing_doc.title}")
-            
-            # Only process if the document doesn't already have these features
-            missing_features = [f for f in new_features if f not in paper_features.features or paper_features.features[f]["value"] == "Not Available"]
-            
-            if not missing_features:
-                logging.info(f"Document already has all new features")
-                continue
-                
-            # Extract new features from document
-            from expert_set.utils.document_chunking import chunk_document
-            chunks = chunk_document(existing_doc, window_size=500)
-            
-            # Extract feature values for each new feature from each chunk
-            feature_values = {feature: [] for feature in missing_features}
-            
-            for chunk_idx, chunk in enumerate(chunks):
-                # We're using only the first expert for now as in the original code
-                expert = experts[0]
-                
-                # Use the same extraction logic as in _extract_features_from_chunk
-                prompt = build_feature_extraction_prompt(
-                    expert.expert_model.description,
-                    self.board.thesis_knowledge.description,
-                    existing_doc.title,
-                    existing_doc.authors,
-                    chunk.chunk,
-                    missing_features  # Only extract the missing features
-                )
+        # We're using only the first expert for now as in the original code
+        expert = experts[0]
+        from expert_set.utils.document_chunking import chunk_document
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.LLM_WORKERS) as executor:
+            # Extraction requests of every chunk of every document missing features
+            extractions = []
+            for i, (existing_doc, paper_features) in enumerate(self.board.sota_table.document_features):
+                # Only process if the document doesn't already have these features
+                missing_features = [f for f in new_features if f not in paper_features.features or paper_features.features[f]["value"] == "Not Available"]
+                if not missing_features:
+                    logging.info(f"Document {existing_doc.title} already has all new features")
+                    continue
+
                 FeaturesModel = create_features_extraction_model(missing_features)
-                try:
-                    response = self.json_generator.generate_json(prompt, FeaturesModel)
-                    extracted_features = {}
+                chunks = chunk_document(existing_doc, window_size=500)
+                futures = []
+                for chunk_idx, chunk in enumerate(chunks):
+                    # Use the same extraction logic as in _extract_features_from_chunk
+                    prompt = build_feature_extraction_prompt(
+                        expert.expert_model.description,
+                        self.board.thesis_knowledge.description,
+                        existing_doc.title,
+                        existing_doc.authors,
+                        chunk.chunk,
+                        missing_features  # Only extract the missing features
+                    )
+                    futures.append((chunk_idx, self._submit_json(executor, prompt, FeaturesModel, LlmTask.EXTRACT)))
+                extractions.append((existing_doc, paper_features, missing_features, futures))
+
+            # Consolidation requests of the values found for each feature
+            consolidations = []
+            for existing_doc, paper_features, missing_features, futures in extractions:
+                feature_values = {feature: [] for feature in missing_features}
+                for chunk_idx, future in futures:
+                    try:
+                        response = future.result()
+                    except Exception as e:
+                        logging.warning(f"Failed to extract features for expert {expert.name}, chunk {chunk_idx} of {existing_doc.title}: {e}")
+                        continue
                     for feature in missing_features:
                         # Accept string or dict, but prefer string (brief description)
                         value = getattr(response, feature, "")
                         if isinstance(value, dict) and 'value' in value:
                             value = value['value']
-                        extracted_features[feature] = value
-                        
                         # Add non-empty values to the collection
                         if value and value != "Not Available":
                             feature_values[feature].append(value)
-                except Exception as e:
-                    logging.warning(f"Failed to extract features for expert {expert.name}, chunk {chunk_idx} of {existing_doc.title}: {e}")
-            
-            # Consolidate values for each feature
-            for feature in missing_features:
-                values = feature_values.get(feature, [])
-                
-                if values:
-                    # Consolidate using LLM
-                    prompt = build_feature_consolidation_prompt(
-                        feature, existing_doc.title, values
-                    )
+
+                for feature in missing_features:
+                    values = feature_values[feature]
+                    future = None
+                    if values:
+                        # Consolidate using LLM
+                        prompt = build_feature_consolidation_prompt(
+                            feature, existing_doc.title, values
+                        )
+                        future = self._submit_json(executor, prompt, StringResponseModel, LlmTask.CONSOLIDATE)
+                    consolidations.append((existing_doc, paper_features, feature, values, future))
+
+            for existing_doc, paper_features, feature, values, future in consolidations:
+                if future is None:
+                    consolidated_value = "Not Available"
+                else:
                     try:
-                        consolidated_model = self.json_generator.generate_json(prompt, StringResponseModel)
-                        consolidated_value = consolidated_model.response
+                        consolidated_value = future.result().response
                     except Exception as e:
                         logging.warning(f"Failed to consolidate feature '{feature}' for {existing_doc.title}: {e}")
-                        consolidated_value = values[0] if values else "Not Available"
-                else:
-                    consolidated_value = "Not Available"
-                
+                        consolidated_value = values[0]
+
                 # Update document's features
                 if feature not in paper_features.features:
                     paper_features.features[feature] = {"value": consolidated_value}
                 else:
                     paper_features.features[feature]["value"] = consolidated_value
-                    
-            logging.info(f"Updated document with {len(missing_features)} new features")
+
+        logging.info(f"Updated {len(extractions)} documents with new features")
+
+    def _submit_json(self, executor: concurrent.futures.Executor, prompt: str, schema, task: LlmTask) -> concurrent.futures.Future:
+        """Queue a request on the batch generator if there is one, otherwise on the thread pool."""
+        if self.batch_json_generator is not None:
+            return self.batch_json_generator.submit_json(prompt, schema, task=task)
+        # Through a lambda so that the calls are attributed to this module in telemetry, in the
+        # caller's context so that they are recorded under its span
+        return executor.submit(contextvars.copy_context().run, lambda: self.json_generator.generate_json(prompt, schema, task))
 
     def _extract_year_from_id(self, doc_id: str) -> int:
         """Extract year from document ID"""
@@ -524,7 +572,7 @@ class PaperAdder:
         )
         
         try:
-            domain_model = self.json_generator.generate_json(prompt, StringResponseModel)
+            domain_model = self.json_generator.generate_json(prompt, StringResponseModel, task=LlmTask.EXTRACT)
             return domain_model.response
         except Exception as e:
             logging.error(f"Failed to extract domain: {e}")
@@ -553,7 +601,7 @@ class PaperAdder:
         )
         
         try:
-            response_model = self.json_generator.generate_json(prompt, DictResponseModel)
+            response_model = self.json_generator.generate_json(prompt, DictResponseModel, task=LlmTask.EXTRACT)
             response = response_model.data
             feature_values = response.get("feature_values", {})
             
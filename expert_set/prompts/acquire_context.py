@@ -1,7 +1,9 @@
 import json
 from typing import Dict, Optional, Type
 
-from pydantic import BaseModel, create_model
+from pydantic import BaseModel
+
+from entities.model_registry import dynamic_model
 from ..models import ExpertDescription
 
 
@@ -17,13 +19,13 @@ def create_answers_model(experts: Dict[str, ExpertDescription]) -> Type[BaseMode
     Dynamically create a Pydantic model with one field per expert.
     Each field is named after the expert key and has type ExpertAnswerModel.
     """
-    # Prepare fields for create_model
+    # Prepare fields for dynamic_model
     model_fields = {
         expert_key: (ExpertAnswerModel, ...) for expert_key in experts.keys()
     }
 
     # Create dynamic model class
-    AnswersModel = create_model("AnswersModel", **model_fields, __base__=BaseModel)
+    AnswersModel = dynamic_model("AnswersModel", **model_fields, __base__=BaseModel)
     return AnswersModel
 
 
@@ -1,6 +1,8 @@
 import json
 from typing import Dict, Type
-from pydantic import BaseModel, create_model
+from pydantic import BaseModel
+
+from entities.model_registry import dynamic_model, json_schema
 
 from ..models import ExpertDescription
 from .pick_action import ExpertPresentation
@@ -21,15 +23,15 @@ def create_answer_model(experts: Dict[str, ExpertDescription]) -> Type[BaseModel
     Dynamically create a Pydantic model with one field per expert.
     Each field is named after the expert key and has type ExpertQuestion.
     """
-    # Prepare fields for create_model
+    # Prepare fields for dynamic_model
     interventions = {expert_key: (ExpertQuestion, ...) for expert_key in experts.keys()}
 
     # Create dynamic model class
-    InterventionsModel = create_model(
+    InterventionsModel = dynamic_model(
         "InterventionsModel", **interventions, __base__=BaseModel
     )
 
-    AnswerModel = create_model(
+    AnswerModel = dynamic_model(
         "AnswerModel",
         expert_interventions=(InterventionsModel, ...),
         questions_summary=(str, ...),
@@ -46,7 +48,7 @@ def questions_prompt(
     thesis_thoughts: str,
 ) -> str:
     expert_presentation_model_str = json.dumps(
-        [{"expert_id": ExpertPresentation.model_json_schema()}], indent=2
+        [{"expert_id": json_schema(ExpertPresentation)}], indent=2
     )
 
     expert_strs = json.dumps(
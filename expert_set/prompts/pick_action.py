@@ -1,6 +1,8 @@
 import json
 from typing import Dict, List, Type
-from pydantic import BaseModel, Field, create_model
+from pydantic import BaseModel, Field
+
+from entities.model_registry import dynamic_model, json_schema, schema_json
 
 from expert_set.models.round_action import RoundAction
 
@@ -41,13 +43,13 @@ def create_answers_model(experts: Dict[str, ExpertDescription]) -> Type[BaseMode
     Dynamically create a Pydantic model with one field per expert.
     Each field is named after the expert key and has type ExpertIntervention.
     """
-    # Prepare fields for create_model
+    # Prepare fields for dynamic_model
     model_fields = {
         expert_key: (ExpertIntervention, ...) for expert_key in experts.keys()
     }
 
     # Create dynamic model class
-    InterventionsModel = create_model(
+    InterventionsModel = dynamic_model(
         "InterventionsModel", **model_fields, __base__=BaseModel
     )
     return InterventionsModel
@@ -60,7 +62,7 @@ def pick_action_prompt(
     thesis_thoughts: str,
 ) -> str:
     expert_presentation_model_str = json.dumps(
-        [{"expert_id": ExpertPresentation.model_json_schema()}], indent=2
+        [{"expert_id": json_schema(ExpertPresentation)}], indent=2
     )
 
     expert_strs = json.dumps(
@@ -118,7 +120,7 @@ is to summarize the process the experts went through to make a decision on what
 of the interaction, the chosen action and the general rationale as to why it was chosen, based on the proceedings, output
 a json object containing a summary with the following schema:
 
-{json.dumps(SummaryAnswerModel.model_json_schema(), indent=2)}
+{schema_json(SummaryAnswerModel, indent=2)}
 
 The process of decision making is as follows
 
@@ -2,6 +2,8 @@ from typing import List
 from pydantic import BaseModel, Field
 import json
 
+from entities.model_registry import dynamic_model, json_schema, schema_json
+
 from ..models import ExpertDescription
 from .pick_action import ExpertPresentation
 
@@ -29,13 +31,13 @@ def create_removal_answers_model(experts: dict[str, ExpertDescription]) -> type[
     Dynamically create a Pydantic model with one field per expert.
     Each field is named after the expert key and has type DocumentRemovalIntervention.
     """
-    # Prepare fields for create_model
+    # Prepare fields for dynamic_model
     model_fields = {
         expert_key: (DocumentRemovalIntervention, ...) for expert_key in experts.keys()
     }
 
     # Create dynamic model class
-    RemovalInterventionsModel = create_model(
+    RemovalInterventionsModel = dynamic_model(
         "RemovalInterventionsModel", **model_fields, __base__=BaseModel
     )
     return RemovalInterventionsModel
@@ -48,7 +50,7 @@ def remove_document_prompt(
     thesis_thoughts: str,
 ) -> str:
     expert_presentation_model_str = json.dumps(
-        [{"expert_id": ExpertPresentation.model_json_schema()}], indent=2
+        [{"expert_id": json_schema(ExpertPresentation)}], indent=2
     )
 
     expert_strs = json.dumps(
@@ -92,7 +94,7 @@ the process the experts went through to make their decisions. You are expected t
 the documents chosen for removal, and the general rationale as to why they were chosen, based on the proceedings.
 
 Output a json object containing a summary with the following schema:
-{json.dumps(SummaryAnswerModel.model_json_schema(), indent=2)}
+{schema_json(SummaryAnswerModel, indent=2)}
 
 The process of decision making is as follows:
 
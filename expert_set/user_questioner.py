@@ -2,7 +2,8 @@ from typing import Dict, List, Tuple
 from pydantic import BaseModel
 
 from board.board import Board
-from entities.sota_table import sota_table_to_markdown
+from entities.sota_table import sota_table_to_dataframe
+from entities.llm_task import LlmTask
 
 from .action_picker import PickActionResult
 from .prompts.ask_questions import (
@@ -12,6 +13,7 @@ from .prompts.ask_questions import (
 )
 from .models import Expert, ExpertDescription
 from .interfaces import JsonGenerator, UserQuerier
+from .utils.prompt_budget import PromptBudgeter
 
 
 class UserQuestioner:
@@ -35,9 +37,15 @@ class UserQuestioner:
         """
         self.json_generator = json_generator
         self.user_querier = user_querier
-        self.sota_table_md = sota_table_to_markdown(board.sota_table)
-        self.thesis_thoughts = self._display_thoughts(board.thesis_knowledge.thoughts)
+        # The table and the thoughts grow every round, they are kept within token budgets
+        self.budgeter = PromptBudgeter()
         self.thesis_description = board.thesis_knowledge.description
+        self.sota_table_section = self.budgeter.table_section(
+            sota_table_to_dataframe(board.sota_table), self.thesis_description
+        )
+        self.thoughts_section = self.budgeter.thoughts_section(
+            board.thesis_knowledge.thoughts, self._display_thoughts
+        )
         self.expert_presentations = pick_action_result.expert_presentations
         self.board = board
 
@@ -57,14 +65,16 @@ class UserQuestioner:
         expert_descriptions = self._extract_descriptions_from_id_dict(id_to_expert)
 
         answer_model = create_answer_model(expert_descriptions)
-        prompt = questions_prompt(
-            self.expert_presentations,
-            self.sota_table_md,
-            self.thesis_description,
-            self.thesis_thoughts,
+        prompt = self.budgeter.fit(
+            "ask_questions",
+            questions_prompt,
+            presentations=self.expert_presentations,
+            thesis_desc=self.thesis_description,
+            thesis_thoughts=self.thoughts_section,
+            sota_table_md=self.sota_table_section,
         )
 
-        questions_answer = self.json_generator.generate_json(prompt, answer_model)
+        questions_answer = self.json_generator.generate_json(prompt, answer_model, task=LlmTask.DECIDE)
         questions_summary = self._parse_answer_and_extract_questions(questions_answer)
         user_answers = self.user_querier.expert_set_query_user(questions_summary)
 
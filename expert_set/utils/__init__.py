@@ -1,9 +1,16 @@
-from .text_chunking import chunk_text
+from .text_chunking import chunk_text, chunk_spans, iter_chunk_spans, TextSpan
 from .document_chunking import chunk_document
+from .prompt_budget import PromptBudgeter, SectionCut, Shrinkable
 
 __all__ = [
     "chunk_text",
-    "chunk_document"
+    "chunk_spans",
+    "iter_chunk_spans",
+    "TextSpan",
+    "chunk_document",
+    "PromptBudgeter",
+    "Shrinkable",
+    "SectionCut",
 ]
 
 
@@ -1,15 +1,26 @@
 from typing import List
 from entities.document import Document
+from text_processing import ChunkKey, NlpPipeline, get_chunk_cache, pipeline_name
 from ..models import DocumentChunk
-from . import chunk_text
+from .text_chunking import chunk_spans
 
 
-def chunk_document(doc: Document,window_size = 3000) -> List[DocumentChunk]:
-    chunks = chunk_text(doc.content,window_size=window_size)
+def chunk_document(doc: Document,window_size = 3000, overlap: int = 50) -> List[DocumentChunk]:
+    content = doc.content
+    # Token windows only depend on the content, so re-chunking a known document is a cache hit
+    key = ChunkKey.for_document(doc, "expert_set.token_windows/" + pipeline_name(NlpPipeline.TOKENS), window_size, overlap)
+    spans = get_chunk_cache().get_or_compute(key, lambda: chunk_spans(content, window_size=window_size, overlap=overlap))
+
     answ = []
-    for chunk in chunks:
+    for start, end in spans:
         answ.append(
-            DocumentChunk(chunk=chunk, document_title=doc.title, document_id=doc.id)
+            DocumentChunk(
+                chunk=content[start:end],
+                document_title=doc.title,
+                document_id=doc.id,
+                start=start,
+                end=end,
+            )
         )
 
     return answ
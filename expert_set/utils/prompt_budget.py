@@ -0,0 +1,249 @@
+import logging
+import re
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
+
+import pandas as pd
+
+from text_processing import count_tokens
+
+from ..models.expert import ExpertDescription
+
+logger = logging.getLogger(__name__)
+
+_WORDS = re.compile(r"[^\W\d_]{4,}")
+
+
+class SectionCut(NamedTuple):
+    """What the budgeter removed from one section of a prompt."""
+    section: str
+    tokens_before: int
+    tokens_after: int
+    detail: str
+
+
+class Shrinkable(NamedTuple):
+    """A prompt section `PromptBudgeter.fit` may shrink: its value, and how to render it within a token budget."""
+    value: Any
+    shrink: Callable[[int], Any]
+
+
+class PromptBudgeter:
+    """
+    Keeps the sections that grow with the rounds of the expert set (SOTA table, thesis thoughts,
+    retrieved excerpts) within per-section token budgets, so prompt size, latency and cost stay
+    flat as the board grows. Sections within budget are rendered exactly as before.
+    Table rows are selected by relevance to a query, thoughts by recency, free text is truncated.
+    `fit` then enforces the budget of the whole prompt by shrinking its sections further.
+    Every cut is recorded in `cuts` and logged.
+    """
+
+    DEFAULT_BUDGETS: Dict[str, int] = {
+        "sota_table": 6000,
+        "thoughts": 1500,
+        "excerpt": 600,
+        "excerpts": 2400,
+        "expert_description": 400,
+        "prompt": 16000,
+    }
+
+    # Longest table cell kept when the table is over budget, in characters
+    MAX_CELL_CHARS = 300
+    # Shorter and shorter cell lengths tried when every row of an over-budget table must be kept
+    CELL_CHARS_STEPS = (300, 150, 80, 40, 20)
+
+    def __init__(self, budgets: Optional[Dict[str, int]] = None):
+        """
+        Args:
+            budgets: Token budgets overriding DEFAULT_BUDGETS, by section name. "prompt" is the
+                budget of a whole prompt, enforced by `fit`.
+        """
+        self.budgets = {**self.DEFAULT_BUDGETS, **(budgets or {})}
+        self.cuts: List[SectionCut] = []
+
+    def sota_table(self, df: pd.DataFrame, query: str = "", keep_all_rows: bool = False, budget: Optional[int] = None) -> str:
+        """
+        Markdown of a SOTA table within the "sota_table" budget. Over budget, long cells are
+        shortened, then the rows sharing the most words with `query` are kept, in table order.
+
+        Args:
+            df: The table, e.g. from `sota_table_to_dataframe`.
+            query: Text the kept rows should be relevant to, e.g. the thesis description.
+            keep_all_rows: Only shorten cells, never drop rows, e.g. when the prompt is about choosing
+                rows to remove, which are the least relevant ones. The table may then stay over budget.
+            budget: Token budget overriding the "sota_table" one.
+
+        Returns:
+            The markdown table.
+        """
+        budget = budget if budget is not None else self.budgets["sota_table"]
+        markdown = df.to_markdown(index=False)
+        before = count_tokens(markdown)
+        if before <= budget or df.empty:
+            return markdown
+
+        if keep_all_rows:
+            for max_chars in self.CELL_CHARS_STEPS:
+                markdown = df.map(lambda value: self._shorten_cell(value, max_chars)).to_markdown(index=False)
+                if count_tokens(markdown) <= budget:
+                    break
+            self._record("sota_table", before, count_tokens(markdown), f"kept all {len(df)} rows, cells cut to {max_chars} characters")
+            return markdown
+
+        df = df.map(self._shorten_cell)
+        rows = [count_tokens(" | ".join(str(v) for v in row)) for row in df.itertuples(index=False)]
+        header = count_tokens(" | ".join(str(c) for c in df.columns)) * 2
+        query_words = self._words(query)
+        ranking = sorted(
+            range(len(df)),
+            key=lambda i: -len(query_words & self._words(" ".join(str(v) for v in df.iloc[i]))),
+        )
+        kept, used = [], header
+        for i in ranking:
+            if used + rows[i] > budget and kept:
+                continue
+            kept.append(i)
+            used += rows[i]
+        # The row estimate ignores the markdown padding, drop the least relevant rows until it fits
+        while True:
+            markdown = df.iloc[sorted(kept)].to_markdown(index=False)
+            if count_tokens(markdown) <= budget or len(kept) == 1:
+                break
+            kept.pop()
+        self._record("sota_table", before, count_tokens(markdown), f"kept {len(kept)} of {len(df)} rows")
+        return markdown
+
+    def table_section(self, df: pd.DataFrame, query: str = "", keep_all_rows: bool = False) -> Shrinkable:
+        """The SOTA table section of a prompt: the table within its budget, that `fit` may shrink further."""
+        return Shrinkable(
+            self.sota_table(df, query, keep_all_rows),
+            lambda budget: self.sota_table(df, query, keep_all_rows, budget),
+        )
+
+    def thoughts_section(self, thoughts: List[str], display: Callable[[List[str]], Any] = list) -> Shrinkable:
+        """The thoughts section of a prompt, rendered by `display`, that `fit` may shrink further."""
+        return Shrinkable(
+            display(self.thoughts(thoughts)),
+            lambda budget: display(self.thoughts(thoughts, budget)),
+        )
+
+    def thoughts(self, thoughts: List[str], budget: Optional[int] = None) -> List[str]:
+        """
+        The most recent thoughts within the "thoughts" budget (or `budget`), oldest first, preceded
+        by a note on how many earlier ones were left out.
+        """
+        budget = budget if budget is not None else self.budgets["thoughts"]
+        costs = [count_tokens(thought) + 2 for thought in thoughts]
+        before = sum(costs)
+        if before <= budget:
+            return list(thoughts)
+        kept, used = 0, 0
+        for cost in reversed(costs):
+            if used + cost > budget and kept:
+                break
+            kept += 1
+            used += cost
+        omitted = len(thoughts) - kept
+        self._record("thoughts", before, used, f"kept the {kept} most recent of {len(thoughts)} thoughts")
+        return [f"({omitted} earlier thoughts omitted)"] + list(thoughts[omitted:])
+
+    def text(self, section: str, text: str, budget: Optional[int] = None) -> str:
+        """Text cut at the budget of its section (or `budget`), e.g. "excerpt", marked with " [...]" when cut."""
+        budget = budget if budget is not None else self.budgets[section]
+        before = count_tokens(text)
+        if before <= budget:
+            return text
+        # Longest prefix that fits with the marker, by bisection over its length in characters
+        budget = max(0, budget - count_tokens(" [...]"))
+        low, high = 0, len(text)
+        while low < high:
+            middle = (low + high + 1) // 2
+            if count_tokens(text[:middle]) <= budget:
+                low = middle
+            else:
+                high = middle - 1
+        cut = text[:low].rstrip() + " [...]"
+        self._record(section, before, count_tokens(cut), f"truncated to {low} of {len(text)} characters")
+        return cut
+
+    def excerpts(self, excerpts: List[str]) -> List[str]:
+        """The first excerpts within the "excerpts" budget, e.g. those one expert brings to a prompt."""
+        budget = self.budgets["excerpts"]
+        costs = [count_tokens(excerpt) for excerpt in excerpts]
+        kept, used = 0, 0
+        for cost in costs:
+            if used + cost > budget and kept:
+                break
+            kept += 1
+            used += cost
+        if kept < len(excerpts):
+            self._record("excerpts", sum(costs), used, f"kept {kept} of {len(excerpts)} excerpts")
+        return excerpts[:kept]
+
+    def expert(self, description: ExpertDescription) -> ExpertDescription:
+        """An expert description whose text is within the "expert_description" budget."""
+        text = self.text("expert_description", description.description)
+        if text is description.description:
+            return description
+        return description.model_copy(update={"description": text})
+
+    def fit(self, name: str, render: Callable[..., str], **sections: Any) -> str:
+        """
+        Render a prompt within the "prompt" budget. Sections given as Shrinkable are shrunk by what
+        the prompt is over budget, in the order they are given (most expendable first), until it fits.
+        The other sections are rendered as given: instructions and schemas cannot be cut without
+        breaking the request, expert descriptions and excerpts have budgets of their own. A prompt
+        still over budget once every shrinkable section has been shrunk is sent with a warning.
+
+        Args:
+            name: Name of the prompt, for the logs.
+            render: Builds the prompt from the sections, passed as keyword arguments.
+            sections: Arguments of `render`, Shrinkable for those that may be shrunk.
+
+        Returns:
+            The prompt.
+        """
+        budget = self.budgets["prompt"]
+        values = {key: value.value if isinstance(value, Shrinkable) else value for key, value in sections.items()}
+        prompt = render(**values)
+        for key, section in sections.items():
+            excess = count_tokens(prompt) - budget
+            if excess <= 0:
+                return prompt
+            if not isinstance(section, Shrinkable):
+                continue
+            values[key] = section.shrink(max(0, self._tokens(values[key]) - excess))
+            prompt = render(**values)
+        tokens = count_tokens(prompt)
+        if tokens > budget:
+            logger.warning("Prompt %s has %d tokens, over its budget of %d after shrinking its sections", name, tokens, budget)
+        return prompt
+
+    def report(self) -> str:
+        """
+        :return: One line per cut made so far
+        """
+        return "\n".join(
+            f"{cut.section}: {cut.tokens_before} -> {cut.tokens_after} tokens, {cut.detail}"
+            for cut in self.cuts
+        )
+
+    def _record(self, section: str, before: int, after: int, detail: str) -> None:
+        cut = SectionCut(section, before, after, detail)
+        self.cuts.append(cut)
+        logger.info("Prompt budget cut %s: %d -> %d tokens, %s", section, before, after, detail)
+
+    def _shorten_cell(self, value, max_chars: Optional[int] = None):
+        max_chars = max_chars or self.MAX_CELL_CHARS
+        if isinstance(value, str) and len(value) > max_chars:
+            return value[:max_chars].rstrip() + "..."
+        return value
+
+    @staticmethod
+    def _tokens(value: Any) -> int:
+        if isinstance(value, (list, tuple)):
+            return sum(count_tokens(str(item)) + 2 for item in value)
+        return count_tokens(str(value))
+
+    @staticmethod
+    def _words(text: str) -> set:
+        return {word.lower() for word in _WORDS.findall(text)}
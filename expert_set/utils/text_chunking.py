@@ -1,42 +1,70 @@
-import spacy
-from typing import List
+from typing import Iterator, List, NamedTuple
 
-# Load spaCy with only the tokenizer enabled
-nlp = spacy.load(
-    "en_core_web_sm",
-    disable=["parser", "tagger", "ner", "lemmatizer", "attribute_ruler"],
-)
+from text_processing import NlpPipeline, get_nlp
 
 
-def chunk_text(text: str, window_size: int = 3000, overlap: int = 50) -> List[str]:
+class TextSpan(NamedTuple):
+    """A chunk as a character range of the original text."""
+    start: int
+    end: int
+
+
+def iter_chunk_spans(text: str, window_size: int = 3000, overlap: int = 50) -> Iterator[TextSpan]:
     """
-    Split text into overlapping token chunks.
+    Split text into overlapping token windows, yielding only their character offsets.
+    Consumers that need the chunk text slice it from the original string.
 
     Args:
         text (str): The input text to be chunked.
         window_size (int): Number of tokens per chunk.
         overlap (int): Number of overlapping tokens between chunks.
 
-    Returns:
-        List[str]: A list of chunked text strings.
+    Yields:
+        TextSpan: the character range of each chunk, from its first token to the end of its last one.
     """
     if window_size <= 0:
         raise ValueError("window_size must be greater than 0")
     if overlap < 0 or overlap >= window_size:
         raise ValueError("overlap must be in range [0, window_size)")
 
-    doc = nlp(text)
-    tokens = [token.text for token in doc]
-    chunks = []
+    doc = get_nlp(NlpPipeline.TOKENS)(text)
+    n_tokens = len(doc)
 
     step = window_size - overlap
-    for start in range(0, len(tokens), step):
-        end = start + window_size
-        chunk = tokens[start:end]
-        if chunk:
-            chunks.append(" ".join(chunk))
+    for start in range(0, n_tokens, step):
+        end = min(start + window_size, n_tokens)
+        last = doc[end - 1]
+        yield TextSpan(doc[start].idx, last.idx + len(last))
 
-        if end >= len(tokens):
+        if end >= n_tokens:
             break
 
-    return chunks
+
+def chunk_spans(text: str, window_size: int = 3000, overlap: int = 50) -> List[TextSpan]:
+    """
+    Split text into overlapping token chunks, as character ranges of the text.
+
+    Args:
+        text (str): The input text to be chunked.
+        window_size (int): Number of tokens per chunk.
+        overlap (int): Number of overlapping tokens between chunks.
+
+    Returns:
+        List[TextSpan]: A list of chunk spans.
+    """
+    return list(iter_chunk_spans(text, window_size=window_size, overlap=overlap))
+
+
+def chunk_text(text: str, window_size: int = 3000, overlap: int = 50) -> List[str]:
+    """
+    Split text into overlapping token chunks.
+
+    Args:
+        text (str): The input text to be chunked.
+        window_size (int): Number of tokens per chunk.
+        overlap (int): Number of overlapping tokens between chunks.
+
+    Returns:
+        List[str]: A list of chunked text strings, sliced from the original text.
+    """
+    return [text[span.start:span.end] for span in iter_chunk_spans(text, window_size=window_size, overlap=overlap)]
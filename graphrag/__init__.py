@@ -1,6 +1,12 @@
 from .graphrag import GraphRag
+from .knowledge_graph import KnowledgeGraph, KnowledgeGraphFactory, InMemoryKnowledgeGraphFactory
+from .sqlite_knowledge_graph import SqliteKnowledgeGraph, SqliteKnowledgeGraphFactory
 
 __all__ = [
     "GraphRag",
+    "KnowledgeGraph",
+    "KnowledgeGraphFactory",
+    "InMemoryKnowledgeGraphFactory",
+    "SqliteKnowledgeGraph",
+    "SqliteKnowledgeGraphFactory",
 ]
-
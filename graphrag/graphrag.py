@@ -1,5 +1,9 @@
+import asyncio
+import contextvars
+import logging
 import random
-from typing import List, Tuple, Any, Dict
+import weakref
+from typing import Awaitable, Callable, List, Optional, Tuple, Any, Dict, TypeVar
 from pydantic import BaseModel, Field
 
 from tqdm import tqdm
@@ -10,11 +14,14 @@ from networkx.algorithms.community import louvain_communities
 import re
 from collections import defaultdict
 import concurrent.futures
+import numpy as np
 
 from entities.document import Document
+from entities.llm_task import LlmTask
 from graphrag.interfaces.json_generator import JsonGenerator
+from graphrag.interfaces.batch_json_generator import BatchJsonGenerator
 from graphrag.interfaces.text_embedder import TextEmbedder
-from graphrag.knowledge_graph import KnowledgeGraph
+from graphrag.knowledge_graph import KnowledgeGraph, KnowledgeGraphFactory, InMemoryKnowledgeGraphFactory
 from graphrag.prompts.extract_graph import initial_extract_graph_prompt
 from graphrag.prompts.extract_claims import extract_claims_prompt
 from graphrag.prompts.summary_descriptions import summary_descriptions_prompt
@@ -24,7 +31,11 @@ from graphrag.models.summary_community import SummaryCommunityModel
 from graphrag.models.text_unit import TextUnit
 from graphrag.models.claim_list import ClaimListModel
 from graphrag.utils.community_selector import CommunitySelector
-from graphrag.utils.text_chunking import chunk_document
+from graphrag.utils.text_chunking import atexts_to_text_units, chunk_document, texts_to_text_units
+from graphrag.utils.chunking_service import ChunkBatch, ChunkingService, get_chunking_service
+from graphrag.utils.matryoshka import coarse_shortlist, normalized_prefix, two_stage_search
+from text_processing import count_tokens
+from telemetry import span
 from graphrag.models.graph_types import Entity, Relationship, Claim, EntityType, Community, CommunityReport
 from graphrag.models.summary_description import SummaryDescriptionModel
 
@@ -34,15 +45,31 @@ from graphrag.models.follow_up_questions_model import FollowUpQuestionsModel
 from graphrag.models.local_search_model import LocalSearchModel
 from graphrag.models.final_response_model import FinalResponseModel
 
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
 
 class GraphRag:
     """
     Builds a Graph-RAG from a collection of documents, following the GraphRAG Knowledge Model workflow.
     """
-    def __init__(self, text_embedder: TextEmbedder, json_generator: JsonGenerator, small_json_generator: JsonGenerator = None,max_tokens: int = 3000, overlap_tokens: int = 50, low_consume: bool = True, use_rag: bool = True):
+    _UNION_SEPARATOR = "\n"*3 + "#"*30 + "\n"*3
+    # Threads fanning out LLM calls. Only an upper bound: the providers' adaptive concurrency
+    # limiters decide how many requests are actually in flight, the other threads wait at the gate
+    LLM_WORKERS = 64
+
+    def __init__(self, text_embedder: TextEmbedder, json_generator: JsonGenerator, small_json_generator: JsonGenerator = None,max_tokens: int = 3000, overlap_tokens: int = 50, low_consume: bool = True, use_rag: bool = True, knowledge_graph_factory: KnowledgeGraphFactory = None, chunking_service: ChunkingService = None, search_dims: Optional[int] = None, shortlist_factor: int = 10):
         """
         Initializes the GraphRAGBuilder with the necessary components.
+        The knowledge graph factory selects the storage backend, in-memory by default.
+        The chunking service splits documents on worker processes, by default the service shared by every GraphRag.
+        With `search_dims`, retrieval first scans the first `search_dims` dimensions of the stored
+        (Matryoshka) embeddings and reranks `shortlist_factor` times the requested results exactly
+        at full dimension, otherwise every embedding is scored at full dimension.
         """
+        self.knowledge_graph_factory = knowledge_graph_factory or InMemoryKnowledgeGraphFactory()
+        self.chunking_service = chunking_service or get_chunking_service()
         self.text_embedder = text_embedder
         self.json_generator = json_generator
         self.small_json_generator = small_json_generator
@@ -50,27 +77,21 @@ class GraphRag:
         self.overlap_tokens = overlap_tokens
         self.low_consume = low_consume
         self.use_rag = use_rag
+        self.search_dims = search_dims
+        self.shortlist_factor = shortlist_factor
+        # Normalized embedding prefixes of each knowledge graph, for the coarse retrieval pass
+        self._prefix_cache: "weakref.WeakKeyDictionary[KnowledgeGraph, Dict[str, Tuple[Any, np.ndarray]]]" = weakref.WeakKeyDictionary()
 
     def build_knowledge_graph(self, documents: List[Document]) -> KnowledgeGraph:
-        kg = KnowledgeGraph(documents=documents)
+        kg = self.knowledge_graph_factory.create_knowledge_graph(documents)
 
         #==============================================================================================================================
-        # Phase 1: Compose TextUnits using threads
-        def process_document(doc):
-            text_units: List[TextUnit] = self._chunk_document(doc, max_tokens=self.max_tokens, overlap_tokens=self.overlap_tokens)
-            return text_units
-
+        # Phase 1: Compose TextUnits, chunking on worker processes and embedding on threads
         from tqdm import tqdm
-        all_text_units = []
-        with concurrent.futures.ThreadPoolExecutor(max_workers=20) as executor:
-            future_to_doc = {executor.submit(process_document, doc): doc for doc in documents}
-            for future in tqdm(concurrent.futures.as_completed(future_to_doc), total=len(documents), desc="Processing documents"):
-                text_units = future.result()
-                all_text_units.extend(text_units)
-                
+        all_text_units = self._compose_text_units(documents, desc="Processing documents")
+
         # Add all text units to the knowledge graph
-        for tu in all_text_units:
-            kg.add_text_unit(tu)
+        kg.add_text_units(all_text_units)
         #==============================================================================================================================      
         # Phase 2: Graph Extraction (Entities, Relationships, Covariates)
         all_entities: List[Entity] = []
@@ -78,101 +99,134 @@ class GraphRag:
         textunit_entities: Dict[str, List[Entity]] = {}
 
         if self.low_consume:
-            tu_union: TextUnit = None
-            for idx, tu in enumerate(tqdm(kg.text_units, desc="Extracting entities/relationships"), 1):
-                if tu_union is None:
-                    tu_union = tu
-
-                if tu_union.number_tokens + tu.number_tokens < self.max_tokens-100 and idx != len(kg.text_units):
-                    tu_union.text += "\n"*3 + "#"*30 + "\n"*3 + tu.text
-                    tu_union.number_tokens += tu.number_tokens+50
-                else:
-                    entities, relationships = self.extract_entities_and_relationships_from_textunit(tu_union)
-                    all_entities.extend(entities)
-                    all_relationships.extend(relationships)
-                    # Save entities for this textunit_id (if tu_union has id)
-                    
-                    textunit_entities[tu_union.unit_id] = entities
-                    tu_union = None
+            for tu_union in tqdm(self._pack_text_units(all_text_units), desc="Extracting entities/relationships"):
+                entities, relationships = self.extract_entities_and_relationships_from_textunit(tu_union)
+                all_entities.extend(entities)
+                all_relationships.extend(relationships)
+                # Save entities for this textunit_id (the union has the id of its first text unit)
+                textunit_entities[tu_union.unit_id] = entities
         else:
-            with concurrent.futures.ThreadPoolExecutor(max_workers=20) as executor:
+            with concurrent.futures.ThreadPoolExecutor(max_workers=self.LLM_WORKERS) as executor:
                 future_to_tu = {
-                    executor.submit(self.extract_entities_and_relationships_from_textunit, tu): tu
-                    for tu in kg.text_units
+                    executor.submit(contextvars.copy_context().run, self.extract_entities_and_relationships_from_textunit, tu): tu
+                    for tu in all_text_units
                 }
-                for idx, future in enumerate(tqdm(concurrent.futures.as_completed(future_to_tu), total=len(kg.text_units), desc="Extracting entities/relationships (multi-threaded)"), 1):
+                for idx, future in enumerate(tqdm(concurrent.futures.as_completed(future_to_tu), total=len(all_text_units), desc="Extracting entities/relationships (multi-threaded)"), 1):
                     tu = future_to_tu[future]
                     entities, relationships = future.result()
                     all_entities.extend(entities)
                     all_relationships.extend(relationships)
                     textunit_entities[tu.unit_id] = entities
         print("Finished extracting entities/relationships.")
-        merged_entities: Dict[str, Tuple[EntityType,List[str]]] = {}
-        entity_type_map: Dict[EntityType, List[str]] = {}
-        from tqdm import tqdm
-        for ent in tqdm(all_entities, desc="Merging entities"):
-            key = ent.name
-            if key not in merged_entities:
-                merged_entities[key] = (ent.type, [ent.description])
-            else:
-                merged_entities[key][1].append(ent.description)
-            if ent.type not in entity_type_map:
-                entity_type_map[ent.type] = [ent.description]
-            else:
-                entity_type_map[ent.type].append(ent.description)
+        merged_entities, _ = self._merge_entity_descriptions(all_entities)
         # entities_for_claims: List[Entity] = [Entity(name=name, type=type_, description="") for name, (type_, _) in merged_entities.items()]
         # for tu in kg.text_units:
         #     covariates = self.extract_covariates_from_textunit(tu, entities_for_claims)
         #     for cov in covariates:
         #         kg.add_covariate(cov)
 
-        summarized_entities: List[Entity] = []
-        for name, (type_, descriptions) in tqdm(merged_entities.items(), desc="Summarizing entities"):
-            summary: str = self.summary_descriptions(descriptions)
-            entity = Entity(name=name, type=type_, description=summary)
-            summarized_entities.append(entity)
+        entity_summaries = self._summary_descriptions_all(
+            [descriptions for _, descriptions in merged_entities.values()], desc="Summarizing entities"
+        )
+        summarized_entities: List[Entity] = [
+            Entity(name=name, type=type_, description=summary)
+            for (name, (type_, _)), summary in zip(merged_entities.items(), entity_summaries)
+        ]
+
+        merged_relationships = self._merge_relationship_descriptions(all_relationships)
+        relationship_summaries = self._summary_descriptions_all(
+            list(merged_relationships.values()), desc="Summarizing relationships"
+        )
+        summarized_relationships: List[Relationship] = [
+            Relationship(source=source, target=target, description=summary)
+            for (source, target), summary in zip(merged_relationships.keys(), relationship_summaries)
+        ]
+
+        with kg.transaction():
+            kg.add_entities(summarized_entities)
+            for textunit_id, entities in textunit_entities.items():
+                kg.add_textunits_entities(textunit_id, entities)
+            kg.add_relationships(summarized_relationships)
+        #==============================================================================================================================
+        # Phase 3: Graph Augmentation (Community Detection)
+        communities = self.detect_communities(kg)
+        with kg.transaction():
+            for comm in communities:
+                kg.add_community(comm)
+        #==============================================================================================================================
+        # # Phase 4: Community Summarization
+        self._attach_community_reports(communities, kg)
+        #==============================================================================================================================
 
-        summarized_entities_types: Dict[EntityType, str] = {}
-        for type_, descriptions in tqdm(entity_type_map.items(), desc="Summarizing entity types"):
-            summary = self.summary_descriptions(descriptions)
-            summarized_entities_types[type_] = summary
+        return kg
 
-        for entity in summarized_entities:
-            kg.add_entity(entity)
+    async def abuild_knowledge_graph(self, documents: List[Document], max_in_flight: int = 256) -> KnowledgeGraph:
+        """
+        Asynchronous `build_knowledge_graph`. Embedding and LLM requests are awaited on the event loop
+        instead of being spread over thread pools, with at most `max_in_flight` of them pending at once
+        under a single semaphore. Chunking still runs on the chunking service's worker processes.
 
-        for textunit_id, entities in textunit_entities.items():
-            kg.add_textunits_entities(textunit_id, entities)
+        Args:
+            documents (List[Document]): Documents to build the knowledge graph from.
+            max_in_flight (int): Maximum number of provider requests pending at the same time.
+
+        Returns:
+            KnowledgeGraph: the built knowledge graph.
+        """
+        gate = asyncio.Semaphore(max_in_flight)
+
+        async def limited(request: Awaitable[T]) -> T:
+            async with gate:
+                return await request
+
+        kg = self.knowledge_graph_factory.create_knowledge_graph(documents)
 
-        merged_relationships: Dict[Tuple[str, str], List[str]] = {}
-        for rel in tqdm(all_relationships, desc="Merging relationships"):
-            key = (rel.source, rel.target)
-            if key not in merged_relationships:
-                merged_relationships[key] = [rel.description]
-            else:
-                merged_relationships[key].append(rel.description)
-        summarized_relationships: List[Relationship] = []
-        for (source, target), descriptions in tqdm(merged_relationships.items(), desc="Summarizing relationships"):
-            summary = self.summary_descriptions(descriptions)
-            summarized_relationships.append(Relationship(source=source, target=target, description=summary))
-        for rel in summarized_relationships:
-            kg.add_relationship(rel)
         #==============================================================================================================================
-        # Phase 3: Graph Augmentation (Community Detection)
-        communities = self.detect_communities(kg)
-        for comm in communities:
-            kg.add_community(comm)
+        # Phase 1: Compose TextUnits, chunking on worker processes and embedding on the event loop
+        all_text_units = await self._acompose_text_units(documents, limited)
+        kg.add_text_units(all_text_units)
         #==============================================================================================================================
-        # # Phase 4: Community Summarization
-        with concurrent.futures.ThreadPoolExecutor(max_workers=20) as executor:
-            future_to_comm = {
-                executor.submit(self.summarize_community, comm, kg): comm
-                for comm in kg.communities
-            }
-            for future in concurrent.futures.as_completed(future_to_comm):
-                comm = future_to_comm[future]
-                report = future.result()
-                comm.report = report
-                kg.add_community_report(report)
+        # Phase 2: Graph Extraction (Entities, Relationships)
+        units = self._pack_text_units(all_text_units) if self.low_consume else all_text_units
+        extractions = await asyncio.gather(*(limited(self.aextract_entities_and_relationships_from_textunit(tu)) for tu in units))
+        all_entities: List[Entity] = []
+        all_relationships: List[Relationship] = []
+        textunit_entities: Dict[str, List[Entity]] = {}
+        for tu, (entities, relationships) in zip(units, extractions):
+            all_entities.extend(entities)
+            all_relationships.extend(relationships)
+            textunit_entities[tu.unit_id] = entities
+        print("Finished extracting entities/relationships.")
+
+        merged_entities, _ = self._merge_entity_descriptions(all_entities)
+        merged_relationships = self._merge_relationship_descriptions(all_relationships)
+        entity_summaries, relationship_summaries = await asyncio.gather(
+            asyncio.gather(*(limited(self.asummary_descriptions(descriptions)) for _, descriptions in merged_entities.values())),
+            asyncio.gather(*(limited(self.asummary_descriptions(descriptions)) for descriptions in merged_relationships.values())),
+        )
+        with kg.transaction():
+            kg.add_entities(
+                Entity(name=name, type=type_, description=summary)
+                for (name, (type_, _)), summary in zip(merged_entities.items(), entity_summaries)
+            )
+            for textunit_id, entities in textunit_entities.items():
+                kg.add_textunits_entities(textunit_id, entities)
+            kg.add_relationships(
+                Relationship(source=source, target=target, description=summary)
+                for (source, target), summary in zip(merged_relationships.keys(), relationship_summaries)
+            )
+        #==============================================================================================================================
+        # Phase 3: Graph Augmentation (Community Detection), off the event loop
+        communities = await asyncio.to_thread(self.detect_communities, kg)
+        with kg.transaction():
+            for comm in communities:
+                kg.add_community(comm)
+        #==============================================================================================================================
+        # Phase 4: Community Summarization
+        reports = await asyncio.gather(*(limited(self.asummarize_community(comm, kg)) for comm in communities))
+        with kg.transaction():
+            for comm, report in zip(communities, reports):
+                kg.attach_community_report(comm, report)
         #==============================================================================================================================
 
         return kg
@@ -183,43 +237,26 @@ class GraphRag:
         """
         for doc in docs:
             kg.add_document(doc)
-        # 1. Chunk new documents and add text units using threads
-        def process_document(doc):
-            return self._chunk_document(doc, max_tokens=self.max_tokens, overlap_tokens=self.overlap_tokens)
-
+        # 1. Chunk new documents and add text units, chunking on worker processes and embedding on threads
         from tqdm import tqdm
-        new_text_units = []
-        with concurrent.futures.ThreadPoolExecutor(max_workers=20) as executor:
-            future_to_doc = {executor.submit(process_document, doc): doc for doc in docs}
-            for future in tqdm(concurrent.futures.as_completed(future_to_doc), total=len(docs), desc="Processing new documents"):
-                tus = future.result()
-                for tu in tus:
-                    kg.add_text_unit(tu)
-                    new_text_units.append(tu)
+        new_text_units = self._compose_text_units(docs, desc="Processing new documents")
+        kg.add_text_units(new_text_units)
 
         # 2. Extract entities and relationships from new text units
         all_entities = []
         all_relationships = []
         textunit_entities = {}
         if self.low_consume:
-            tu_union = None
-            for idx, tu in enumerate(new_text_units, 1):
-                if tu_union is None:
-                    tu_union = tu
-                if tu_union.number_tokens + tu.number_tokens < self.max_tokens-100 and idx != len(new_text_units):
-                    tu_union.text += "\n"*3 + "#"*30 + "\n"*3 + tu.text
-                    tu_union.number_tokens += tu.number_tokens+50
-                else:
-                    entities, relationships = self.extract_entities_and_relationships_from_textunit(tu_union)
-                    all_entities.extend(entities)
-                    all_relationships.extend(relationships)
-                    textunit_entities[tu_union.unit_id] = entities
-                    tu_union = None
+            for tu_union in self._pack_text_units(new_text_units):
+                entities, relationships = self.extract_entities_and_relationships_from_textunit(tu_union)
+                all_entities.extend(entities)
+                all_relationships.extend(relationships)
+                textunit_entities[tu_union.unit_id] = entities
         else:
             print("Updating Entities and Relationships...")
-            with concurrent.futures.ThreadPoolExecutor(max_workers=20) as executor:
+            with concurrent.futures.ThreadPoolExecutor(max_workers=self.LLM_WORKERS) as executor:
                 future_to_tu = {
-                    executor.submit(self.extract_entities_and_relationships_from_textunit, tu): tu
+                    executor.submit(contextvars.copy_context().run, self.extract_entities_and_relationships_from_textunit, tu): tu
                     for tu in new_text_units
                 }
                 for idx, future in enumerate(tqdm(concurrent.futures.as_completed(future_to_tu), total=len(new_text_units), desc="Extracting entities/relationships (multi-threaded)"), 1):
@@ -239,15 +276,15 @@ class GraphRag:
             else:
                 merged_entities[ent.name] = ent
         # Summarize entity descriptions
-        for name, ent in tqdm(merged_entities.items(), desc="Summarizing entities"):
-            descs = ent.description.split('|')
-            if len(descs) > 9:
-                ent.description = self.summary_descriptions(descs)
-        kg.entities = list(merged_entities.values())
-
-        # Update textunit-entity mapping
-        for textunit_id, entities in textunit_entities.items():
-            kg.add_textunits_entities(textunit_id, entities)
+        to_summarize = [ent for ent in merged_entities.values() if len(ent.description.split('|')) > 9]
+        summaries = self._summary_descriptions_all([ent.description.split('|') for ent in to_summarize], desc="Summarizing entities")
+        for ent, summary in zip(to_summarize, summaries):
+            ent.description = summary
+        # Save the merged entities and the textunit-entity mapping together
+        with kg.transaction():
+            kg.replace_entities(list(merged_entities.values()))
+            for textunit_id, entities in textunit_entities.items():
+                kg.add_textunits_entities(textunit_id, entities)
 
         # Merge relationships
         rel_key = lambda r: (r.source, r.target)
@@ -259,33 +296,177 @@ class GraphRag:
             else:
                 merged_relationships[key] = rel
         # Summarize relationship descriptions
-        for rel in tqdm(merged_relationships.values(), desc="Summarizing relationships"):
-            descs = rel.description.split('|')
-            if len(descs) > 9:
-                rel.description = self.summary_descriptions(descs)
-        kg.relationships = list(merged_relationships.values())
+        to_summarize = [rel for rel in merged_relationships.values() if len(rel.description.split('|')) > 9]
+        summaries = self._summary_descriptions_all([rel.description.split('|') for rel in to_summarize], desc="Summarizing relationships")
+        for rel, summary in zip(to_summarize, summaries):
+            rel.description = summary
+        kg.replace_relationships(list(merged_relationships.values()))
 
         # 4. Re-run community detection and summarization
-        kg.communities = []
-        kg.community_reports = []
         communities = self.detect_communities(kg)
-        for comm in communities:
-            kg.add_community(comm)
+        with kg.transaction():
+            kg.clear_communities()
+            for comm in communities:
+                kg.add_community(comm)
         
-        from tqdm import tqdm
-        with concurrent.futures.ThreadPoolExecutor(max_workers=20) as executor:
-            future_to_comm = {
-                executor.submit(self.summarize_community, comm, kg): comm
-                for comm in kg.communities
-            }
-            for future in tqdm(concurrent.futures.as_completed(future_to_comm), total=len(kg.communities), desc="Summarizing communities"):
-                comm = future_to_comm[future]
-                report = future.result()
-                comm.report = report
-                kg.add_community_report(report)
+        self._attach_community_reports(communities, kg, desc="Summarizing communities")
 
         # Optionally, update covariates if needed (not shown here)
 
+    @staticmethod
+    def _merge_entity_descriptions(entities: List[Entity]) -> Tuple[Dict[str, Tuple[EntityType, List[str]]], Dict[EntityType, List[str]]]:
+        """
+        Group the descriptions of extracted entities by entity name and by entity type.
+
+        Returns:
+            Tuple containing:
+            - Type and descriptions of each entity, by name
+            - Descriptions of the entities of each type
+        """
+        merged_entities: Dict[str, Tuple[EntityType, List[str]]] = {}
+        entity_type_map: Dict[EntityType, List[str]] = {}
+        for ent in tqdm(entities, desc="Merging entities"):
+            key = ent.name
+            if key not in merged_entities:
+                merged_entities[key] = (ent.type, [ent.description])
+            else:
+                merged_entities[key][1].append(ent.description)
+            if ent.type not in entity_type_map:
+                entity_type_map[ent.type] = [ent.description]
+            else:
+                entity_type_map[ent.type].append(ent.description)
+        return merged_entities, entity_type_map
+
+    @staticmethod
+    def _merge_relationship_descriptions(relationships: List[Relationship]) -> Dict[Tuple[str, str], List[str]]:
+        """
+        Group the descriptions of extracted relationships by (source, target).
+        """
+        merged_relationships: Dict[Tuple[str, str], List[str]] = {}
+        for rel in tqdm(relationships, desc="Merging relationships"):
+            key = (rel.source, rel.target)
+            if key not in merged_relationships:
+                merged_relationships[key] = [rel.description]
+            else:
+                merged_relationships[key].append(rel.description)
+        return merged_relationships
+
+    def _compose_text_units(self, documents: List[Document], desc: str) -> List[TextUnit]:
+        """
+        Chunk documents with the chunking service and embed their chunks.
+        The chunks of a document are streamed from its content and each batch of them is
+        embedded as soon as it is chunked, while the rest of the documents and of the
+        document itself are still being chunked.
+
+        Args:
+            documents (List[Document]): Documents to chunk.
+            desc (str): Description of the progress bar.
+
+        Returns:
+            List[TextUnit]: text units of every document, in document and chunk order.
+        """
+        futures = []
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.LLM_WORKERS) as executor, tqdm(total=len(documents), desc=desc) as progress:
+            for batch in self.chunking_service.iter_chunks(documents, max_tokens=self.max_tokens, overlap_tokens=self.overlap_tokens):
+                if batch.texts:
+                    futures.append((batch.document, executor.submit(
+                        contextvars.copy_context().run, texts_to_text_units,
+                        self.text_embedder, batch.document.id, batch.texts, batch.spans, batch.position,
+                    )))
+                if batch.last:
+                    progress.update()
+            text_units = []
+            skipped = set()
+            for doc, future in futures:
+                try:
+                    text_units.extend(future.result())
+                except Exception as e:
+                    # The embedder gave up (e.g. a provider outage): the graph is built without the document
+                    if doc.id not in skipped:
+                        logger.warning("Skipping document %s, its chunks could not be embedded: %r", doc.id, e)
+                    skipped.add(doc.id)
+
+        order = {doc.id: i for i, doc in enumerate(documents)}
+        text_units = [tu for tu in text_units if tu.document_id not in skipped]
+        text_units.sort(key=lambda tu: (order[tu.document_id], tu.position))
+        return text_units
+
+    async def _acompose_text_units(self, documents: List[Document], limited: Callable[[Awaitable[List[TextUnit]]], Awaitable[List[TextUnit]]]) -> List[TextUnit]:
+        """
+        Asynchronous `_compose_text_units`. Chunk batches are pulled from the chunking service on
+        a worker thread and each of them is embedded as soon as it is chunked.
+
+        Args:
+            documents (List[Document]): Documents to chunk.
+            limited: Wraps an embedding request so that it waits for a free slot of the shared semaphore.
+
+        Returns:
+            List[TextUnit]: text units of every document, in document and chunk order.
+        """
+        skipped = set()
+
+        async def embed(batch: ChunkBatch) -> List[TextUnit]:
+            try:
+                return await limited(atexts_to_text_units(self.text_embedder, batch.document.id, batch.texts, batch.spans, batch.position))
+            except Exception as e:
+                if batch.document.id not in skipped:
+                    logger.warning("Skipping document %s, its chunks could not be embedded: %r", batch.document.id, e)
+                skipped.add(batch.document.id)
+                return []
+
+        chunked = iter(self.chunking_service.iter_chunks(documents, max_tokens=self.max_tokens, overlap_tokens=self.overlap_tokens))
+        tasks = []
+        while (batch := await asyncio.to_thread(next, chunked, None)) is not None:
+            if batch.texts:
+                tasks.append(asyncio.ensure_future(embed(batch)))
+        text_units = [tu for units in await asyncio.gather(*tasks) for tu in units if tu.document_id not in skipped]
+
+        order = {doc.id: i for i, doc in enumerate(documents)}
+        text_units.sort(key=lambda tu: (order[tu.document_id], tu.position))
+        return text_units
+
+    def _pack_text_units(self, text_units: List[TextUnit]) -> List[TextUnit]:
+        """
+        Merge consecutive text units into unions that fit in `max_tokens`, keeping a margin for
+        the extraction prompt, so low consume mode sends fewer and fuller requests.
+        The stored text units are left untouched, each union has the id of its first text unit.
+
+        Args:
+            text_units (List[TextUnit]): Text units to pack, in order.
+
+        Returns:
+            List[TextUnit]: the unions, a text unit that fits alone is returned as is.
+        """
+        budget = self.max_tokens - 100
+        separator_tokens = count_tokens(self._UNION_SEPARATOR)
+
+        def merge(group: List[TextUnit], number_tokens: int) -> TextUnit:
+            if len(group) == 1:
+                return group[0]
+            first = group[0]
+            return TextUnit(
+                document_id=first.document_id,
+                text=self._UNION_SEPARATOR.join(tu.text for tu in group),
+                unit_id=first.unit_id,
+                position=first.position,
+                number_tokens=number_tokens,
+                embedding=first.embedding,
+            )
+
+        unions = []
+        group: List[TextUnit] = []
+        group_tokens = 0
+        for tu in text_units:
+            extra = tu.number_tokens + (separator_tokens if group else 0)
+            if group and group_tokens + extra > budget:
+                unions.append(merge(group, group_tokens))
+                group, group_tokens, extra = [], 0, tu.number_tokens
+            group.append(tu)
+            group_tokens += extra
+        if group:
+            unions.append(merge(group, group_tokens))
+        return unions
+
     def _chunk_document(self, doc: Document, max_tokens=100000, overlap_tokens=50) -> List[TextUnit]:
         """
         Chunk document's content into semantically meaningful chunks using spaCy, with overlap,
@@ -314,7 +495,26 @@ class GraphRag:
 
         entity_types = ",".join([e.value for e in EntityType])
         prompt = initial_extract_graph_prompt(text_unit.text, entity_types, example)
-        entity_relationships:EntityRelationshipModel = self.json_generator.generate_json(prompt, EntityRelationshipModel)
+        try:
+            entity_relationships:EntityRelationshipModel = self.json_generator.generate_json(prompt, EntityRelationshipModel, task=LlmTask.EXTRACT)
+        except Exception as e:
+            # The LLM gave up on this unit (e.g. a provider outage), the rest of the graph is still built
+            logger.warning("No entities extracted from text unit %s: %r", text_unit.unit_id, e)
+            return [], []
+
+        return entity_relationships.entities, entity_relationships.relationships
+
+    async def aextract_entities_and_relationships_from_textunit(self, text_unit: TextUnit, example: str = "") -> Tuple[List[Entity], List[Relationship]]:
+        """
+        Asynchronous `extract_entities_and_relationships_from_textunit`.
+        """
+        entity_types = ",".join([e.value for e in EntityType])
+        prompt = initial_extract_graph_prompt(text_unit.text, entity_types, example)
+        try:
+            entity_relationships: EntityRelationshipModel = await self.json_generator.agenerate_json(prompt, EntityRelationshipModel, task=LlmTask.EXTRACT)
+        except Exception as e:
+            logger.warning("No entities extracted from text unit %s: %r", text_unit.unit_id, e)
+            return [], []
 
         return entity_relationships.entities, entity_relationships.relationships
 
@@ -330,7 +530,11 @@ class GraphRag:
         """
         prompt = extract_claims_prompt(text_unit.text,entities)
         if self.json_generator is not None:
-            claim_list = self.json_generator.generate_json(prompt, ClaimListModel)
+            try:
+                claim_list = self.json_generator.generate_json(prompt, ClaimListModel, task=LlmTask.EXTRACT)
+            except Exception as e:
+                logger.warning("No claims extracted from text unit %s: %r", text_unit.unit_id, e)
+                return []
             return claim_list.claims
         else:
             return []
@@ -341,7 +545,7 @@ class GraphRag:
         Nodes are entity names, edges are relationships.
         """
         G = nx.Graph()
-        node_names = [e.name for e in kg.entities]
+        node_names = set(e.name for e in kg.entities)
         G.add_nodes_from(node_names)
         edges = [(rel.source, rel.target) for rel in kg.relationships if rel.source in node_names and rel.target in node_names]
         G.add_edges_from(edges)
@@ -379,28 +583,136 @@ class GraphRag:
         recursive_louvain(G)
         return communities
 
+    def _summary_descriptions_all(self, groups: List[List[str]], desc: str) -> List[str]:
+        """
+        Summaries of several groups of descriptions. A batch generator gets every request at once,
+        so they are submitted as one bulk job, otherwise the groups are summarized one by one.
+        """
+        if not isinstance(self.small_json_generator, BatchJsonGenerator):
+            return [self.summary_descriptions(descriptions) for descriptions in tqdm(groups, desc=desc)]
+        futures = [
+            self.small_json_generator.submit_json(summary_descriptions_prompt(descriptions), SummaryDescriptionModel, task=LlmTask.SUMMARIZE)
+            for descriptions in groups
+        ]
+        summaries = []
+        for descriptions, future in zip(groups, tqdm(futures, desc=desc)):
+            try:
+                summaries.append(future.result().summary)
+            except Exception as e:
+                logger.warning("Joining descriptions, their summary failed: %r", e)
+                summaries.append(self._join_descriptions(descriptions))
+        return summaries
+
+    def _attach_community_reports(self, communities: List[Community], kg: KnowledgeGraph, desc: str = "Summarizing communities") -> None:
+        """
+        Summarize communities and attach their reports, as one bulk job with a batch generator,
+        otherwise on a thread pool.
+        """
+        if not isinstance(self.small_json_generator, BatchJsonGenerator):
+            with concurrent.futures.ThreadPoolExecutor(max_workers=self.LLM_WORKERS) as executor:
+                future_to_comm = {
+                    executor.submit(contextvars.copy_context().run, self.summarize_community, comm, kg): comm
+                    for comm in communities
+                }
+                for future in tqdm(concurrent.futures.as_completed(future_to_comm), total=len(communities), desc=desc):
+                    kg.attach_community_report(future_to_comm[future], future.result())
+            return
+
+        futures = []
+        for comm in communities:
+            members = set([m[0] for m in comm.members])
+            key_entities, key_relationships = kg.get_entities(members), kg.get_relationships_among(members)
+            prompt = summary_community_prompt(key_entities, key_relationships)
+            futures.append((key_entities, key_relationships, self.small_json_generator.submit_json(prompt, SummaryCommunityModel, task=LlmTask.SUMMARIZE)))
+        responses: List[SummaryCommunityModel] = []
+        for key_entities, key_relationships, future in tqdm(futures, desc=desc):
+            try:
+                responses.append(future.result())
+            except Exception as e:
+                logger.warning("Joining community descriptions, its summary failed: %r", e)
+                responses.append(SummaryCommunityModel(
+                    summary=self._join_community_descriptions(key_entities, key_relationships),
+                    key_entities=key_entities,
+                    key_relationships=key_relationships,
+                ))
+        summaries = [response.summary for response in responses]
+        to_embed = [i for i, summary in enumerate(summaries) if summary.strip()]
+        embeddings = dict(zip(to_embed, self.text_embedder.embed_batch([summaries[i] for i in to_embed]))) if to_embed else {}
+        for i, (comm, response) in enumerate(zip(communities, responses)):
+            kg.attach_community_report(comm, CommunityReport(
+                summary=response.summary,
+                key_entities=response.key_entities,
+                key_relationships=response.key_relationships,
+                embedding=embeddings.get(i),
+            ))
+
     def summarize_community(self, community: Community, kg: KnowledgeGraph) -> CommunityReport:
         """
         Generate a report for a community using the LLM, referencing key entities and relationships.
         Returns a CommunityReport object.
         """
         members = set([m[0] for m in community.members])
-        key_entities = [e for e in kg.entities if e.name in members]
-        key_relationships = [r for r in kg.relationships if r.source in members and r.target in members]
+        key_entities = kg.get_entities(members)
+        key_relationships = kg.get_relationships_among(members)
 
         prompt = summary_community_prompt(key_entities, key_relationships)
+        summary = None
         if self.small_json_generator is not None:
-            response: SummaryCommunityModel = self.small_json_generator.generate_json(prompt, SummaryCommunityModel)
-            summary = response.summary
-            key_entities = response.key_entities
-            key_relationships = response.key_relationships
-        else:
-            entity_descs = "; ".join([e.description for e in key_entities])
-            rel_descs = "; ".join([r.description for r in key_relationships])
-            summary = f"Entities: {entity_descs}. Relationships: {rel_descs}"
-            summary = summary[:8000] + ("..." if len(summary) > 8000 else "")
+            try:
+                response: SummaryCommunityModel = self.small_json_generator.generate_json(prompt, SummaryCommunityModel, task=LlmTask.SUMMARIZE)
+                summary = response.summary
+                key_entities = response.key_entities
+                key_relationships = response.key_relationships
+            except Exception as e:
+                logger.warning("Joining the descriptions of community %s, its summary failed: %r", community.id, e)
+        if summary is None:
+            summary = self._join_community_descriptions(key_entities, key_relationships)
+
+        embedding = None
+        if summary.strip():
+            try:
+                embedding = self.text_embedder.embed(summary)
+            except Exception as e:
+                # Reports without an embedding are left out of community retrieval
+                logger.warning("Community %s report could not be embedded: %r", community.id, e)
+        return CommunityReport(summary=summary, key_entities=key_entities, key_relationships=key_relationships, embedding=embedding)
+
+    async def asummarize_community(self, community: Community, kg: KnowledgeGraph) -> CommunityReport:
+        """
+        Asynchronous `summarize_community`.
+        """
+        members = set([m[0] for m in community.members])
+        key_entities = kg.get_entities(members)
+        key_relationships = kg.get_relationships_among(members)
 
-        return CommunityReport(summary=summary, key_entities=key_entities, key_relationships=key_relationships)
+        summary = None
+        if self.small_json_generator is not None:
+            prompt = summary_community_prompt(key_entities, key_relationships)
+            try:
+                response: SummaryCommunityModel = await self.small_json_generator.agenerate_json(prompt, SummaryCommunityModel, task=LlmTask.SUMMARIZE)
+                summary = response.summary
+                key_entities = response.key_entities
+                key_relationships = response.key_relationships
+            except Exception as e:
+                logger.warning("Joining the descriptions of community %s, its summary failed: %r", community.id, e)
+        if summary is None:
+            summary = self._join_community_descriptions(key_entities, key_relationships)
+
+        embedding = None
+        if summary.strip():
+            try:
+                embedding = await self.text_embedder.aembed(summary)
+            except Exception as e:
+                logger.warning("Community %s report could not be embedded: %r", community.id, e)
+        return CommunityReport(summary=summary, key_entities=key_entities, key_relationships=key_relationships, embedding=embedding)
+
+    @staticmethod
+    def _join_community_descriptions(key_entities: List[Entity], key_relationships: List[Relationship]) -> str:
+        # Community summary used when there is no small LLM
+        entity_descs = "; ".join([e.description for e in key_entities])
+        rel_descs = "; ".join([r.description for r in key_relationships])
+        summary = f"Entities: {entity_descs}. Relationships: {rel_descs}"
+        return summary[:8000] + ("..." if len(summary) > 8000 else "")
 
     def summary_descriptions(self, descriptions: List[str]) -> str:
         """
@@ -417,12 +729,35 @@ class GraphRag:
 
         prompt = summary_descriptions_prompt(descriptions)
         if self.small_json_generator is not None:
-            response: SummaryDescriptionModel = self.small_json_generator.generate_json(prompt, SummaryDescriptionModel)
-            return response.summary
-        else:
-            random.shuffle(descriptions)
-            summary = "; ".join(descriptions)
-            return summary[:5000] + ("..." if len(summary) > 5000 else "")
+            try:
+                response: SummaryDescriptionModel = self.small_json_generator.generate_json(prompt, SummaryDescriptionModel, task=LlmTask.SUMMARIZE)
+                return response.summary
+            except Exception as e:
+                logger.warning("Joining descriptions, their summary failed: %r", e)
+        return self._join_descriptions(descriptions)
+
+    @staticmethod
+    def _join_descriptions(descriptions: List[str]) -> str:
+        # Description summary used when there is no small LLM, or when it failed
+        descriptions = list(descriptions)
+        random.shuffle(descriptions)
+        summary = "; ".join(descriptions)
+        return summary[:5000] + ("..." if len(summary) > 5000 else "")
+
+    async def asummary_descriptions(self, descriptions: List[str]) -> str:
+        """
+        Asynchronous `summary_descriptions`.
+        """
+        if self.small_json_generator is None or len(descriptions) == 0:
+            return self.summary_descriptions(descriptions)
+
+        prompt = summary_descriptions_prompt(descriptions)
+        try:
+            response: SummaryDescriptionModel = await self.small_json_generator.agenerate_json(prompt, SummaryDescriptionModel, task=LlmTask.SUMMARIZE)
+        except Exception as e:
+            logger.warning("Joining descriptions, their summary failed: %r", e)
+            return self._join_descriptions(descriptions)
+        return response.summary
 
     def find_documents(self, query: str, kg: KnowledgeGraph, k: int, n: int = 2) -> List[Document]:
         """
@@ -443,31 +778,21 @@ class GraphRag:
         response = query
         response_embedding = self.text_embedder.embed(response)
 
-        # Map: doc_id -> [(similarity, text_unit)]
+        # Map: doc_id -> [similarity]
         doc_similarities = defaultdict(list)
-        doc_id_to_doc = {}
-
-        # Calculate similarities for all text units
-        for tu in kg.text_units:
-            tu_embedding = tu.embedding
-            # Cosine similarity
-            dot = sum(a * b for a, b in zip(response_embedding.vector, tu_embedding.vector))
-            norm1 = sum(a * a for a in response_embedding.vector) ** 0.5
-            norm2 = sum(b * b for b in tu_embedding.vector) ** 0.5
-            similarity = dot / (norm1 * norm2 + 1e-8)
-            doc_similarities[tu.document_id].append((similarity, tu))
-
-        # Build document lookup
-        for doc in kg.documents:
-            doc_id_to_doc[doc.id] = doc
+
+        # Calculate similarities for the text units shortlisted by the coarse pass, or all of them
+        _, document_ids, rows, similarities = self._rank_text_units(response_embedding.vector, kg, k * n * self.shortlist_factor)
+        for row, similarity in zip(rows.tolist(), similarities.tolist()):
+            doc_similarities[document_ids[row]].append(similarity)
 
         doc_avg_sim = []
-        for doc_id, sim_tu_pairs in doc_similarities.items():
+        for doc_id, sims in doc_similarities.items():
             # Sort text units by similarity (descending)
-            sim_tu_pairs.sort(key=lambda x: x[0], reverse=True)
+            sims.sort(reverse=True)
 
             # Take top n text units (or all if fewer than n available)
-            top_n_similarities = [sim for sim, tu in sim_tu_pairs[:n]]
+            top_n_similarities = sims[:n]
 
             # Calculate mean of top n similarities
             avg_sim = sum(top_n_similarities) / len(top_n_similarities)
@@ -477,57 +802,72 @@ class GraphRag:
         doc_avg_sim.sort(key=lambda x: x[1], reverse=True)
 
         # Return top k documents
-        top_docs = [doc_id_to_doc[doc_id] for doc_id, _ in doc_avg_sim[:k] if doc_id in doc_id_to_doc]
-        return top_docs
+        top_docs = [kg.get_document(doc_id) for doc_id, _ in doc_avg_sim[:k]]
+        return [doc for doc in top_docs if doc is not None]
 
 
     def get_relevant_text_units(self, kg, query, top_n=3):
         response_embedding = self.text_embedder.embed(query)
 
-        # Map: doc_id -> [similarities]
-        tu_similarities = {}
+        unit_ids, _, rows, _ = self._rank_text_units(response_embedding.vector, kg, top_n * self.shortlist_factor)
 
-        for tu in kg.text_units:
-            tu_embedding = tu.embedding
-            # Cosine similarity
-            dot = sum(a * b for a, b in zip(response_embedding.vector, tu_embedding.vector))
-            norm1 = sum(a * a for a in response_embedding.vector) ** 0.5
-            norm2 = sum(b * b for b in tu_embedding.vector) ** 0.5
-            similarity = dot / (norm1 * norm2 + 1e-8)
-            tu_similarities[tu] = similarity
-
-        # Sort by similarity descending
-        sorted_tus = sorted(tu_similarities.items(), key=lambda x: x[1], reverse=True)
-        # Return top n text units
-        top_tus = [tu for tu, _ in sorted_tus[:top_n]]
-        return top_tus
+        # Rows come sorted by similarity descending, return top n text units
+        return kg.get_text_units([unit_ids[i] for i in rows[:top_n]])
 
     def get_relevant_text_units_distinct_docs(self, kg, query, top_n=3):
         response_embedding = self.text_embedder.embed(query)
 
-        # Map: doc_id -> [text units and their similarities]
-        tu_similarities = []
-        for tu in kg.text_units:
-            tu_embedding = tu.embedding
-            # Cosine similarity
-            dot = sum(a * b for a, b in zip(response_embedding.vector, tu_embedding.vector))
-            norm1 = sum(a * a for a in response_embedding.vector) ** 0.5
-            norm2 = sum(b * b for b in tu_embedding.vector) ** 0.5
-            similarity = dot / (norm1 * norm2 + 1e-8)
-            tu_similarities.append((tu, similarity))
-
-        # Sort by similarity descending
-        sorted_tus = sorted(tu_similarities, key=lambda x: x[1], reverse=True)
-        # Select top_n text units from distinct documents
-        seen_doc_ids = set()
-        top_tus = []
-        for tu, _ in sorted_tus:
-            if tu.document_id not in seen_doc_ids:
-                top_tus.append(tu)
-                seen_doc_ids.add(tu.document_id)
-            if len(top_tus) >= top_n:
-                break
-        return top_tus
+        shortlist = top_n * self.shortlist_factor
+        while True:
+            unit_ids, document_ids, order, _ = self._rank_text_units(response_embedding.vector, kg, shortlist)
+            # Select top_n text units from distinct documents, in similarity order
+            seen_doc_ids = set()
+            top_ids = []
+            for i in order:
+                if document_ids[i] not in seen_doc_ids:
+                    top_ids.append(unit_ids[i])
+                    seen_doc_ids.add(document_ids[i])
+                if len(top_ids) >= top_n:
+                    break
+            # A shortlist dominated by a few documents is widened until it holds enough of them
+            if len(top_ids) >= top_n or len(order) == len(unit_ids):
+                return kg.get_text_units(top_ids)
+            shortlist *= 4
+
+    def _rank_text_units(self, query_vector: np.ndarray, kg: KnowledgeGraph, shortlist: int) -> Tuple[List[str], List[str], np.ndarray, np.ndarray]:
+        """
+        Rank the text units of a knowledge graph by cosine similarity to a query embedding,
+        with the two-stage search when `search_dims` is set.
+
+        Args:
+            query_vector (np.ndarray): Full-dimensional query embedding.
+            kg (KnowledgeGraph): Knowledge graph whose text units are ranked.
+            shortlist (int): Number of text units kept by the coarse pass.
+
+        Returns:
+            Tuple containing:
+            - Unit ids and document ids of every text unit, aligned with the embedding rows
+            - Rows of the ranked text units, by decreasing similarity
+            - Their exact cosine similarities
+        """
+        unit_ids, document_ids, matrix = kg.text_unit_embeddings()
+        prefix = self._embedding_prefix(kg, "text_units", len(unit_ids), matrix)
+        rows, similarities = two_stage_search(query_vector, matrix, shortlist, prefix)
+        return unit_ids, document_ids, rows, similarities
+
+    def _embedding_prefix(self, kg: KnowledgeGraph, name: str, version: Any, matrix: np.ndarray) -> Optional[np.ndarray]:
+        """
+        Normalized `search_dims` prefix of a matrix of embeddings of the knowledge graph, computed
+        once per `version` of the matrix. None when the two-stage search is disabled or pointless.
+        """
+        if not self.search_dims or len(matrix) == 0 or self.search_dims >= matrix.shape[1]:
+            return None
+        prefixes = self._prefix_cache.setdefault(kg, {})
+        cached = prefixes.get(name)
+        if cached is None or cached[0] != (version, self.search_dims):
+            cached = ((version, self.search_dims), normalized_prefix(matrix, self.search_dims))
+            prefixes[name] = cached
+        return cached[1]
 
     def respond(self, query: str, kg: KnowledgeGraph, c: int = 3) -> str:
         """
@@ -542,78 +882,82 @@ class GraphRag:
         )
 
         # Phase A: Global Search
-        relevant_communities = self._find_relevant_communities(query, kg, c)
-        community_reports = [comm.report for comm in relevant_communities if comm.report]
-        community_summaries = [r.summary for r in community_reports]
-        community_entities = [e for r in community_reports for e in r.key_entities]
-        community_relationships = [rel for r in community_reports for rel in r.key_relationships]
-
-        # Build a global prompt
-        global_prompt = (
-            f"User Query: {query}\n"
-            f"Community Summaries:\n"
-            + "\n".join(f"- {s}" for s in community_summaries[:5])
-            + "\nKey Entities:\n"
-            + ", ".join(f"{e.name} ({e.type.value})" for e in community_entities[:10])
-            + "\nKey Relationships:\n"
-            + "\n".join(f"{rel.source} -> {rel.target}: {rel.description}" for rel in community_relationships[:10])
-            + "\n\n"
-            "Based on the above, provide:\n"
-            "- A comprehensive answer to the query\n"
-            "- 3-5 key insights\n"
-            "- A confidence score (0.0-1.0)\n"
-            "- Reasoning steps\n"
-        )
-        initial_answer_model = self.json_generator.generate_json(global_prompt, InitialAnswerModel)
-        initial_answer = initial_answer_model.answer
-        confidence_score = initial_answer_model.confidence_score
+        with span("graphrag.respond.global_search"):
+            relevant_communities = self._find_relevant_communities(query, kg, c)
+            community_reports = [comm.report for comm in relevant_communities if comm.report]
+            community_summaries = [r.summary for r in community_reports]
+            community_entities = [e for r in community_reports for e in r.key_entities]
+            community_relationships = [rel for r in community_reports for rel in r.key_relationships]
+
+            # Build a global prompt
+            global_prompt = (
+                f"User Query: {query}\n"
+                f"Community Summaries:\n"
+                + "\n".join(f"- {s}" for s in community_summaries[:5])
+                + "\nKey Entities:\n"
+                + ", ".join(f"{e.name} ({e.type.value})" for e in community_entities[:10])
+                + "\nKey Relationships:\n"
+                + "\n".join(f"{rel.source} -> {rel.target}: {rel.description}" for rel in community_relationships[:10])
+                + "\n\n"
+                "Based on the above, provide:\n"
+                "- A comprehensive answer to the query\n"
+                "- 3-5 key insights\n"
+                "- A confidence score (0.0-1.0)\n"
+                "- Reasoning steps\n"
+            )
+            initial_answer_model = self.json_generator.generate_json(global_prompt, InitialAnswerModel, task=LlmTask.SUMMARIZE)
+            initial_answer = initial_answer_model.answer
+            confidence_score = initial_answer_model.confidence_score
 
         # Phase A2: Generate follow-up questions using LLM
-        followup_prompt = (
-            f"Given the answer:\n{initial_answer}\n"
-            "Generate 3-5 follow-up questions that would help refine or deepen the answer. "
-            "For each, specify the type (entity, relationship, temporal, causal) and a priority score (0.0-1.0)."
-        )
-        followup_model = self.json_generator.generate_json(followup_prompt, FollowUpQuestionsModel)
-        follow_up_questions = followup_model.questions
+        with span("graphrag.respond.follow_up_questions"):
+            followup_prompt = (
+                f"Given the answer:\n{initial_answer}\n"
+                "Generate 3-5 follow-up questions that would help refine or deepen the answer. "
+                "For each, specify the type (entity, relationship, temporal, causal) and a priority score (0.0-1.0)."
+            )
+            followup_model = self.json_generator.generate_json(followup_prompt, FollowUpQuestionsModel, task=LlmTask.DECIDE)
+            follow_up_questions = followup_model.questions
 
         # Phase B: Local Search for each follow-up
-        intermediate_responses = []
-        for i, follow_up_q in enumerate(follow_up_questions):
-            # Build a local search prompt
-
-            relevant_text_units = self.get_relevant_text_units(kg, follow_up_q)
-
-            local_prompt = (
-                f"User Follow-up Question: {follow_up_q}\n"
-                f"Relevant Text Units: {[tu.text[:100] for tu in relevant_text_units]}\n"
-                "Provide:\n"
-                "- A detailed answer\n"
-                "- List of evidence sources\n"
-                "- Confidence score (0.0-1.0)\n"
-                "- Key entities mentioned"
-            )
-            local_model = self.json_generator.generate_json(local_prompt, LocalSearchModel)
-            local_answer = local_model.answer
-            local_confidence = local_model.confidence_score
-            intermediate_responses.append({
-                'question': follow_up_q,
-                'answer': local_answer,
-                'confidence': local_confidence
-            })
-            if local_confidence < 0.3:
-                break
+        with span("graphrag.respond.local_search"):
+            intermediate_responses = []
+            for i, follow_up_q in enumerate(follow_up_questions):
+                # Build a local search prompt
+
+                relevant_text_units = self.get_relevant_text_units(kg, follow_up_q)
+
+                local_prompt = (
+                    f"User Follow-up Question: {follow_up_q}\n"
+                    f"Relevant Text Units: {[tu.text[:100] for tu in relevant_text_units]}\n"
+                    "Provide:\n"
+                    "- A detailed answer\n"
+                    "- List of evidence sources\n"
+                    "- Confidence score (0.0-1.0)\n"
+                    "- Key entities mentioned"
+                )
+                local_model = self.json_generator.generate_json(local_prompt, LocalSearchModel, task=LlmTask.SUMMARIZE)
+                local_answer = local_model.answer
+                local_confidence = local_model.confidence_score
+                intermediate_responses.append({
+                    'question': follow_up_q,
+                    'answer': local_answer,
+                    'confidence': local_confidence
+                })
+                if local_confidence < 0.3:
+                    break
 
         # Phase C: Output Hierarchy and Summary (LLM-driven)
-        summary_prompt = (
-            f"Original Query: {query}\n"
-            f"Global Answer: {initial_answer}\n"
-            f"Local Refinements:\n"
-            + "\n".join(f"Q: {r['question']}\nA: {r['answer']}\nConfidence: {r['confidence']:.2f}" for r in intermediate_responses)
-            + "\n\n"
-            "Summarize the findings, assess overall confidence, and provide recommendations for further exploration."
-        )
-        final_model = self.json_generator.generate_json(summary_prompt, FinalResponseModel)
+        with span("graphrag.respond.summary"):
+            summary_prompt = (
+                f"Original Query: {query}\n"
+                f"Global Answer: {initial_answer}\n"
+                f"Local Refinements:\n"
+                + "\n".join(f"Q: {r['question']}\nA: {r['answer']}\nConfidence: {r['confidence']:.2f}" for r in intermediate_responses)
+                + "\n\n"
+                "Summarize the findings, assess overall confidence, and provide recommendations for further exploration."
+            )
+            final_model = self.json_generator.generate_json(summary_prompt, FinalResponseModel, task=LlmTask.SUMMARIZE)
 
         # Compose the final response
         response_parts = []
@@ -653,13 +997,14 @@ class GraphRag:
     def _find_relevant_communities(self, query: str, kg: KnowledgeGraph, k: int) -> List[Community]:
         """Find the top K most semantically relevant communities for the query."""
 
-        if not kg.communities or not kg.community_reports:
+        communities = kg.communities
+        if not communities:
             return []
 
         # Filter communities with reports
         valid_communities = []
-        for comm in kg.communities:
-            if comm.report and comm.report.summary.strip():
+        for comm in communities:
+            if comm.report and comm.report.summary.strip() and comm.report.embedding is not None:
                 valid_communities.append(comm)
 
         if not valid_communities:
@@ -681,6 +1026,16 @@ class GraphRag:
             embedding = comm.report.embedding.vector
             community_embeddings.append(embedding)
 
+        # Keep the communities of the coarse pass shortlist, the selector compares them at full dimension
+        shortlist = k * self.shortlist_factor
+        if self.search_dims and len(valid_communities) > shortlist:
+            version = tuple(id(comm.report) for comm in valid_communities)
+            prefix = self._embedding_prefix(kg, "communities", version, np.vstack(community_embeddings))
+            if prefix is not None:
+                rows = np.sort(coarse_shortlist(query_embedding, prefix, shortlist))
+                valid_communities = [valid_communities[i] for i in rows]
+                community_embeddings = [community_embeddings[i] for i in rows]
+
         # Run optimization
         selector = CommunitySelector(
             query_embedding=query_embedding,
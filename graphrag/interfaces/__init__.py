@@ -1,7 +1,9 @@
 from .json_generator import JsonGenerator
+from .batch_json_generator import BatchJsonGenerator
 from .text_embedder import TextEmbedder
 
 __all__ = [
     "JsonGenerator",
+    "BatchJsonGenerator",
     "TextEmbedder"
 ]
@@ -1,3 +1,4 @@
+import asyncio
 from abc import ABC, abstractmethod
 from typing import List
 from entities.embedding import Embedding
@@ -15,3 +16,29 @@ class TextEmbedder(ABC):
             Embedding: The embedding vector for the input text.
         """
         pass
+
+    def embed_batch(self, texts: List[str]) -> List[Embedding]:
+        """
+        Embed several texts, with as few remote calls as the implementation allows.
+        The default implementation embeds the texts one by one.
+
+        Args:
+            texts (List[str]): Input text strings to embed.
+
+        Returns:
+            List[Embedding]: The embedding vectors, in the order of the texts.
+        """
+        return [self.embed(text) for text in texts]
+
+    async def aembed(self, text: str) -> Embedding:
+        """
+        Asynchronous `embed`. The default implementation goes through `aembed_batch`.
+        """
+        return (await self.aembed_batch([text]))[0]
+
+    async def aembed_batch(self, texts: List[str]) -> List[Embedding]:
+        """
+        Asynchronous `embed_batch`. The default implementation runs `embed_batch` in a worker thread,
+        implementations with an async client override it to avoid the thread.
+        """
+        return await asyncio.to_thread(self.embed_batch, texts)
@@ -1,4 +1,7 @@
-from typing import Any, Dict, List, Set, Tuple, Optional
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, Iterator, List, Set, Tuple, Optional
+import numpy as np
 from entities.document import Document
 from graphrag.models.graph_types import Entity, Relationship, Claim, EntityType, Community, CommunityReport
 from graphrag.models.text_unit import TextUnit
@@ -20,6 +23,12 @@ class KnowledgeGraph:
     Stores Documents, TextUnits, Entities, Relationships, Covariates, Communities, and Community Reports.
     """
     def __init__(self, documents: List[Document]):
+        # Stacked text unit embeddings, built on first use and dropped when a text unit is added
+        self._embedding_cache: Optional[Tuple[List[str], List[str], np.ndarray]] = None
+        self._init_storage(documents)
+
+    def _init_storage(self, documents: List[Document]):
+        """Set up the storage of the graph's contents, Python lists for the in-memory graph."""
         self.documents: List[Document] = documents
         self.text_units: List[TextUnit] = []
         self.entities: List[Entity] = []
@@ -34,13 +43,26 @@ class KnowledgeGraph:
 
     def add_text_unit(self, text_unit: TextUnit):
         self.text_units.append(text_unit)
+        self._embedding_cache = None
+
+    def add_text_units(self, text_units: Iterable[TextUnit]):
+        for text_unit in text_units:
+            self.add_text_unit(text_unit)
 
     def add_entity(self, entity: Entity):
         self.entities.append(entity)
 
+    def add_entities(self, entities: Iterable[Entity]):
+        for entity in entities:
+            self.add_entity(entity)
+
     def add_relationship(self, relationship: Relationship):
         self.relationships.append(relationship)
 
+    def add_relationships(self, relationships: Iterable[Relationship]):
+        for relationship in relationships:
+            self.add_relationship(relationship)
+
     def add_covariate(self, covariate: Claim):
         self.covariates.append(covariate)
 
@@ -52,3 +74,83 @@ class KnowledgeGraph:
 
     def add_textunits_entities(self, textunit_id: str, entities: List[Entity]):
         self.textunit_entities[textunit_id] = entities
+
+    def attach_community_report(self, community: Community, report: CommunityReport):
+        """Set the report of a community already in the graph and register the report."""
+        community.report = report
+        self.add_community_report(report)
+
+    def replace_entities(self, entities: List[Entity]):
+        self.entities = list(entities)
+
+    def replace_relationships(self, relationships: List[Relationship]):
+        self.relationships = list(relationships)
+
+    @contextmanager
+    def transaction(self) -> Iterator[None]:
+        """Group mutations so a persistent graph saves them at once, nothing to do in memory."""
+        yield
+
+    def clear_communities(self):
+        """Remove every community and community report, e.g. before re-running community detection."""
+        self.communities = []
+        self.community_reports = []
+
+    def get_document(self, document_id: str) -> Optional[Document]:
+        for doc in self.documents:
+            if doc.id == document_id:
+                return doc
+        return None
+
+    def get_entities(self, names: Iterable[str]) -> List[Entity]:
+        """Entities whose name is one of `names`."""
+        names = set(names)
+        return [e for e in self.entities if e.name in names]
+
+    def get_relationships_among(self, names: Iterable[str]) -> List[Relationship]:
+        """Relationships whose source and target are both in `names`."""
+        names = set(names)
+        return [r for r in self.relationships if r.source in names and r.target in names]
+
+    def get_text_units(self, unit_ids: Iterable[str]) -> List[TextUnit]:
+        """Text units with the given ids, in the order the ids were given."""
+        by_id = {tu.unit_id: tu for tu in self.text_units}
+        return [by_id[unit_id] for unit_id in unit_ids if unit_id in by_id]
+
+    def get_text_units_by_document(self, document_id: str) -> List[TextUnit]:
+        return [tu for tu in self.text_units if tu.document_id == document_id]
+
+    def get_communities_at_level(self, level: int) -> List[Community]:
+        return [c for c in self.communities if c.level == level]
+
+    def text_unit_embeddings(self) -> Tuple[List[str], List[str], np.ndarray]:
+        """
+        Embeddings of every text unit stacked in a matrix.
+
+        Returns:
+            Tuple containing:
+            - Unit ids, aligned with the matrix rows
+            - Document ids, aligned with the matrix rows
+            - Matrix of shape (number of text units, embedding dimension)
+        """
+        # The length check also catches text units appended to the list without `add_text_unit`
+        if self._embedding_cache is None or len(self._embedding_cache[0]) != len(self.text_units):
+            unit_ids = [tu.unit_id for tu in self.text_units]
+            document_ids = [tu.document_id for tu in self.text_units]
+            if unit_ids:
+                matrix = np.vstack([tu.embedding.vector for tu in self.text_units])
+            else:
+                matrix = np.zeros((0, 0))
+            self._embedding_cache = (unit_ids, document_ids, matrix)
+        return self._embedding_cache
+
+
+class KnowledgeGraphFactory(ABC):
+    @abstractmethod
+    def create_knowledge_graph(self, documents: List[Document]) -> KnowledgeGraph:
+        pass
+
+
+class InMemoryKnowledgeGraphFactory(KnowledgeGraphFactory):
+    def create_knowledge_graph(self, documents: List[Document]) -> KnowledgeGraph:
+        return KnowledgeGraph(documents=documents)
@@ -38,7 +38,7 @@ class CommunityReport(BaseModel):
     key_entities: List[Entity]
     key_relationships: List[Relationship]
     summary: str
-    embedding: Embedding
+    embedding: Optional[Embedding] = None
 
     class Config:
         arbitrary_types_allowed = True
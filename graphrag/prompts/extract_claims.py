@@ -1,12 +1,13 @@
 from typing import List
 from graphrag.models.claim_list import ClaimListModel
 from graphrag.models.graph_types import Entity
+from entities.model_registry import schema_prompt_text
 
 def extract_claims_prompt(text: str, entities: List[Entity]) -> str:
     """
     Returns a prompt for extracting claims (covariates) from a text unit, following the detailed user requirements.
     """
-    json_schema_str = f"JSON schema: {ClaimListModel.model_json_schema()}"
+    json_schema_str = f"JSON schema: {schema_prompt_text(ClaimListModel)}"
     text_str = f"Text: {text}"
     entities_str = f"{('; '.join([e.name for e in entities]))}" if entities else "Entities: None"
     return (
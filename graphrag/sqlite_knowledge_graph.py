@@ -0,0 +1,538 @@
+import json
+import os
+import sqlite3
+import uuid
+from contextlib import contextmanager
+from threading import RLock
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from entities.document import Document
+from entities.embedding import Embedding
+from graphrag.knowledge_graph import KnowledgeGraph, KnowledgeGraphFactory
+from graphrag.models.graph_types import Entity, Relationship, Claim, EntityType, Community, CommunityReport
+from graphrag.models.text_unit import TextUnit
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS documents (id TEXT PRIMARY KEY, data TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS text_units (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    unit_id TEXT,
+    document_id TEXT NOT NULL,
+    text TEXT NOT NULL,
+    position INTEGER,
+    number_tokens INTEGER NOT NULL,
+    embedding_row INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_text_units_unit_id ON text_units (unit_id);
+CREATE INDEX IF NOT EXISTS idx_text_units_document_id ON text_units (document_id);
+CREATE TABLE IF NOT EXISTS entities (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL,
+    type TEXT NOT NULL,
+    description TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_entities_name ON entities (name);
+CREATE TABLE IF NOT EXISTS relationships (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    source TEXT NOT NULL,
+    target TEXT NOT NULL,
+    description TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_relationships_source ON relationships (source, target);
+CREATE INDEX IF NOT EXISTS idx_relationships_target ON relationships (target);
+CREATE TABLE IF NOT EXISTS covariates (seq INTEGER PRIMARY KEY AUTOINCREMENT, data TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS community_reports (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    data TEXT NOT NULL,
+    embedding_row INTEGER
+);
+CREATE TABLE IF NOT EXISTS communities (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    id TEXT NOT NULL,
+    level INTEGER NOT NULL,
+    parent TEXT,
+    members TEXT NOT NULL,
+    report_seq INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_communities_id ON communities (id);
+CREATE INDEX IF NOT EXISTS idx_communities_level ON communities (level);
+CREATE TABLE IF NOT EXISTS textunit_entities (
+    textunit_id TEXT NOT NULL,
+    name TEXT NOT NULL,
+    type TEXT NOT NULL,
+    description TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_textunit_entities_textunit_id ON textunit_entities (textunit_id);
+"""
+
+# SQLite limits the number of bound parameters per statement
+_MAX_PARAMS = 900
+
+
+class EmbeddingMatrix:
+    """
+    Append-only float32 matrix kept in a memory-mapped file. The file grows geometrically,
+    the number of used rows is tracked by the caller.
+    """
+
+    def __init__(self, path: str, dim: Optional[int] = None, rows: int = 0):
+        self.path = path
+        self.dim = dim
+        self.rows = rows
+        self._matrix: Optional[np.memmap] = None
+        if dim is not None and os.path.exists(path):
+            self._map()
+
+    def append(self, vector: np.ndarray) -> int:
+        vector = np.asarray(vector, dtype=np.float32).reshape(-1)
+        if self.dim is None:
+            self.dim = vector.shape[0]
+        if vector.shape[0] != self.dim:
+            raise ValueError(f"Expected embedding of dimension {self.dim}, got {vector.shape[0]}")
+        if self._matrix is None or self.rows >= self._matrix.shape[0]:
+            self._grow()
+        row = self.rows
+        self._matrix[row] = vector
+        self.rows += 1
+        return row
+
+    def get(self, row: int) -> np.ndarray:
+        return np.array(self._matrix[row])
+
+    def view(self, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """Rows of the matrix, without copying when `rows` is None."""
+        if self._matrix is None:
+            return np.zeros((0, self.dim or 0), dtype=np.float32)
+        if rows is None:
+            return self._matrix[:self.rows]
+        return self._matrix[rows]
+
+    def flush(self):
+        if self._matrix is not None:
+            self._matrix.flush()
+
+    def _grow(self):
+        capacity = 0 if self._matrix is None else self._matrix.shape[0]
+        new_capacity = max(1024, capacity * 2)
+        self.flush()
+        with open(self.path, "ab") as f:
+            f.truncate(new_capacity * self.dim * 4)
+        self._map()
+
+    def _map(self):
+        capacity = os.path.getsize(self.path) // (self.dim * 4)
+        self._matrix = np.memmap(self.path, dtype=np.float32, mode="r+", shape=(capacity, self.dim))
+
+
+class SqliteKnowledgeGraph(KnowledgeGraph):
+    """
+    Knowledge graph kept in a SQLite database, with text unit and community report embeddings
+    stored in memory-mapped matrices next to it. Lookups used by GraphRag are served by indexes
+    instead of scanning Python lists, so the graph can grow beyond the process memory.
+    The list attributes of KnowledgeGraph are still available, they are materialized on access.
+
+    Every object it returns (documents, text units, entities, relationships, communities and
+    reports) is a detached copy built from the database: changing one in place, e.g.
+    `community.report = report` or `entity.description = ...`, is not saved. Changes go through
+    the mutators: `attach_community_report`, `replace_entities`, `replace_relationships`,
+    `add_textunits_entities`, `clear_communities` and the `add_*` methods.
+
+    The database is in WAL mode with `synchronous=NORMAL`: a commit appends to the write-ahead log
+    without waiting for the disk, and a crash may lose the last commits but never corrupts the graph.
+    Each mutator commits on its own, the batched ones (`add_text_units`, `add_entities`,
+    `add_relationships`) insert all their rows in a single transaction, and mutators called inside
+    `transaction()` are committed together when it exits.
+    """
+
+    def __init__(self, path: str, documents: Optional[List[Document]] = None):
+        """
+        Args:
+            path: Path of the SQLite database, created if it does not exist.
+            documents: Documents to add to the graph.
+        """
+        self.path = path
+        self._lock = RLock()
+        # Depth of the open `transaction()` blocks, commits are deferred while it is positive
+        self._transaction_depth = 0
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._conn.commit()
+        self._text_unit_embeddings = self._open_matrix("text_units")
+        self._report_embeddings = self._open_matrix("community_reports")
+        super().__init__(documents or [])
+
+    def _init_storage(self, documents: List[Document]):
+        # The contents live in the database, only the given documents are added to it
+        for doc in documents:
+            self.add_document(doc)
+
+    # ============================================================================================
+    # Materialized views, kept for compatibility with code reading the KnowledgeGraph lists
+
+    @property
+    def documents(self) -> List[Document]:
+        rows = self._query("SELECT data FROM documents")
+        return [Document.model_validate_json(data) for (data,) in rows]
+
+    @property
+    def text_units(self) -> List[TextUnit]:
+        rows = self._query(
+            "SELECT document_id, text, unit_id, position, number_tokens, embedding_row FROM text_units ORDER BY seq"
+        )
+        return [self._row_to_text_unit(row) for row in rows]
+
+    @property
+    def entities(self) -> List[Entity]:
+        rows = self._query("SELECT name, type, description FROM entities ORDER BY seq")
+        return [self._row_to_entity(row) for row in rows]
+
+    @property
+    def relationships(self) -> List[Relationship]:
+        rows = self._query("SELECT source, target, description FROM relationships ORDER BY seq")
+        return [self._row_to_relationship(row) for row in rows]
+
+    @property
+    def covariates(self) -> List[Claim]:
+        rows = self._query("SELECT data FROM covariates ORDER BY seq")
+        return [Claim.model_validate_json(data) for (data,) in rows]
+
+    @property
+    def communities(self) -> List[Community]:
+        return self._select_communities("")
+
+    @property
+    def community_reports(self) -> List[CommunityReport]:
+        rows = self._query("SELECT data, embedding_row FROM community_reports ORDER BY seq")
+        return [self._row_to_report(row) for row in rows]
+
+    @property
+    def textunit_entities(self) -> Dict[str, List[Entity]]:
+        answ: Dict[str, List[Entity]] = {}
+        for textunit_id, *entity_row in self._query(
+            "SELECT textunit_id, name, type, description FROM textunit_entities"
+        ):
+            answ.setdefault(textunit_id, []).append(self._row_to_entity(entity_row))
+        return answ
+
+    # ============================================================================================
+    # Insertion
+
+    def add_document(self, document: Document):
+        self._execute(
+            "INSERT OR REPLACE INTO documents (id, data) VALUES (?, ?)",
+            (document.id, document.model_dump_json()),
+        )
+
+    def add_text_unit(self, text_unit: TextUnit):
+        self.add_text_units([text_unit])
+
+    def add_text_units(self, text_units: Iterable[TextUnit]):
+        with self._lock:
+            rows = []
+            for tu in text_units:
+                row = self._text_unit_embeddings.append(tu.embedding.vector)
+                rows.append((tu.unit_id, tu.document_id, tu.text, tu.position, tu.number_tokens, row))
+            if not rows:
+                return
+            self._conn.executemany(
+                "INSERT INTO text_units (unit_id, document_id, text, position, number_tokens, embedding_row) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            self._save_matrix_meta("text_units", self._text_unit_embeddings)
+            self._commit()
+
+    def add_entity(self, entity: Entity):
+        self.add_entities([entity])
+
+    def add_entities(self, entities: Iterable[Entity]):
+        with self._lock:
+            self._conn.executemany(
+                "INSERT INTO entities (name, type, description) VALUES (?, ?, ?)",
+                [(e.name, e.type.value, e.description) for e in entities],
+            )
+            self._commit()
+
+    def add_relationship(self, relationship: Relationship):
+        self.add_relationships([relationship])
+
+    def add_relationships(self, relationships: Iterable[Relationship]):
+        with self._lock:
+            self._conn.executemany(
+                "INSERT INTO relationships (source, target, description) VALUES (?, ?, ?)",
+                [(r.source, r.target, r.description) for r in relationships],
+            )
+            self._commit()
+
+    def add_covariate(self, covariate: Claim):
+        self._execute("INSERT INTO covariates (data) VALUES (?)", (covariate.model_dump_json(),))
+
+    def add_community(self, community: Community):
+        with self._lock:
+            report_seq = self._insert_report(community.report) if community.report else None
+            self._conn.execute(
+                "INSERT INTO communities (id, level, parent, members, report_seq) VALUES (?, ?, ?, ?, ?)",
+                (community.id, community.level, community.parent,
+                 json.dumps([[name, type_.value] for name, type_ in community.members]), report_seq),
+            )
+            self._commit()
+
+    def add_community_report(self, report: CommunityReport):
+        with self._lock:
+            self._insert_report(report)
+            self._commit()
+
+    def add_textunits_entities(self, textunit_id: str, entities: List[Entity]):
+        with self._lock:
+            self._conn.execute("DELETE FROM textunit_entities WHERE textunit_id = ?", (textunit_id,))
+            self._conn.executemany(
+                "INSERT INTO textunit_entities (textunit_id, name, type, description) VALUES (?, ?, ?, ?)",
+                [(textunit_id, e.name, e.type.value, e.description) for e in entities],
+            )
+            self._commit()
+
+    def attach_community_report(self, community: Community, report: CommunityReport):
+        community.report = report
+        with self._lock:
+            report_seq = self._insert_report(report)
+            self._conn.execute("UPDATE communities SET report_seq = ? WHERE id = ?", (report_seq, community.id))
+            self._commit()
+
+    def replace_entities(self, entities: List[Entity]):
+        with self._lock:
+            self._conn.execute("DELETE FROM entities")
+            self._conn.executemany(
+                "INSERT INTO entities (name, type, description) VALUES (?, ?, ?)",
+                [(e.name, e.type.value, e.description) for e in entities],
+            )
+            self._commit()
+
+    def replace_relationships(self, relationships: List[Relationship]):
+        with self._lock:
+            self._conn.execute("DELETE FROM relationships")
+            self._conn.executemany(
+                "INSERT INTO relationships (source, target, description) VALUES (?, ?, ?)",
+                [(r.source, r.target, r.description) for r in relationships],
+            )
+            self._commit()
+
+    @contextmanager
+    def transaction(self) -> Iterator[None]:
+        with self._lock:
+            self._transaction_depth += 1
+            try:
+                yield
+            except BaseException:
+                if self._transaction_depth == 1:
+                    self._rollback()
+                raise
+            else:
+                if self._transaction_depth == 1:
+                    self._conn.commit()
+            finally:
+                self._transaction_depth -= 1
+
+    def clear_communities(self):
+        # Report embeddings are left in the matrix, the rows are simply no longer referenced
+        with self._lock:
+            self._conn.execute("DELETE FROM communities")
+            self._conn.execute("DELETE FROM community_reports")
+            self._commit()
+
+    # ============================================================================================
+    # Indexed lookups
+
+    def get_document(self, document_id: str) -> Optional[Document]:
+        rows = self._query("SELECT data FROM documents WHERE id = ?", (document_id,))
+        return Document.model_validate_json(rows[0][0]) if rows else None
+
+    def get_entities(self, names: Iterable[str]) -> List[Entity]:
+        rows = self._query_in("SELECT name, type, description FROM entities WHERE name IN ({}) ORDER BY seq", names)
+        return [self._row_to_entity(row) for row in rows]
+
+    def get_relationships_among(self, names: Iterable[str]) -> List[Relationship]:
+        names = set(names)
+        rows = self._query_in(
+            "SELECT seq, source, target, description FROM relationships WHERE source IN ({})", names
+        )
+        rows = sorted(row for row in rows if row[2] in names)
+        return [self._row_to_relationship(row[1:]) for row in rows]
+
+    def get_text_units(self, unit_ids: Iterable[str]) -> List[TextUnit]:
+        unit_ids = list(unit_ids)
+        rows = self._query_in(
+            "SELECT document_id, text, unit_id, position, number_tokens, embedding_row "
+            "FROM text_units WHERE unit_id IN ({})",
+            unit_ids,
+        )
+        by_id = {row[2]: self._row_to_text_unit(row) for row in rows}
+        return [by_id[unit_id] for unit_id in unit_ids if unit_id in by_id]
+
+    def get_text_units_by_document(self, document_id: str) -> List[TextUnit]:
+        rows = self._query(
+            "SELECT document_id, text, unit_id, position, number_tokens, embedding_row "
+            "FROM text_units WHERE document_id = ? ORDER BY seq",
+            (document_id,),
+        )
+        return [self._row_to_text_unit(row) for row in rows]
+
+    def get_communities_at_level(self, level: int) -> List[Community]:
+        return self._select_communities("WHERE c.level = ?", (level,))
+
+    def text_unit_embeddings(self) -> Tuple[List[str], List[str], np.ndarray]:
+        rows = self._query("SELECT unit_id, document_id, embedding_row FROM text_units ORDER BY seq")
+        unit_ids = [row[0] for row in rows]
+        document_ids = [row[1] for row in rows]
+        embedding_rows = np.array([row[2] for row in rows], dtype=np.int64)
+        with self._lock:
+            if len(embedding_rows) and np.array_equal(embedding_rows, np.arange(len(embedding_rows))):
+                matrix = self._text_unit_embeddings.view()
+            else:
+                matrix = self._text_unit_embeddings.view(embedding_rows)
+        return unit_ids, document_ids, matrix
+
+    def close(self):
+        with self._lock:
+            self._text_unit_embeddings.flush()
+            self._report_embeddings.flush()
+            self._conn.close()
+
+    # ============================================================================================
+    # Helpers
+
+    def _open_matrix(self, name: str) -> EmbeddingMatrix:
+        dim = self._get_meta(f"{name}_dim")
+        rows = self._get_meta(f"{name}_rows")
+        return EmbeddingMatrix(
+            f"{self.path}.{name}.f32",
+            dim=int(dim) if dim is not None else None,
+            rows=int(rows) if rows is not None else 0,
+        )
+
+    def _save_matrix_meta(self, name: str, matrix: EmbeddingMatrix):
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+            [(f"{name}_dim", str(matrix.dim)), (f"{name}_rows", str(matrix.rows))],
+        )
+
+    def _get_meta(self, key: str) -> Optional[str]:
+        rows = self._query("SELECT value FROM meta WHERE key = ?", (key,))
+        return rows[0][0] if rows else None
+
+    def _insert_report(self, report: CommunityReport) -> int:
+        row = None
+        if report.embedding is not None:
+            row = self._report_embeddings.append(report.embedding.vector)
+            self._save_matrix_meta("community_reports", self._report_embeddings)
+        cursor = self._conn.execute(
+            "INSERT INTO community_reports (data, embedding_row) VALUES (?, ?)",
+            (report.model_dump_json(exclude={"embedding"}), row),
+        )
+        return cursor.lastrowid
+
+    def _select_communities(self, where: str, params: tuple = ()) -> List[Community]:
+        rows = self._query(
+            "SELECT c.id, c.level, c.parent, c.members, r.data, r.embedding_row "
+            "FROM communities c LEFT JOIN community_reports r ON r.seq = c.report_seq "
+            f"{where} ORDER BY c.seq",
+            params,
+        )
+        communities = []
+        for id_, level, parent, members, report_data, report_row in rows:
+            report = self._row_to_report((report_data, report_row)) if report_data else None
+            communities.append(Community(
+                id=id_,
+                level=level,
+                members=[(name, EntityType(type_)) for name, type_ in json.loads(members)],
+                parent=parent,
+                report=report,
+            ))
+        return communities
+
+    def _row_to_text_unit(self, row) -> TextUnit:
+        document_id, text, unit_id, position, number_tokens, embedding_row = row
+        with self._lock:
+            vector = self._text_unit_embeddings.get(embedding_row)
+        return TextUnit(
+            document_id=document_id,
+            text=text,
+            unit_id=unit_id,
+            position=position,
+            number_tokens=number_tokens,
+            embedding=Embedding(vector),
+        )
+
+    def _row_to_report(self, row) -> CommunityReport:
+        data, embedding_row = row
+        fields = json.loads(data)
+        embedding = None
+        if embedding_row is not None:
+            with self._lock:
+                embedding = Embedding(self._report_embeddings.get(embedding_row))
+        return CommunityReport(
+            key_entities=[Entity.model_validate(e) for e in fields["key_entities"]],
+            key_relationships=[Relationship.model_validate(r) for r in fields["key_relationships"]],
+            summary=fields["summary"],
+            embedding=embedding,
+        )
+
+    @staticmethod
+    def _row_to_entity(row) -> Entity:
+        name, type_, description = row
+        return Entity(name=name, type=EntityType(type_), description=description)
+
+    @staticmethod
+    def _row_to_relationship(row) -> Relationship:
+        source, target, description = row
+        return Relationship(source=source, target=target, description=description)
+
+    def _execute(self, sql: str, params: tuple = ()):
+        with self._lock:
+            self._conn.execute(sql, params)
+            self._commit()
+
+    def _commit(self):
+        # Inside `transaction()` the outermost block commits
+        if self._transaction_depth == 0:
+            self._conn.commit()
+
+    def _rollback(self):
+        # Rows appended to the embedding matrices since the last commit are no longer referenced,
+        # their row counts are read back from the rolled back meta table so they get overwritten
+        self._conn.rollback()
+        self._text_unit_embeddings = self._open_matrix("text_units")
+        self._report_embeddings = self._open_matrix("community_reports")
+
+    def _query(self, sql: str, params: tuple = ()) -> list:
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def _query_in(self, sql: str, values: Iterable[str]) -> list:
+        """Run a query with an `IN ({})` placeholder, splitting the values to respect SQLite limits."""
+        values = list(dict.fromkeys(values))
+        rows = []
+        for start in range(0, len(values), _MAX_PARAMS):
+            batch = values[start:start + _MAX_PARAMS]
+            placeholders = ", ".join("?" for _ in batch)
+            rows.extend(self._query(sql.format(placeholders), tuple(batch)))
+        return rows
+
+
+class SqliteKnowledgeGraphFactory(KnowledgeGraphFactory):
+    def __init__(self, directory: str):
+        """
+        Args:
+            directory: Directory where the graph databases and embedding matrices are created.
+        """
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def create_knowledge_graph(self, documents: List[Document]) -> KnowledgeGraph:
+        path = os.path.join(self.directory, f"kg_{uuid.uuid4().hex}.sqlite")
+        return SqliteKnowledgeGraph(path, documents)
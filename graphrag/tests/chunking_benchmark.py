@@ -0,0 +1,95 @@
+"""
+Benchmark of the graphrag chunker against the previous implementation, which ran the full
+en_core_web_sm pipeline over the document and then once more per sentence, per overlap
+sentence and per chunk.
+
+Usage: python -m graphrag.tests.chunking_benchmark [path/to/text.txt] [repetitions]
+Without a path, a synthetic text of roughly 30 PDF pages is used.
+"""
+import random
+import sys
+import time
+
+import spacy
+
+from graphrag.utils.text_chunking import chunk_spans
+
+full_nlp = spacy.load("en_core_web_sm")
+
+
+def legacy_chunk_text(text: str, max_tokens=3000, overlap_tokens=50) -> list[tuple[str, int]]:
+    doc = full_nlp(text)
+    sentences = [sent.text.strip() for sent in doc.sents]
+
+    chunks = []
+    current_chunk = []
+    current_len = 0
+    i = 0
+
+    while i < len(sentences):
+        sentence = sentences[i]
+        sent_len = len(full_nlp(sentence))
+
+        if current_len + sent_len <= max_tokens or not current_chunk:
+            current_chunk.append(sentence)
+            current_len += sent_len
+            i += 1
+        else:
+            chunks.append(" ".join(current_chunk))
+            overlap_chunk = []
+            overlap_len = 0
+            for sent in reversed(current_chunk):
+                sent_len = len(full_nlp(sent))
+                if overlap_len + sent_len <= overlap_tokens:
+                    overlap_chunk.insert(0, sent)
+                    overlap_len += sent_len
+                else:
+                    break
+            current_chunk = overlap_chunk
+            current_len = overlap_len
+
+    if current_chunk:
+        chunks.append(" ".join(current_chunk))
+
+    # number_tokens used to be computed with one more pass per chunk
+    return [(chunk, len(full_nlp(chunk))) for chunk in chunks]
+
+
+def synthetic_text(pages: int = 30, words_per_page: int = 500, seed: int = 42) -> str:
+    rng = random.Random(seed)
+    vocabulary = (
+        "model graph retrieval language network training data results method approach "
+        "performance evaluation baseline dataset learning attention transformer embedding "
+        "community entity relationship summary query document experiment analysis"
+    ).split()
+    words = []
+    for _ in range(pages * words_per_page):
+        words.append(rng.choice(vocabulary))
+        if rng.random() < 0.06:
+            words[-1] += "."
+    return " ".join(words) + "."
+
+
+def timed(fn, repetitions: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repetitions):
+        fn()
+    return (time.perf_counter() - start) / repetitions
+
+
+def main():
+    text = open(sys.argv[1], encoding="utf-8").read() if len(sys.argv) > 1 else synthetic_text()
+    repetitions = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+
+    for max_tokens in (300, 1800, 3000):
+        legacy = timed(lambda: legacy_chunk_text(text, max_tokens, 50), repetitions)
+        single_pass = timed(lambda: chunk_spans(text, max_tokens, 50), repetitions)
+        chunks = chunk_spans(text, max_tokens, 50)
+        print(
+            f"max_tokens={max_tokens:5d} chars={len(text)} chunks={len(chunks):4d} "
+            f"legacy={legacy:.3f}s single_pass={single_pass:.3f}s speedup={legacy / single_pass:.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
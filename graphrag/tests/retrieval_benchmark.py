@@ -0,0 +1,66 @@
+"""
+Recall/latency benchmark of the two-stage (Matryoshka) retrieval against the exact full-dimension
+scan, to choose `search_dims` and `shortlist_factor` of GraphRag and FaissVecDBFactory.
+
+Usage: python -m graphrag.tests.retrieval_benchmark [path/to/embeddings.npy] [k]
+The .npy file holds one full-dimensional embedding per row, e.g. the text unit embeddings of a
+knowledge graph. Without it, synthetic vectors whose variance decays with the dimension index
+are used, which is how Matryoshka embeddings distribute their information.
+"""
+import sys
+import time
+
+import numpy as np
+
+from graphrag.utils.matryoshka import normalized_prefix, two_stage_search
+
+
+def synthetic_embeddings(rows: int = 50_000, dim: int = 768, seed: int = 42) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    scale = np.arange(1, dim + 1) ** -0.5
+    return (rng.standard_normal((rows, dim)) * scale).astype(np.float32)
+
+
+def noisy_queries(matrix: np.ndarray, count: int = 200, noise: float = 0.5, seed: int = 7) -> np.ndarray:
+    # Queries close to random rows, so that every query has meaningful neighbours
+    rng = np.random.default_rng(seed)
+    rows = matrix[rng.choice(len(matrix), count, replace=False)]
+    spread = matrix.std(axis=0)
+    return (rows + noise * rng.standard_normal(rows.shape) * spread).astype(np.float32)
+
+
+def run(matrix: np.ndarray, queries: np.ndarray, k: int, prefix, shortlist: int):
+    start = time.perf_counter()
+    results = [two_stage_search(query, matrix, shortlist, prefix)[0][:k] for query in queries]
+    return results, (time.perf_counter() - start) / len(queries)
+
+
+def main():
+    matrix = np.load(sys.argv[1]).astype(np.float32) if len(sys.argv) > 1 else synthetic_embeddings()
+    k = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    queries = noisy_queries(matrix)
+    dim = matrix.shape[1]
+
+    exact, exact_latency = run(matrix, queries, k, None, len(matrix))
+    print(f"rows={len(matrix)} dim={dim} k={k} exact: {exact_latency * 1000:.2f} ms/query")
+    # Same scan over a precomputed normalized float32 copy, to separate the truncation gain from the
+    # conversion the exact scan does on every query
+    _, normalized_latency = run(matrix, queries, k, normalized_prefix(matrix, dim), k)
+    print(f"exact over normalized float32 copy: {normalized_latency * 1000:.2f} ms/query")
+
+    for search_dims in (32, 64, 128, 256):
+        if search_dims >= dim:
+            continue
+        prefix = normalized_prefix(matrix, search_dims)
+        for shortlist_factor in (5, 10, 20):
+            results, latency = run(matrix, queries, k, prefix, k * shortlist_factor)
+            recall = np.mean([len(set(a.tolist()) & set(b.tolist())) / k for a, b in zip(exact, results)])
+            print(
+                f"search_dims={search_dims:4d} shortlist_factor={shortlist_factor:3d} "
+                f"recall@{k}={recall:.3f} {latency * 1000:.2f} ms/query "
+                f"speedup={exact_latency / latency:.1f}x (vs normalized copy {normalized_latency / latency:.1f}x)"
+            )
+
+
+if __name__ == "__main__":
+    main()
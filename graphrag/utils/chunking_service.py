@@ -0,0 +1,289 @@
+import atexit
+import os
+import queue
+from concurrent.futures import Future, ProcessPoolExecutor, as_completed
+from functools import partial
+from itertools import count, islice
+from multiprocessing import get_all_start_methods, get_context
+from threading import Lock, Thread
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+import config
+from entities.document import Document, get_content_store
+from entities.interfaces import ContentStore, iter_blocks
+from graphrag.utils.text_chunking import ChunkSpan, doc_sentence_spans, document_chunk_key, iter_span_texts, pack_sentences, stream_chunks
+from text_processing import NlpPipeline, TokenCounter, get_chunk_cache, get_nlp, get_token_counter, set_token_counter
+
+
+class ChunkBatch(NamedTuple):
+    """Consecutive chunks of a document, as streamed by `ChunkingService.iter_chunks`."""
+    document: Optional[Document]
+    position: int
+    """Position of the first chunk in the document."""
+    spans: List[ChunkSpan]
+    texts: List[str]
+    last: bool
+    """Whether the batch ends the document, the last batch may be empty."""
+
+
+# Queue the chunk batches of a worker process are sent back through, set by `_init_worker`
+_results = None
+
+
+def _init_worker(token_counter: TokenCounter, fast_nlp: bool, results):
+    # Workers start from a fresh interpreter: count tokens like the parent, and load its spaCy pipeline once
+    global _results
+    set_token_counter(token_counter)
+    get_nlp(NlpPipeline.SENTENCES, fast_nlp)
+    _results = results
+
+
+def _chunk_batch(texts: List[str], max_tokens: int, overlap_tokens: int, nlp_batch_size: int, fast_nlp: Optional[bool] = None) -> List[List[ChunkSpan]]:
+    """Chunk a batch of texts with a single `nlp.pipe` call, returning only the chunk boundaries."""
+    nlp = get_nlp(NlpPipeline.SENTENCES, fast_nlp)
+    return [
+        pack_sentences(doc_sentence_spans(doc), max_tokens=max_tokens, overlap_tokens=overlap_tokens)
+        for doc in nlp.pipe(texts, batch_size=nlp_batch_size)
+    ]
+
+
+def _stream_document(task: int, store: Optional[ContentStore], source: str, max_tokens: int, overlap_tokens: int, batch_size: int, fast_nlp: bool) -> None:
+    """
+    Chunk a document from its content stream, read from the store by handle or given as text,
+    sending its chunks back as soon as a batch of them is ready.
+    """
+    try:
+        pieces = store.iter_content(source) if store is not None else iter_blocks(source, ContentStore.BLOCK_CHARS)
+        chunks = stream_chunks(pieces, max_tokens=max_tokens, overlap_tokens=overlap_tokens, fast_nlp=fast_nlp)
+        for batch in _document_batches(None, chunks, batch_size):
+            _results.put((task, batch))
+    except Exception as e:
+        _results.put((task, e))
+
+
+def _document_batches(document: Optional[Document], chunks: Iterable[Tuple[ChunkSpan, str]], batch_size: int) -> Iterator[ChunkBatch]:
+    chunks = iter(chunks)
+    position = 0
+    while True:
+        batch = list(islice(chunks, batch_size))
+        last = len(batch) < batch_size
+        yield ChunkBatch(document, position, [span for span, _ in batch], [text for _, text in batch], last)
+        if last:
+            return
+        position += len(batch)
+
+
+class ChunkingService:
+    """
+    Chunks documents on a persistent pool of worker processes, each of which loads the spaCy
+    model once. Documents are streamed: a worker reads a document's content piece by piece,
+    from the content store itself when the store is shareable, and sends its chunks back in
+    batches while it is still chunking the rest, so the caller can embed the first chunks
+    before the document is fully chunked and nobody holds a whole document's text at once.
+    Workers are started with forkserver (spawn where it is unavailable) rather than forked from
+    a process running threads. They get the token counter and spaCy pipeline configured in the
+    caller, and the pool is restarted if another counter is set later. The chunk cache stays in the caller.
+    """
+
+    def __init__(self, n_process: Optional[int] = None, docs_per_task: int = 2, nlp_batch_size: int = 8, chunks_per_batch: int = 16):
+        """
+        Args:
+            n_process: Number of worker processes, defaults to the number of cores.
+                With 1, chunking runs in the calling process.
+            docs_per_task: Number of texts sent to a worker at once by `chunk`.
+            nlp_batch_size: Batch size used by `nlp.pipe` inside the workers.
+            chunks_per_batch: Number of chunks of a document streamed back at once by `iter_chunks`.
+        """
+        self.n_process = n_process or os.cpu_count() or 1
+        self.docs_per_task = docs_per_task
+        self.nlp_batch_size = nlp_batch_size
+        self.chunks_per_batch = chunks_per_batch
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._executor_counter: Optional[TokenCounter] = None
+        # Queue the workers stream chunk batches through, and the inbox each task's batches are routed to
+        self._results = None
+        self._router: Optional[Thread] = None
+        self._inboxes: Dict[int, queue.Queue] = {}
+        self._tasks = count()
+        self._lock = Lock()
+
+    def chunk(self, texts: List[str], max_tokens: int, overlap_tokens: int) -> List[List[ChunkSpan]]:
+        """
+        Chunk a list of texts.
+
+        Args:
+            texts: Texts to chunk.
+            max_tokens: Maximum number of tokens per chunk.
+            overlap_tokens: Number of tokens to overlap between chunks.
+
+        Returns:
+            List[List[ChunkSpan]]: chunk spans of each text, in the order of the texts.
+        """
+        results: List[List[ChunkSpan]] = [[] for _ in texts]
+        for index, spans in self._iter_chunked(texts, max_tokens, overlap_tokens):
+            results[index] = spans
+        return results
+
+    def iter_chunks(self, documents: List[Document], max_tokens: int, overlap_tokens: int) -> Iterator[ChunkBatch]:
+        """
+        Chunk the contents of documents, yielding batches of their chunks with the chunk texts as
+        soon as they are ready. Batches of different documents are interleaved, those of a document
+        come in order and the last one is flagged. Documents found in the shared chunk cache come
+        first and are never sent to the workers, their texts are cut from the streamed content.
+        """
+        cache = get_chunk_cache()
+        missing: List[Document] = []
+        for doc in documents:
+            cached = cache.get(document_chunk_key(doc, max_tokens, overlap_tokens))
+            if cached is None:
+                missing.append(doc)
+                continue
+            spans = [ChunkSpan(*span) for span in cached]
+            yield from _document_batches(doc, zip(spans, iter_span_texts(doc.iter_content(), spans)), self.chunks_per_batch)
+
+        # Spans of the documents being chunked, cached once a document is complete
+        chunked: Dict[str, List[ChunkSpan]] = {}
+        for batch in self._iter_streamed(missing, max_tokens, overlap_tokens):
+            spans = chunked.setdefault(batch.document.id, [])
+            spans.extend(batch.spans)
+            if batch.last:
+                cache.put(document_chunk_key(batch.document, max_tokens, overlap_tokens), chunked.pop(batch.document.id))
+            yield batch
+
+    def close(self):
+        """Shut the worker processes down, they are started again if the service is used afterwards."""
+        with self._lock:
+            self._shutdown()
+
+    def _iter_streamed(self, documents: List[Document], max_tokens: int, overlap_tokens: int) -> Iterator[ChunkBatch]:
+        if self.n_process == 1:
+            for doc in documents:
+                chunks = stream_chunks(doc.iter_content(), max_tokens=max_tokens, overlap_tokens=overlap_tokens)
+                yield from _document_batches(doc, chunks, self.chunks_per_batch)
+            return
+
+        executor = self._get_executor()
+        store = get_content_store()
+        inbox: queue.Queue = queue.Queue()
+        pending: Dict[int, Document] = {}
+        futures: List[Future] = []
+        try:
+            for doc in documents:
+                task = next(self._tasks)
+                with self._lock:
+                    self._inboxes[task] = inbox
+                pending[task] = doc
+                # A shareable store is read by the worker itself, other contents are sent along
+                if store.shareable and doc.content_handle:
+                    source = (store, doc.content_handle)
+                else:
+                    source = (None, doc.content)
+                future = executor.submit(_stream_document, task, *source, max_tokens, overlap_tokens, self.chunks_per_batch, config.fast_nlp())
+                future.add_done_callback(partial(_report_crash, inbox, task))
+                futures.append(future)
+
+            while pending:
+                task, message = inbox.get()
+                if isinstance(message, BaseException):
+                    raise message
+                doc = pending[task]
+                if message.last:
+                    del pending[task]
+                    with self._lock:
+                        self._inboxes.pop(task, None)
+                yield message._replace(document=doc)
+        finally:
+            # The caller stopped early or a worker failed: documents not started yet are dropped
+            for future in futures:
+                future.cancel()
+            with self._lock:
+                for task in pending:
+                    self._inboxes.pop(task, None)
+
+    def _iter_chunked(self, texts: List[str], max_tokens: int, overlap_tokens: int) -> Iterator[Tuple[int, List[ChunkSpan]]]:
+        batches = [
+            list(range(start, min(start + self.docs_per_task, len(texts))))
+            for start in range(0, len(texts), self.docs_per_task)
+        ]
+
+        if self.n_process == 1:
+            for batch in batches:
+                spans = _chunk_batch([texts[i] for i in batch], max_tokens, overlap_tokens, self.nlp_batch_size)
+                yield from zip(batch, spans)
+            return
+
+        executor = self._get_executor()
+        futures: dict[Future, List[int]] = {
+            executor.submit(_chunk_batch, [texts[i] for i in batch], max_tokens, overlap_tokens, self.nlp_batch_size, config.fast_nlp()): batch
+            for batch in batches
+        }
+        for future in as_completed(futures):
+            yield from zip(futures[future], future.result())
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        token_counter = get_token_counter()
+        with self._lock:
+            if self._executor is not None and self._executor_counter is not token_counter:
+                self._shutdown()
+            if self._executor is None:
+                method = "forkserver" if "forkserver" in get_all_start_methods() else "spawn"
+                context = get_context(method)
+                self._results = context.SimpleQueue()
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.n_process,
+                    mp_context=context,
+                    initializer=_init_worker,
+                    initargs=(token_counter, config.fast_nlp(), self._results),
+                )
+                self._executor_counter = token_counter
+                self._router = Thread(target=self._route, args=(self._results,), name="chunking-results", daemon=True)
+                self._router.start()
+            return self._executor
+
+    def _route(self, results) -> None:
+        # Deliver the batches streamed by the workers to the inbox of their task, until the pool is shut down
+        while (item := results.get()) is not None:
+            task, message = item
+            with self._lock:
+                inbox = self._inboxes.get(task)
+            if inbox is not None:
+                inbox.put((task, message))
+
+    def _shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+            self._results.put(None)
+            self._router.join()
+            self._results.close()
+            self._results = None
+            self._router = None
+
+
+def _report_crash(inbox: queue.Queue, task: int, future: Future) -> None:
+    # A worker that died (e.g. killed for memory) never sends its batches, the waiting caller gets the error
+    if not future.cancelled() and future.exception() is not None:
+        inbox.put((task, future.exception()))
+
+
+_chunking_service: Optional[ChunkingService] = None
+_service_lock = Lock()
+
+
+def set_chunking_service(service: ChunkingService) -> None:
+    """Set the service shared by every GraphRag that is not given one."""
+    global _chunking_service
+    with _service_lock:
+        _chunking_service = service
+
+
+def get_chunking_service() -> ChunkingService:
+    """
+    :return: The chunking service shared by default, whose workers are shut down at exit
+    """
+    global _chunking_service
+    with _service_lock:
+        if _chunking_service is None:
+            _chunking_service = ChunkingService()
+            atexit.register(_chunking_service.close)
+        return _chunking_service
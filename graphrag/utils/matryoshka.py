@@ -0,0 +1,84 @@
+from typing import Optional, Tuple
+
+import numpy as np
+
+
+def normalized_prefix(matrix: np.ndarray, dims: int) -> np.ndarray:
+    """
+    First `dims` columns of a matrix of embeddings, L2-normalized per row and copied to a
+    contiguous float32 array, so that scanning it reads `dims` values per row.
+    Matryoshka embeddings (e.g. Gemini's) front-load their information, so the prefix of a
+    full-dimensional embedding is itself a usable lower-dimensional embedding.
+
+    Args:
+        matrix (np.ndarray): Embeddings of shape (rows, full dimension), or a single vector.
+        dims (int): Number of leading dimensions to keep.
+
+    Returns:
+        np.ndarray: the normalized prefixes, with the same number of rows.
+    """
+    prefix = np.ascontiguousarray(np.asarray(matrix)[..., :dims], dtype=np.float32)
+    norms = np.linalg.norm(prefix, axis=-1, keepdims=True)
+    return prefix / (norms + 1e-8)
+
+
+def cosine_similarities(query_vector: np.ndarray, matrix: np.ndarray) -> np.ndarray:
+    """Cosine similarity between a query vector and every row of a matrix."""
+    if len(matrix) == 0:
+        return np.zeros(0)
+    query_vector = np.asarray(query_vector, dtype=np.float64)
+    matrix = np.asarray(matrix, dtype=np.float64)
+    dots = matrix @ query_vector
+    norms = np.linalg.norm(matrix, axis=1) * np.linalg.norm(query_vector)
+    return dots / (norms + 1e-8)
+
+
+def coarse_shortlist(query_vector: np.ndarray, prefix_matrix: np.ndarray, size: int) -> np.ndarray:
+    """
+    Rows of `prefix_matrix` with the `size` highest cosine similarities to the query's prefix,
+    in no particular order.
+
+    Args:
+        query_vector (np.ndarray): Full-dimensional query embedding.
+        prefix_matrix (np.ndarray): Matrix returned by `normalized_prefix`.
+        size (int): Number of rows to keep.
+
+    Returns:
+        np.ndarray: indices of the shortlisted rows.
+    """
+    rows = len(prefix_matrix)
+    if size >= rows:
+        return np.arange(rows)
+    scores = prefix_matrix @ normalized_prefix(query_vector, prefix_matrix.shape[1])
+    return np.argpartition(-scores, size - 1)[:size]
+
+
+def two_stage_search(
+    query_vector: np.ndarray,
+    matrix: np.ndarray,
+    shortlist: int,
+    prefix_matrix: Optional[np.ndarray] = None,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Rank the rows of a matrix by cosine similarity to a query. With a prefix matrix, a coarse
+    pass over it keeps `shortlist` candidates that are then reranked exactly at full dimension,
+    otherwise every row is scored exactly.
+
+    Args:
+        query_vector (np.ndarray): Full-dimensional query embedding.
+        matrix (np.ndarray): Full-dimensional embeddings, one per row.
+        shortlist (int): Number of candidates kept by the coarse pass.
+        prefix_matrix (Optional[np.ndarray]): `normalized_prefix` of `matrix`, None for an exact scan.
+
+    Returns:
+        Tuple containing:
+        - Row indices, by decreasing similarity
+        - Their exact cosine similarities
+    """
+    if prefix_matrix is None or shortlist >= len(matrix):
+        candidates = np.arange(len(matrix))
+    else:
+        candidates = np.sort(coarse_shortlist(query_vector, prefix_matrix, shortlist))
+    similarities = cosine_similarities(query_vector, matrix[candidates]) if len(candidates) else np.zeros(0)
+    order = np.argsort(-similarities, kind="stable")
+    return candidates[order], similarities[order]
@@ -1,70 +1,245 @@
-import spacy
-from typing import List, Optional
+from typing import Iterable, Iterator, List, NamedTuple, Optional, Tuple
 from entities.document import Document
+from entities.embedding import Embedding
 from graphrag.models.text_unit import TextUnit
 from pydantic import ValidationError
 from graphrag.interfaces.text_embedder import TextEmbedder
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from text_processing import ChunkKey, NlpPipeline, get_chunk_cache, get_nlp, get_token_counter, pipeline_name
 
-# Load spaCy with only the tokenizer enabled
-nlp = spacy.load(
-    "en_core_web_sm",
-)
 
-def chunk_text(text: str, max_tokens=3000, overlap_tokens=50) -> list[str]:
+class ChunkSpan(NamedTuple):
+    """A chunk as a character range of the original text, with its token count."""
+    start: int
+    end: int
+    number_tokens: int
+
+
+def sentence_spans(text: str) -> List[ChunkSpan]:
     """
-    Chunk text into semantically meaningful chunks using spaCy, with overlap.
+    Segment text into sentences with a single spaCy pass and count their tokens with the
+    configured token counter, so chunk budgets match the LLM's tokenizer.
 
     Args:
-        text (str): Input text to be chunked.
+        text (str): Input text to be segmented.
+
+    Returns:
+        List[ChunkSpan]: one span per non-empty sentence, surrounding whitespace excluded.
+    """
+    return doc_sentence_spans(get_nlp(NlpPipeline.SENTENCES)(text))
+
+
+def doc_sentence_spans(doc) -> List[ChunkSpan]:
+    """
+    Sentence spans of an already processed spaCy Doc, see `sentence_spans`.
+    """
+    count = get_token_counter().count
+    text = doc.text
+    spans = []
+    for sent in doc.sents:
+        raw = sent.text
+        start = sent.start_char + (len(raw) - len(raw.lstrip()))
+        end = sent.end_char - (len(raw) - len(raw.rstrip()))
+        if start >= end:
+            continue
+        spans.append(ChunkSpan(start, end, count(text[start:end])))
+    return spans
+
+
+def iter_pack_sentences(sentences: Iterable[ChunkSpan], max_tokens=3000, overlap_tokens=50) -> Iterator[ChunkSpan]:
+    """
+    Pack consecutive sentences into chunks of at most `max_tokens` tokens, starting each chunk
+    with the trailing sentences of the previous one that fit in `overlap_tokens`.
+    A sentence longer than `max_tokens` is emitted as a chunk of its own.
+    Chunks are yielded as soon as they are complete, so sentences can be produced lazily.
+
+    Args:
+        sentences (Iterable[ChunkSpan]): Sentence spans, as returned by `sentence_spans`.
         max_tokens (int): Maximum number of tokens per chunk.
         overlap_tokens (int): Number of tokens to overlap between chunks.
 
-    Returns:
-        List[str]: list of chunks.
+    Yields:
+        ChunkSpan: chunk spans over the same text as the sentences.
     """
-    doc = nlp(text)
-    sentences = [sent.text.strip() for sent in doc.sents]
+    def make_chunk(chunk: List[ChunkSpan]) -> ChunkSpan:
+        return ChunkSpan(chunk[0].start, chunk[-1].end, sum(s.number_tokens for s in chunk))
 
-    chunks = []
-    current_chunk = []
+    current_chunk: List[ChunkSpan] = []
     current_len = 0
-    i = 0
-
-    while i < len(sentences):
-        sentence = sentences[i]
-        sentence_doc = nlp(sentence)
-        sent_len = len(sentence_doc)
-
-        if current_len + sent_len <= max_tokens:
-            current_chunk.append(sentence)
-            current_len += sent_len
-            i += 1
-        else:
+    # Sentences added since the last chunk was saved, the overlap alone is never saved
+    added = 0
+
+    for sentence in sentences:
+        if current_len + sentence.number_tokens > max_tokens and added:
             # Save current chunk
-            chunk_text = " ".join(current_chunk)
-            chunks.append(chunk_text)
+            yield make_chunk(current_chunk)
 
             # Prepare for next chunk with overlap
             overlap_chunk = []
             overlap_len = 0
-            for sent in reversed(current_chunk):
-                sent_len = len(nlp(sent))
-                if overlap_len + sent_len <= overlap_tokens:
-                    overlap_chunk.insert(0, sent)
-                    overlap_len += sent_len
+            for previous in reversed(current_chunk):
+                if overlap_len + previous.number_tokens <= overlap_tokens:
+                    overlap_chunk.insert(0, previous)
+                    overlap_len += previous.number_tokens
                 else:
                     break
 
             current_chunk = overlap_chunk
             current_len = overlap_len
+            added = 0
+
+        current_chunk.append(sentence)
+        current_len += sentence.number_tokens
+        added += 1
 
     # Add remaining chunk
-    if current_chunk:
-        chunk_text = " ".join(current_chunk)
-        chunks.append(chunk_text)
+    if added:
+        yield make_chunk(current_chunk)
+
+
+def pack_sentences(sentences: List[ChunkSpan], max_tokens=3000, overlap_tokens=50) -> List[ChunkSpan]:
+    """
+    List of the chunks `iter_pack_sentences` packs the sentences into.
+
+    Args:
+        sentences (List[ChunkSpan]): Sentence spans, as returned by `sentence_spans`.
+        max_tokens (int): Maximum number of tokens per chunk.
+        overlap_tokens (int): Number of tokens to overlap between chunks.
+
+    Returns:
+        List[ChunkSpan]: chunk spans over the same text as the sentences.
+    """
+    return list(iter_pack_sentences(sentences, max_tokens=max_tokens, overlap_tokens=overlap_tokens))
+
+
+def stream_chunks(pieces: Iterable[str], max_tokens=3000, overlap_tokens=50, fast_nlp: Optional[bool] = None) -> Iterator[Tuple[ChunkSpan, str]]:
+    """
+    Chunk a stream of strings, e.g. the pages of a document, yielding each chunk with its text
+    as soon as the sentences it covers have arrived, so that it can be embedded while later
+    pieces are still being read. The last sentence of a piece may continue in the next one, so
+    it is segmented again with the following piece. Only the text of the chunk being packed and
+    of the pieces not yet segmented is kept, never the whole text.
+
+    Args:
+        pieces (Iterable[str]): Consecutive parts of the text.
+        max_tokens (int): Maximum number of tokens per chunk.
+        overlap_tokens (int): Number of tokens to overlap between chunks.
+        fast_nlp (Optional[bool]): Sentence pipeline to use, see `get_nlp`.
+
+    Yields:
+        Tuple[ChunkSpan, str]: each chunk span, with offsets into the concatenated text, and its text.
+    """
+    # The text received from offset `window_start` on
+    window = ""
+    window_start = 0
+
+    def sentences() -> Iterator[ChunkSpan]:
+        nonlocal window
+        nlp = get_nlp(NlpPipeline.SENTENCES, fast_nlp)
+        # Offset of the text not segmented for good yet
+        tail = 0
+        for piece in pieces:
+            window += piece
+            spans = doc_sentence_spans(nlp(window[tail - window_start:]))
+            if len(spans) < 2:
+                continue
+            for span in spans[:-1]:
+                yield ChunkSpan(span.start + tail, span.end + tail, span.number_tokens)
+            tail += spans[-1].start
+
+        for span in doc_sentence_spans(nlp(window[tail - window_start:])):
+            yield ChunkSpan(span.start + tail, span.end + tail, span.number_tokens)
+
+    for chunk in iter_pack_sentences(sentences(), max_tokens=max_tokens, overlap_tokens=overlap_tokens):
+        yield chunk, window[chunk.start - window_start:chunk.end - window_start]
+        # The next chunk starts at the overlap, inside this one
+        window = window[chunk.start - window_start:]
+        window_start = chunk.start
+
+
+def iter_span_texts(pieces: Iterable[str], spans: Iterable[ChunkSpan]) -> Iterator[str]:
+    """
+    Texts of the chunk spans of a text given as a stream of strings, reading pieces only as
+    far as the current span reaches.
+
+    Args:
+        pieces (Iterable[str]): Consecutive parts of the text.
+        spans (Iterable[ChunkSpan]): Chunk spans of the text, in order.
+
+    Yields:
+        str: the text of each span.
+    """
+    pieces = iter(pieces)
+    window = ""
+    window_start = 0
+    for span in spans:
+        while window_start + len(window) < span.end:
+            piece = next(pieces, None)
+            if piece is None:
+                break
+            window += piece
+        yield window[span.start - window_start:span.end - window_start]
+        window = window[span.start - window_start:]
+        window_start = span.start
+
+
+def chunk_spans(text: str, max_tokens=3000, overlap_tokens=50) -> List[ChunkSpan]:
+    """
+    Chunk text into sentence-aligned character spans with their token counts.
+
+    Args:
+        text (str): Input text to be chunked.
+        max_tokens (int): Maximum number of tokens per chunk.
+        overlap_tokens (int): Number of tokens to overlap between chunks.
+
+    Returns:
+        List[ChunkSpan]: list of chunk spans.
+    """
+    return pack_sentences(sentence_spans(text), max_tokens=max_tokens, overlap_tokens=overlap_tokens)
+
+
+def document_chunk_key(document: Document, max_tokens: int, overlap_tokens: int) -> ChunkKey:
+    """
+    Key of a document's sentence-aligned chunking in the shared chunk cache.
+    """
+    chunker = "graphrag.sentence_packing/" + pipeline_name(NlpPipeline.SENTENCES) + "/" + get_token_counter().name
+    return ChunkKey.for_document(document, chunker, max_tokens, overlap_tokens)
+
+
+def document_chunk_spans(document: Document, max_tokens=3000, overlap_tokens=50) -> List[ChunkSpan]:
+    """
+    Chunk spans of a document's content, served from the shared chunk cache when the
+    same content was already chunked with the same parameters, and otherwise chunked
+    from the content streamed out of the content store.
+
+    Args:
+        document (Document): Document to be chunked.
+        max_tokens (int): Maximum number of tokens per chunk.
+        overlap_tokens (int): Number of tokens to overlap between chunks.
+
+    Returns:
+        List[ChunkSpan]: list of chunk spans over the document's content.
+    """
+    spans = get_chunk_cache().get_or_compute(
+        document_chunk_key(document, max_tokens, overlap_tokens),
+        lambda: [span for span, _ in stream_chunks(document.iter_content(), max_tokens=max_tokens, overlap_tokens=overlap_tokens)],
+    )
+    return [ChunkSpan(*span) for span in spans]
+
+
+def chunk_text(text: str, max_tokens=3000, overlap_tokens=50) -> list[str]:
+    """
+    Chunk text into semantically meaningful chunks using spaCy, with overlap.
+
+    Args:
+        text (str): Input text to be chunked.
+        max_tokens (int): Maximum number of tokens per chunk.
+        overlap_tokens (int): Number of tokens to overlap between chunks.
+
+    Returns:
+        List[str]: list of chunks.
+    """
+    return [text[span.start:span.end] for span in chunk_spans(text, max_tokens, overlap_tokens)]
 
-    return chunks
 
 def chunk_document(text_embedder: TextEmbedder, document: Document, max_tokens=30000, overlap_tokens=50) -> List[TextUnit]:
     """
@@ -79,30 +254,69 @@ def chunk_document(text_embedder: TextEmbedder, document: Document, max_tokens=3
     Returns:
         List[TextUnit]: list of TextUnit objects created from the chunks.
     """
-    if not document.content:
+    content = document.content
+    if not content:
         raise ValidationError("Document content is empty")
-    
-    # Get raw text chunks using the chunking function
-    text_chunks = chunk_text(document.content, max_tokens=max_tokens, overlap_tokens=overlap_tokens)
-
-    def create_text_unit(i_chunk):
-        i, chunk = i_chunk
-        return TextUnit(
-            document_id=document.id,
-            text=chunk,
-            unit_id=f"{document.id}_chunk_{i}",
-            position=i,
-            number_tokens=len(nlp(chunk)),
-            embedding=text_embedder.embed(chunk)
-        )
 
-    text_units = []
-    with ThreadPoolExecutor(max_workers=5) as executor:
-        futures = {executor.submit(create_text_unit, (i, chunk)): i for i, chunk in enumerate(text_chunks)}
-        for future in as_completed(futures):
-            text_unit = future.result()
-            text_units.append(text_unit)
+    # Get chunk boundaries and token counts with a single spaCy pass, or from the cache
+    spans = document_chunk_spans(document, max_tokens=max_tokens, overlap_tokens=overlap_tokens)
+
+    # Embed every chunk with batched requests
+    return spans_to_text_units(text_embedder, document.id, content, spans)
+
+
+def spans_to_text_units(text_embedder: TextEmbedder, document_id: str, content: str, spans: List[ChunkSpan]) -> List[TextUnit]:
+    """
+    Build the TextUnits of a document's chunk spans, embedding their texts in batches.
+
+    Args:
+        text_embedder (TextEmbedder): Embedder for the chunk texts.
+        document_id (str): Id of the chunked document.
+        content (str): Full content of the document the spans refer to.
+        spans (List[ChunkSpan]): The chunk spans, in document order.
+
+    Returns:
+        List[TextUnit]: the text units of the chunks, in document order.
+    """
+    return texts_to_text_units(text_embedder, document_id, [content[span.start:span.end] for span in spans], spans)
+
 
-    # Sort to preserve original order
-    text_units.sort(key=lambda tu: tu.position)
-    return text_units
+def texts_to_text_units(text_embedder: TextEmbedder, document_id: str, texts: List[str], spans: List[ChunkSpan], position: int = 0) -> List[TextUnit]:
+    """
+    Build the TextUnits of consecutive chunks of a document whose texts are already cut,
+    e.g. a batch of `stream_chunks`, embedding the texts with a single batched request.
+
+    Args:
+        text_embedder (TextEmbedder): Embedder for the chunk texts.
+        document_id (str): Id of the chunked document.
+        texts (List[str]): Texts of the chunks.
+        spans (List[ChunkSpan]): Spans of the chunks, in document order.
+        position (int): Position of the first chunk in the document.
+
+    Returns:
+        List[TextUnit]: the text units of the chunks, in document order.
+    """
+    embeddings = text_embedder.embed_batch(texts) if texts else []
+    return _text_units(document_id, texts, spans, embeddings, position)
+
+
+async def atexts_to_text_units(text_embedder: TextEmbedder, document_id: str, texts: List[str], spans: List[ChunkSpan], position: int = 0) -> List[TextUnit]:
+    """
+    Asynchronous `texts_to_text_units`, embedding the chunk texts with `aembed_batch`.
+    """
+    embeddings = await text_embedder.aembed_batch(texts) if texts else []
+    return _text_units(document_id, texts, spans, embeddings, position)
+
+
+def _text_units(document_id: str, chunks: List[str], spans: List[ChunkSpan], embeddings: List[Embedding], first_position: int = 0) -> List[TextUnit]:
+    return [
+        TextUnit(
+            document_id=document_id,
+            text=chunk,
+            unit_id=f"{document_id}_chunk_{position}",
+            position=position,
+            number_tokens=span.number_tokens,
+            embedding=embedding
+        )
+        for position, (chunk, span, embedding) in enumerate(zip(chunks, spans, embeddings), first_position)
+    ]
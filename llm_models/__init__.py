@@ -1,8 +1,16 @@
 from .fireworks_api import FireworksApi, FireworksEmbedding
 from .json_generators.gemini import GeminiJsonGenerator
 from .json_generators.inspect_wrapper import JsonGeneratorInspectionWrapper
+from .json_generators.cached import CachedJsonGenerator
+from .json_generators.instrumented import InstrumentedJsonGenerator
+from .json_generators.batch import BatchJobJsonGenerator, BatchBackend, BatchResult, BatchRequestError, LocalFileBatchBackend
+from .json_generators.gemini_batch import GeminiBatchBackend
+from .json_generators.routing import RoutingJsonGenerator, JsonRoute, DEFAULT_ROUTES
 from .text_embedders.nomic import NomicAIEmbedder
 from .text_embedders.gemini import GeminiEmbedder
+from .text_embedders.cached import CachedEmbedder
+from .text_embedders.instrumented import InstrumentedEmbedder
+from .text_embedders.local import HashingEmbedder, SentenceTransformerEmbedder
 
 
 __all__ = [
@@ -11,5 +19,20 @@ __all__ = [
     "GeminiJsonGenerator",
     "NomicAIEmbedder",
     "JsonGeneratorInspectionWrapper",
-    "GeminiEmbedder"
+    "CachedJsonGenerator",
+    "InstrumentedJsonGenerator",
+    "RoutingJsonGenerator",
+    "JsonRoute",
+    "DEFAULT_ROUTES",
+    "BatchJobJsonGenerator",
+    "BatchBackend",
+    "BatchResult",
+    "BatchRequestError",
+    "LocalFileBatchBackend",
+    "GeminiBatchBackend",
+    "GeminiEmbedder",
+    "CachedEmbedder",
+    "InstrumentedEmbedder",
+    "HashingEmbedder",
+    "SentenceTransformerEmbedder"
 ]
@@ -1,13 +1,18 @@
+import asyncio
 import os
 from typing import Optional, Type, TypeVar
 import fireworks.client
 from dotenv import load_dotenv
-from openai import OpenAI
+from openai import AsyncOpenAI, OpenAI
 from pydantic import BaseModel
 import numpy as np
-import time
 
 from entities.embedding import Embedding
+from entities.llm_task import LlmTask
+from entities.model_registry import json_schema, schema_prompt_text
+from llm_models.text_embedders.batching import split_batches
+from resilience import RateLimiter, RetryPolicy, concurrency_limiter, provider_retry_policy
+from text_processing import count_tokens
 
 import config
 from receptionist_agent.interfaces import JsonGenerator as ReceptionistJsonGen
@@ -53,7 +58,18 @@ class FireworksApi(
 ):
     """Implementation of various JSON generation interfaces using the Fireworks API."""
 
-    def __init__(self):
+    # Limits of a single embeddings request with list input
+    EMBED_BATCH_SIZE = 256
+    EMBED_BATCH_CHARS = 400_000
+
+    def __init__(self, rate_limiter: Optional[RateLimiter] = None, retry_policy: Optional[RetryPolicy] = None):
+        """
+        Args:
+            rate_limiter: Limiter shared by every request of this client, defaults to the limits in
+                FIREWORKS_RPM and FIREWORKS_TPM (600 requests per minute, no token limit).
+            retry_policy: Retries of failed requests, defaults to `provider_retry_policy` behind
+                the Fireworks circuit breakers.
+        """
 
         fireworks_api_key = os.getenv("FIREWORKS_API_KEY")
         self._dim = None
@@ -66,35 +82,82 @@ class FireworksApi(
         fireworks.client.api_key = fireworks_api_key
         self.fireworks_api_key = fireworks_api_key
 
-    def generate_json(self, query: str, schema: Type[T]) -> T:
+        tokens_per_minute = os.getenv("FIREWORKS_TPM")
+        self.rate_limiter = rate_limiter or RateLimiter(
+            requests_per_minute=float(os.getenv("FIREWORKS_RPM", "600")),
+            tokens_per_minute=float(tokens_per_minute) if tokens_per_minute else None,
+        )
+        self.retry_policy = retry_policy or provider_retry_policy("fireworks.chat")
+        self.embedding_retry_policy = retry_policy or provider_retry_policy("fireworks.embeddings")
+        # Adaptive gates shared with every other client of the same endpoints
+        self.chat_limiter = concurrency_limiter("fireworks.chat")
+        self.embedding_limiter = concurrency_limiter("fireworks.embeddings")
+        # Long-lived clients, their connection pools are shared by every thread
+        self._client = fireworks.client.Fireworks(api_key=fireworks_api_key)
+        self._embedding_client = OpenAI(
+            base_url="https://api.fireworks.ai/inference/v1",
+            api_key=fireworks_api_key,
+        )
+        self._async_embedding_client = AsyncOpenAI(
+            base_url="https://api.fireworks.ai/inference/v1",
+            api_key=fireworks_api_key,
+        )
+
+    def generate_json(self, query: str, schema: Type[T], task: Optional[LlmTask] = None) -> T:
         if config.inspect_query():
             print("=" * 60)
             print(query)
             input()
 
-        client = fireworks.client.Fireworks(api_key=self.fireworks_api_key)
-        response = client.chat.completions.create(
+        estimated_tokens = count_tokens(query) + count_tokens(schema_prompt_text(schema))
+
+        def request():
+            self.rate_limiter.acquire(estimated_tokens)
+            return self.chat_limiter.call(
+                lambda: self._client.chat.completions.create(**self._chat_request(query, json_schema(schema)))
+            )
+
+        response = self.retry_policy.call(request)
+        self._adjust_usage(response, estimated_tokens)
+        response = response.choices[0].message.content
+        if config.inspect_query():
+            print("-" * 60)
+            print(response)
+            print("=" * 60)
+            input()
+        response = schema.model_validate_json(response)
+        return response
+
+    async def agenerate_json(self, query: str, schema: Type[T], task: Optional[LlmTask] = None) -> T:
+        if config.inspect_query():
+            # Inspection waits on input(), keep it off the event loop
+            return await asyncio.to_thread(self.generate_json, query, schema, task)
+
+        estimated_tokens = count_tokens(query) + count_tokens(schema_prompt_text(schema))
+
+        async def request():
+            await self.rate_limiter.aacquire(estimated_tokens)
+            return await self.chat_limiter.acall(
+                lambda: self._client.chat.completions.acreate(**self._chat_request(query, json_schema(schema)))
+            )
+
+        response = await self.retry_policy.acall(request)
+        self._adjust_usage(response, estimated_tokens)
+        return schema.model_validate_json(response.choices[0].message.content)
+
+    @staticmethod
+    def _chat_request(query: str, json_schema: dict) -> dict:
+        return dict(
             model=models[0],
             response_format={
                 "type": "json_object",
-                "schema": schema.model_json_schema(),
+                "schema": json_schema,
             },
             messages=[
                 {"role": "system", "content": query},
             ],
             temperature=0.2,
         )
-        print("Waiting 6 seconds...")
-        time.sleep(6)
-        print("Wait is up")
-        response = response.choices[0].message.content
-        if config.inspect_query():
-            print("-" * 60)
-            print(response)
-            print("=" * 60)
-            input()
-        response = schema.model_validate_json(response)
-        return response
 
     def embed(self, text: str) -> Embedding:
         return self.embed_texts([text])[0]
@@ -106,25 +169,47 @@ class FireworksApi(
 
         return self._dim
 
-    def embed_texts(self, texts: list[str]) -> list[Embedding]:
-        client = OpenAI(
-            base_url="https://api.fireworks.ai/inference/v1",
-            api_key=self.fireworks_api_key,
-        )
+    def embed_batch(self, texts: list[str]) -> list[Embedding]:
+        return self.embed_texts(texts)
+
+    async def aembed_batch(self, texts: list[str]) -> list[Embedding]:
+        async def embed_request(batch: list[str]) -> list[Embedding]:
+            estimated_tokens = sum(count_tokens(text) for text in batch)
+
+            async def request():
+                await self.rate_limiter.aacquire(estimated_tokens)
+                return await self.embedding_limiter.acall(lambda: self._async_embedding_client.embeddings.create(
+                    model="nomic-ai/nomic-embed-text-v1.5", input=batch
+                ))
+
+            response = await self.embedding_retry_policy.acall(request)
+            self._adjust_usage(response, estimated_tokens)
+            return [FireworksEmbedding(np.array(data.embedding)) for data in sorted(response.data, key=lambda d: d.index)]
+
+        batches = list(split_batches(texts, self.EMBED_BATCH_SIZE, self.EMBED_BATCH_CHARS))
+        results = await asyncio.gather(*(embed_request(batch) for batch in batches))
+        return [embedding for result in results for embedding in result]
 
+    def embed_texts(self, texts: list[str]) -> list[Embedding]:
         answ = []
-        for text in texts:
-            vector = (
-                client.embeddings.create(
-                    model="nomic-ai/nomic-embed-text-v1.5", input=text
-                )
-                .data[0]
-                .embedding
-            )
-            print("Waiting 6 seconds...")
-            time.sleep(6)
-            print("Wait is up")
-            embedding = FireworksEmbedding(np.array(vector))
-            answ += [embedding]
+        for batch in split_batches(texts, self.EMBED_BATCH_SIZE, self.EMBED_BATCH_CHARS):
+            estimated_tokens = sum(count_tokens(text) for text in batch)
+
+            def request():
+                self.rate_limiter.acquire(estimated_tokens)
+                return self.embedding_limiter.call(lambda: self._embedding_client.embeddings.create(
+                    model="nomic-ai/nomic-embed-text-v1.5", input=batch
+                ))
+
+            response = self.embedding_retry_policy.call(request)
+            self._adjust_usage(response, estimated_tokens)
+            for data in sorted(response.data, key=lambda d: d.index):
+                answ += [FireworksEmbedding(np.array(data.embedding))]
 
         return answ
+
+    def _adjust_usage(self, response, estimated_tokens: int) -> None:
+        usage = getattr(response, "usage", None)
+        total_tokens = getattr(usage, "total_tokens", None)
+        if total_tokens is not None:
+            self.rate_limiter.adjust(total_tokens - estimated_tokens)
@@ -0,0 +1,239 @@
+import asyncio
+import json
+import os
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple, Type
+
+from pydantic import ValidationError
+
+from entities.llm_task import LlmTask
+from entities.model_registry import json_schema
+from graphrag.interfaces.batch_json_generator import BatchJsonGenerator as GraphRagBatchJsonGen
+from graphrag.interfaces.json_generator import JsonGenerator as GraphRagJsonGen, T
+from expert_set.interfaces.batch_json_generator import BatchJsonGenerator as ExpertSetBatchJsonGen
+
+
+class BatchResult(NamedTuple):
+    """Outcome of one request of a batch job: the response text, or the error the provider reported."""
+    text: Optional[str] = None
+    error: Optional[str] = None
+
+
+class BatchRequestError(RuntimeError):
+    """Raised by the future of a request that the batch job did not answer with a valid response."""
+
+
+class BatchBackend(ABC):
+    """
+    Runs batch jobs. A job file is JSONL with one request per line:
+    {"id": ..., "model": ..., "task": ..., "query": ..., "schema": <JSON schema>}.
+    """
+
+    @abstractmethod
+    def submit(self, job_path: str) -> str:
+        """
+        Submit a job file.
+        :return: The identifier of the job, to poll it.
+        """
+        pass
+
+    @abstractmethod
+    def poll(self, job_id: str) -> Optional[Dict[str, BatchResult]]:
+        """
+        :return: The result of each request of a finished job by request id, None while it runs
+        """
+        pass
+
+
+class LocalFileBatchBackend(BatchBackend):
+    """
+    Runs jobs in-process on a background thread, answering each request with `respond`, and writes
+    the results next to the job file. A stand-in for a provider's batch API in tests and offline runs.
+    """
+
+    def __init__(self, respond: Callable[[dict], str]):
+        """
+        Args:
+            respond: Response text of a request, given its job file record.
+        """
+        self.respond = respond
+
+    def submit(self, job_path: str) -> str:
+        results_path = job_path + ".results.jsonl"
+        threading.Thread(target=self._run, args=(job_path, results_path), daemon=True).start()
+        return results_path
+
+    def poll(self, job_id: str) -> Optional[Dict[str, BatchResult]]:
+        if not os.path.exists(job_id):
+            return None
+        with open(job_id, encoding="utf-8") as f:
+            records = [json.loads(line) for line in f if line.strip()]
+        return {record["id"]: BatchResult(record.get("text"), record.get("error")) for record in records}
+
+    def _run(self, job_path: str, results_path: str) -> None:
+        with open(job_path, encoding="utf-8") as f:
+            requests = [json.loads(line) for line in f if line.strip()]
+        results = []
+        for request in requests:
+            try:
+                results.append({"id": request["id"], "text": self.respond(request)})
+            except Exception as e:
+                results.append({"id": request["id"], "error": repr(e)})
+        # Written aside then renamed, so a poll never reads a partial file
+        partial_path = results_path + ".partial"
+        with open(partial_path, "w", encoding="utf-8") as f:
+            f.writelines(json.dumps(result, ensure_ascii=False) + "\n" for result in results)
+        os.replace(partial_path, results_path)
+
+
+class BatchJobJsonGenerator(GraphRagBatchJsonGen, ExpertSetBatchJsonGen):
+    """
+    Collects requests into job files and submits them in bulk through a batch backend, which
+    providers serve with higher throughput and lower rates than interactive requests, without
+    using interactive quota. Requests are sent once `max_batch_size` are pending or the oldest one
+    has waited `flush_interval` seconds, and their futures are resolved as jobs finish.
+    Requests the job does not answer with a valid response are sent to `fallback` when given.
+    """
+
+    def __init__(
+        self,
+        backend: BatchBackend,
+        model: str = "",
+        job_dir: str = ".sota_cache/batch_jobs",
+        max_batch_size: int = 1000,
+        flush_interval: float = 5.0,
+        poll_interval: float = 30.0,
+        fallback: Optional[GraphRagJsonGen] = None,
+    ):
+        """
+        Args:
+            backend: Runs the jobs.
+            model: Model answering the requests, written in the job file.
+            job_dir: Directory of the job files.
+            max_batch_size: Requests per job.
+            flush_interval: Longest wait of a request before its job is submitted, in seconds.
+            poll_interval: Seconds between checks of the running jobs.
+            fallback: Interactive generator for requests the batch job failed.
+        """
+        os.makedirs(job_dir, exist_ok=True)
+        self.backend = backend
+        self.model = model
+        self.job_dir = job_dir
+        self.max_batch_size = max_batch_size
+        self.flush_interval = flush_interval
+        self.poll_interval = poll_interval
+        self.fallback = fallback
+        self._pending: List[Tuple[str, str, Type, Optional[LlmTask], Future]] = []
+        self._oldest_pending = 0.0
+        self._jobs: Dict[str, Dict[str, Tuple[str, Type, Optional[LlmTask], Future]]] = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._worker: Optional[threading.Thread] = None
+        self._fallback_executor = ThreadPoolExecutor(max_workers=8) if fallback is not None else None
+
+    def submit_json(self, query: str, schema: Type[T], task: Optional[LlmTask] = None) -> "Future[T]":
+        future: Future = Future()
+        with self._lock:
+            if not self._pending:
+                self._oldest_pending = time.monotonic()
+            self._pending.append((uuid.uuid4().hex, query, schema, task, future))
+            full = len(self._pending) >= self.max_batch_size
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, daemon=True)
+                self._worker.start()
+        if full:
+            self._wake.set()
+        return future
+
+    def generate_json(self, query: str, schema: Type[T], task: Optional[LlmTask] = None) -> T:
+        return self.submit_json(query, schema, task).result()
+
+    async def agenerate_json(self, query: str, schema: Type[T], task: Optional[LlmTask] = None) -> T:
+        return await asyncio.wrap_future(self.submit_json(query, schema, task))
+
+    def flush(self) -> None:
+        """Submit the pending requests now instead of waiting for the batch to fill up."""
+        with self._lock:
+            pending, self._pending = self._pending, []
+        if not pending:
+            return
+        job_path = os.path.join(self.job_dir, f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}.jsonl")
+        with open(job_path, "w", encoding="utf-8") as f:
+            for request_id, query, schema, task, _ in pending:
+                record = {
+                    "id": request_id,
+                    "model": self.model,
+                    "task": task.value if task is not None else None,
+                    "query": query,
+                    "schema": json_schema(schema),
+                }
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        requests = {request_id: (query, schema, task, future) for request_id, query, schema, task, future in pending}
+        try:
+            job_id = self.backend.submit(job_path)
+        except Exception as e:
+            for request_id, request in requests.items():
+                self._failed(request, f"Batch job submission failed: {e!r}")
+            return
+        with self._lock:
+            self._jobs[job_id] = requests
+
+    def _run(self) -> None:
+        last_poll = 0.0
+        while True:
+            self._wake.wait(min(self.flush_interval, self.poll_interval))
+            self._wake.clear()
+            with self._lock:
+                due = bool(self._pending) and (
+                    len(self._pending) >= self.max_batch_size
+                    or time.monotonic() - self._oldest_pending >= self.flush_interval
+                )
+            if due:
+                self.flush()
+            if time.monotonic() - last_poll >= self.poll_interval:
+                last_poll = time.monotonic()
+                self._poll_jobs()
+
+    def _poll_jobs(self) -> None:
+        with self._lock:
+            jobs = list(self._jobs.items())
+        for job_id, requests in jobs:
+            try:
+                results = self.backend.poll(job_id)
+            except Exception as e:
+                print(f"Polling batch job {job_id} failed, retrying later: {e!r}")
+                continue
+            if results is None:
+                continue
+            with self._lock:
+                del self._jobs[job_id]
+            for request_id, request in requests.items():
+                self._resolve(request, results.get(request_id))
+
+    def _resolve(self, request: Tuple[str, Type, Optional[LlmTask], Future], result: Optional[BatchResult]) -> None:
+        _, schema, _, future = request
+        if result is None or result.text is None:
+            self._failed(request, result.error if result is not None else "Missing from the batch job results")
+            return
+        try:
+            future.set_result(schema.model_validate_json(result.text))
+        except ValidationError as e:
+            self._failed(request, f"Response does not match the schema: {e}")
+
+    def _failed(self, request: Tuple[str, Type, Optional[LlmTask], Future], error: str) -> None:
+        query, schema, task, future = request
+        if self.fallback is None:
+            future.set_exception(BatchRequestError(error))
+            return
+
+        def retry():
+            try:
+                future.set_result(self.fallback.generate_json(query, schema, task))
+            except Exception as e:
+                future.set_exception(e)
+
+        self._fallback_executor.submit(retry)
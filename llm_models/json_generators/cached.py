@@ -0,0 +1,217 @@
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from threading import Lock
+from typing import Dict, Optional, Type, Union
+
+from pydantic import ValidationError
+
+from entities.llm_task import LlmTask
+from entities.model_registry import json_schema
+from resilience import ConcurrencyCap
+from telemetry import note_cache_hits
+from graphrag.interfaces.json_generator import JsonGenerator as GraphRagJsonGen, T
+from board.board import JsonGenerator as BoardJsonGen
+from expert_set.interfaces import JsonGenerator as ExpertSetJsonGen
+from recoverer_agent.interfaces import JsonGenerator as RecovJsonGen
+from receptionist_agent.interfaces import JsonGenerator as ReceptJsonGen
+from mocks.user_agent.interfaces import JsonGenerator as UserAgentJsonGen
+
+
+class JsonResponseCache:
+    """
+    SQLite store of validated JSON responses. Entries older than `ttl_seconds` are treated as
+    missing, and the least recently used entries are evicted once the stored responses exceed
+    `max_bytes`.
+    """
+
+    def __init__(self, path: str, ttl_seconds: Optional[float] = None, max_bytes: int = 512 * 1024 * 1024):
+        """
+        Args:
+            path: Path of the SQLite database file.
+            ttl_seconds: Lifetime of an entry, None for entries that never expire.
+            max_bytes: Total size of the stored responses above which entries are evicted.
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self._lock = Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, "
+            "created REAL NOT NULL, accessed REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)")
+        with self._lock:
+            self._purge_expired()
+            self._total_bytes = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute("SELECT value, created FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            value, created = row
+            now = time.time()
+            if self._expired(created, now):
+                self._delete(key)
+                return None
+            self._conn.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+            return value
+
+    def put(self, key: str, value: str) -> None:
+        size = len(value.encode("utf-8"))
+        now = time.time()
+        with self._lock:
+            self._delete(key)
+            self._conn.execute(
+                "INSERT INTO responses (key, value, size, created, accessed) VALUES (?, ?, ?, ?, ?)",
+                (key, value, size, now, now),
+            )
+            self._total_bytes += size
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._delete(key)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def _expired(self, created: float, now: float) -> bool:
+        return self.ttl_seconds is not None and created < now - self.ttl_seconds
+
+    def _delete(self, key: str) -> None:
+        row = self._conn.execute("DELETE FROM responses WHERE key = ? RETURNING size", (key,)).fetchone()
+        if row is not None:
+            self._total_bytes -= row[0]
+
+    def _purge_expired(self) -> None:
+        if self.ttl_seconds is not None:
+            self._conn.execute("DELETE FROM responses WHERE created < ?", (time.time() - self.ttl_seconds,))
+
+    def _evict(self) -> None:
+        # Drop expired entries first, then the least recently used ones down to 90% of the budget
+        self._purge_expired()
+        self._total_bytes = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        target = int(self.max_bytes * 0.9)
+        if self._total_bytes <= target:
+            return
+        freed = 0
+        victims = []
+        for key, size in self._conn.execute("SELECT key, size FROM responses ORDER BY accessed"):
+            victims.append((key,))
+            freed += size
+            if self._total_bytes - freed <= target:
+                break
+        self._conn.executemany("DELETE FROM responses WHERE key = ?", victims)
+        self._total_bytes -= freed
+
+
+class CachedJsonGenerator(
+    GraphRagJsonGen,
+    BoardJsonGen,
+    ExpertSetJsonGen,
+    RecovJsonGen,
+    ReceptJsonGen,
+    UserAgentJsonGen,
+):
+    """
+    Wraps a JSON generator with a persistent response cache keyed by provider, model, the full
+    prompt and the schema's JSON, so identical requests (DRIFT prompts, consolidation and
+    summarization prompts repeated across rounds, replayed or resumed sessions) reach the
+    provider only once.
+    """
+
+    def __init__(
+        self,
+        json_gen: (
+            GraphRagJsonGen
+            | BoardJsonGen
+            | ExpertSetJsonGen
+            | RecovJsonGen
+            | ReceptJsonGen
+            | UserAgentJsonGen
+        ),
+        path: Union[str, JsonResponseCache],
+        model: Optional[str] = None,
+        provider: Optional[str] = None,
+        ttl_seconds: Optional[float] = None,
+        max_bytes: int = 512 * 1024 * 1024,
+        caps: Optional[Dict[Optional[LlmTask], ConcurrencyCap]] = None,
+    ) -> None:
+        """
+        Args:
+            json_gen: Generator used on cache misses.
+            path: Path of the SQLite database file, or a cache shared with other generators.
+            model: Name of the model, part of the cache key. Defaults to the generator's `model` attribute.
+            provider: Name of the provider, part of the cache key. Defaults to the generator's class name.
+            ttl_seconds: Lifetime of a cached response, None for responses that never expire.
+            max_bytes: Size of the cache above which the least recently used responses are evicted.
+                `ttl_seconds` and `max_bytes` are those of the shared cache when one is given.
+            caps: Cap on the requests of each task in flight to `json_gen`. Only cache misses take
+                a slot, hits are answered at once.
+        """
+        self.json_gen = json_gen
+        self.model = model if model is not None else str(getattr(json_gen, "model", ""))
+        self.provider = provider or type(json_gen).__name__
+        self.caps = caps or {}
+        self.cache = (
+            path if isinstance(path, JsonResponseCache)
+            else JsonResponseCache(path, ttl_seconds=ttl_seconds, max_bytes=max_bytes)
+        )
+
+    def generate_json(self, query: str, schema: Type[T], task: Optional[LlmTask] = None) -> T:
+        key = self._key(query, schema)
+        cached = self._lookup(key, schema)
+        if cached is not None:
+            return cached
+        cap = self.caps.get(task)
+        if cap is None:
+            answer = self.json_gen.generate_json(query, schema, task)
+        else:
+            answer = cap.call(lambda: self.json_gen.generate_json(query, schema, task))
+        self.cache.put(key, answer.model_dump_json())
+        return answer
+
+    async def agenerate_json(self, query: str, schema: Type[T], task: Optional[LlmTask] = None) -> T:
+        key = self._key(query, schema)
+        cached = self._lookup(key, schema)
+        if cached is not None:
+            return cached
+        cap = self.caps.get(task)
+        if cap is None:
+            answer = await self.json_gen.agenerate_json(query, schema, task)
+        else:
+            answer = await cap.acall(lambda: self.json_gen.agenerate_json(query, schema, task))
+        self.cache.put(key, answer.model_dump_json())
+        return answer
+
+    def _key(self, query: str, schema: Type[T]) -> str:
+        payload = json.dumps(
+            [self.provider, self.model, query, json_schema(schema)],
+            sort_keys=True,
+            ensure_ascii=False,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _lookup(self, key: str, schema: Type[T]) -> Optional[T]:
+        value = self.cache.get(key)
+        if value is None:
+            return None
+        try:
+            answer = schema.model_validate_json(value)
+        except ValidationError:
+            # A response that no longer validates is dropped and requested again
+            self.cache.delete(key)
+            return None
+        note_cache_hits()
+        return answer
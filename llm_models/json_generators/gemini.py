@@ -1,5 +1,6 @@
+import asyncio
 import os
-from typing import Type
+from typing import List, Optional, Type
 from google import genai
 from graphrag.interfaces.json_generator import JsonGenerator as GraphRagJsonGen, T
 from board.board import JsonGenerator as BoardJsonGen
@@ -11,6 +12,9 @@ import time
 from pydantic import BaseModel, Field
 from pydantic import ValidationError
 from dotenv import load_dotenv
+from entities.llm_task import LlmTask
+from entities.model_registry import schema_prompt_text
+from resilience import ClientPool, concurrency_limiter, provider_retry_policy
 
 load_dotenv()
 
@@ -23,52 +27,97 @@ class GeminiJsonGenerator(
     ReceptJsonGen,
     UserAgentJsonGen,
 ):
-    def __init__(self, model: str = "gemini-2.0-flash-lite"):
-        # List of API keys, can be loaded from env or passed directly
-        
-        self.api_keys = []
-        self.api_keys = [os.getenv("GEMINI_API_KEY_1"), os.getenv("GEMINI_API_KEY_2"), os.getenv("GEMINI_API_KEY_3")]
-        self.model = model
-        self.key_index = 0
-        self.client = genai.Client(api_key=self.api_keys[self.key_index])
-
-    def rotate_key(self):
-
-        self.key_index = (self.key_index + 1) % len(self.api_keys)
-        self.client = genai.Client(api_key=self.api_keys[self.key_index])
+    # Requests sent again after a response that does not match the schema, the last one asks for
+    # an empty JSON response
+    MAX_SCHEMA_RETRIES = 3
 
-    def generate_json(self, query: str, schema: Type[T]) -> T:
-        prompt = f"""
-        {query}
-        Please respond in JSON format that matches the following schema:\n{schema.model_json_schema()}
+    def __init__(
+        self,
+        model: str = "gemini-2.0-flash-lite",
+        api_keys: Optional[List[str]] = None,
+        max_in_flight_per_key: Optional[int] = None,
+    ):
+        """
+        Args:
+            model: Gemini model answering the requests.
+            api_keys: API keys to spread requests over, defaults to GEMINI_API_KEY_1..3.
+            max_in_flight_per_key: Concurrent requests per key, defaults to GEMINI_MAX_IN_FLIGHT_PER_KEY or 8.
         """
-        max_schema_retries = 3
-        schema_retries = 0
-        while True:
+        self.api_keys = api_keys or [os.getenv(f"GEMINI_API_KEY_{i}") for i in (1, 2, 3)]
+        self.model = model
+        # One persistent client per key, each request goes to the least-loaded key that is neither
+        # cooling down after a 429 or a failure nor at its concurrency limit, so concurrent callers
+        # never share or replace a client. Every generator of the process using the model shares one
+        # adaptive gate, which settles the total in flight at what Gemini currently accepts for it
+        self.pool = ClientPool(
+            self.api_keys,
+            lambda key: genai.Client(api_key=key),
+            max_in_flight_per_key=max_in_flight_per_key or int(os.getenv("GEMINI_MAX_IN_FLIGHT_PER_KEY", "8")),
+            retry_policy=provider_retry_policy("gemini.generate_content"),
+            concurrency_limiter=concurrency_limiter(f"gemini.generate_content:{model}"),
+        )
+
+    def generate_json(self, query: str, schema: Type[T], task: Optional[LlmTask] = None) -> T:
+        prompt = self._prompt(query, schema)
+        for schema_retries in range(1, self.MAX_SCHEMA_RETRIES + 2):
+            text = self.pool.call(lambda client: client.models.generate_content(
+                model=self.model,
+                contents=prompt,
+                config=self._config(schema),
+            ).text)
             try:
-                response = self.client.models.generate_content(
+                return schema.model_validate_json(text)
+            except ValidationError as e:
+                prompt = self._after_schema_error(schema_retries, prompt, schema, e)
+                time.sleep(0.5)
+
+    async def agenerate_json(self, query: str, schema: Type[T], task: Optional[LlmTask] = None) -> T:
+        prompt = self._prompt(query, schema)
+        for schema_retries in range(1, self.MAX_SCHEMA_RETRIES + 2):
+            async def request(client: genai.Client) -> str:
+                response = await client.aio.models.generate_content(
                     model=self.model,
                     contents=prompt,
-                    config={
-                        "response_mime_type": "application/json",
-                        "response_schema": schema,
-                        "max_output_tokens": 100000,
-                        "temperature": 0,
-                    },
+                    config=self._config(schema),
                 )
-                return schema.model_validate_json(response.text)
-            except ValidationError as ve:
-                schema_retries += 1
-                print(f"Schema validation error, retrying ({schema_retries}/{max_schema_retries})...")
-                if schema_retries >= max_schema_retries:
-                    print("Schema validation failed after 5 attempts, returning empty JSON.")
-                    prompt = "Generate an empty JSON response for each field in the schema."
-                time.sleep(0.5)
-                continue
-            except Exception as e:
-                # print("Rotating key...", e)
-                self.rotate_key()
-                time.sleep(10)
+                return response.text
+
+            text = await self.pool.acall(request)
+            try:
+                return schema.model_validate_json(text)
+            except ValidationError as e:
+                prompt = self._after_schema_error(schema_retries, prompt, schema, e)
+                await asyncio.sleep(0.5)
+
+    def _after_schema_error(self, schema_retries: int, prompt: str, schema: Type[T], error: ValidationError) -> str:
+        # Prompt of the next attempt after a response that does not match the schema, raises once
+        # the retries are used up
+        if schema_retries > self.MAX_SCHEMA_RETRIES:
+            raise ValueError(
+                f"{self.model} returned no response matching {schema.__name__} "
+                f"after {schema_retries} attempts"
+            ) from error
+        print(f"Schema validation error, retrying ({schema_retries}/{self.MAX_SCHEMA_RETRIES})...")
+        if schema_retries == self.MAX_SCHEMA_RETRIES:
+            print(f"Schema validation failed after {schema_retries} attempts, asking for empty JSON.")
+            return "Generate an empty JSON response for each field in the schema."
+        return prompt
+
+    @staticmethod
+    def _config(schema: Type[T]) -> dict:
+        return {
+            "response_mime_type": "application/json",
+            "response_schema": schema,
+            "max_output_tokens": 100000,
+            "temperature": 0,
+        }
+
+    @staticmethod
+    def _prompt(query: str, schema: Type[T]) -> str:
+        return f"""
+        {query}
+        Please respond in JSON format that matches the following schema:\n{schema_prompt_text(schema)}
+        """
        
 
 
@@ -0,0 +1,93 @@
+import json
+import os
+from typing import Dict, List, Optional
+
+from google import genai
+from google.genai import types
+from dotenv import load_dotenv
+
+from resilience import RetryPolicy, circuit_breaker
+from .batch import BatchBackend, BatchResult
+
+load_dotenv()
+
+
+class GeminiBatchBackend(BatchBackend):
+    """
+    Runs batch jobs with the Gemini Batch API, requests inlined in the job, prompted the same way
+    as GeminiJsonGenerator does interactively.
+    """
+
+    _FAILED_STATES = {
+        types.JobState.JOB_STATE_FAILED,
+        types.JobState.JOB_STATE_CANCELLED,
+        types.JobState.JOB_STATE_EXPIRED,
+    }
+
+    def __init__(self, model: str = "gemini-2.0-flash-lite", api_key: Optional[str] = None):
+        """
+        Args:
+            model: Model of the jobs, used for records that do not name one.
+            api_key: API key, defaults to GEMINI_API_KEY_1.
+        """
+        self.model = model
+        self.client = genai.Client(api_key=api_key or os.getenv("GEMINI_API_KEY_1"))
+        self.retry_policy = RetryPolicy(max_attempts=5, deadline=120.0, circuit_breaker=circuit_breaker("gemini.batches"))
+        # Request ids of each job, in submission order, as results come back in that order
+        self._request_ids: Dict[str, List[str]] = {}
+
+    def submit(self, job_path: str) -> str:
+        with open(job_path, encoding="utf-8") as f:
+            records = [json.loads(line) for line in f if line.strip()]
+        requests = [
+            types.InlinedRequest(
+                contents=self._prompt(record["query"], record["schema"]),
+                metadata={"id": record["id"]},
+                config=types.GenerateContentConfig(
+                    response_mime_type="application/json",
+                    response_json_schema=record["schema"],
+                    temperature=0,
+                ),
+            )
+            for record in records
+        ]
+        model = next((record["model"] for record in records if record.get("model")), self.model)
+        job = self.retry_policy.call(lambda: self.client.batches.create(
+            model=model,
+            src=requests,
+            config={"display_name": os.path.basename(job_path)},
+        ))
+        self._request_ids[job.name] = [record["id"] for record in records]
+        return job.name
+
+    def poll(self, job_id: str) -> Optional[Dict[str, BatchResult]]:
+        job = self.retry_policy.call(lambda: self.client.batches.get(name=job_id))
+        request_ids = self._request_ids.get(job_id, [])
+        if job.state in self._FAILED_STATES:
+            error = str(job.error or job.state)
+            self._request_ids.pop(job_id, None)
+            return {request_id: BatchResult(error=error) for request_id in request_ids}
+        if job.state not in (types.JobState.JOB_STATE_SUCCEEDED, types.JobState.JOB_STATE_PARTIALLY_SUCCEEDED):
+            return None
+
+        results = {}
+        responses = (job.dest.inlined_responses if job.dest is not None else None) or []
+        for position, inlined in enumerate(responses):
+            metadata = inlined.metadata or {}
+            request_id = metadata.get("id") or (request_ids[position] if position < len(request_ids) else None)
+            if request_id is None:
+                continue
+            if inlined.error is not None or inlined.response is None:
+                results[request_id] = BatchResult(error=str(inlined.error or "No response"))
+            else:
+                results[request_id] = BatchResult(text=inlined.response.text)
+        self._request_ids.pop(job_id, None)
+        return results
+
+    @staticmethod
+    def _prompt(query: str, schema: dict) -> str:
+        # Same text as GeminiJsonGenerator._prompt, whose schema text is the schema dict's str()
+        return f"""
+        {query}
+        Please respond in JSON format that matches the following schema:\n{schema}
+        """
@@ -1,13 +1,14 @@
-from typing import Type, TypeVar
+from typing import Optional, Type, TypeVar
 
 from pydantic import BaseModel
+from entities.llm_task import LlmTask
+from entities.model_registry import schema_json
 from graphrag.interfaces.json_generator import JsonGenerator as GraphRagJsonGen, T
 from board.board import JsonGenerator as BoardJsonGen
 from expert_set.interfaces import JsonGenerator as ExpertSetJsonGen
 from recoverer_agent.interfaces import JsonGenerator as RecovJsonGen
 from receptionist_agent.interfaces import JsonGenerator as ReceptJsonGen
 from mocks.user_agent.interfaces import JsonGenerator as UserAgentJsonGen
-import json
 
 T = TypeVar("T", bound=BaseModel)
 
@@ -33,7 +34,7 @@ class JsonGeneratorInspectionWrapper(
     ) -> None:
         self.json_gen = json_gen
 
-    def generate_json(self, query: str, schema: Type[T]) -> T:
+    def generate_json(self, query: str, schema: Type[T], task: Optional[LlmTask] = None) -> T:
 
         print("Generating json...")
 
@@ -45,11 +46,11 @@ class JsonGeneratorInspectionWrapper(
 
         print("Schema: ")
         print("=" * 60)
-        print(json.dumps(schema.model_json_schema(), indent=2))
+        print(schema_json(schema, indent=2))
         input()
         print("=" * 60)
 
-        answer = self.json_gen.generate_json(query, schema)
+        answer = self.json_gen.generate_json(query, schema, task)
 
         print("Answer: ")
         print("=" * 60)
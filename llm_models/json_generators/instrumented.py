@@ -0,0 +1,100 @@
+import time
+from typing import Optional, Type
+
+from entities.llm_task import LlmTask
+from graphrag.interfaces.json_generator import JsonGenerator as GraphRagJsonGen, T
+from board.board import JsonGenerator as BoardJsonGen
+from expert_set.interfaces import JsonGenerator as ExpertSetJsonGen
+from recoverer_agent.interfaces import JsonGenerator as RecovJsonGen
+from receptionist_agent.interfaces import JsonGenerator as ReceptJsonGen
+from mocks.user_agent.interfaces import JsonGenerator as UserAgentJsonGen
+from telemetry import CallRecord, TelemetryRecorder, call_site, current_span, get_telemetry, instrumented_call
+from text_processing import count_tokens
+
+
+class InstrumentedJsonGenerator(
+    GraphRagJsonGen,
+    BoardJsonGen,
+    ExpertSetJsonGen,
+    RecovJsonGen,
+    ReceptJsonGen,
+    UserAgentJsonGen,
+):
+    """
+    Wraps a JSON generator to record every request: call site, span, task and model, latency,
+    prompt and response sizes with their token estimates, retries and cache hits. Meant to be
+    the outermost wrapper, so that one logical request is one record.
+    """
+
+    def __init__(
+        self,
+        json_gen: (
+            GraphRagJsonGen
+            | BoardJsonGen
+            | ExpertSetJsonGen
+            | RecovJsonGen
+            | ReceptJsonGen
+            | UserAgentJsonGen
+        ),
+        recorder: Optional[TelemetryRecorder] = None,
+    ) -> None:
+        """
+        Args:
+            json_gen: Generator answering the requests.
+            recorder: Recorder of the calls, defaults to the shared one.
+        """
+        self.json_gen = json_gen
+        self.recorder = recorder
+
+    def generate_json(self, query: str, schema: Type[T], task: Optional[LlmTask] = None) -> T:
+        caller = call_site()
+        started_at, started = time.time(), time.perf_counter()
+        answer, error = None, None
+        with instrumented_call() as counters:
+            try:
+                answer = self.json_gen.generate_json(query, schema, task)
+                return answer
+            except Exception as e:
+                error = type(e).__name__
+                raise
+            finally:
+                self._record(caller, query, task, answer, error, started_at, time.perf_counter() - started, counters)
+
+    async def agenerate_json(self, query: str, schema: Type[T], task: Optional[LlmTask] = None) -> T:
+        caller = call_site()
+        started_at, started = time.time(), time.perf_counter()
+        answer, error = None, None
+        with instrumented_call() as counters:
+            try:
+                answer = await self.json_gen.agenerate_json(query, schema, task)
+                return answer
+            except Exception as e:
+                error = type(e).__name__
+                raise
+            finally:
+                self._record(caller, query, task, answer, error, started_at, time.perf_counter() - started, counters)
+
+    def _model(self, task: Optional[LlmTask]) -> str:
+        model_for = getattr(self.json_gen, "model_for", None)
+        if model_for is not None:
+            return model_for(task)
+        return str(getattr(self.json_gen, "model", ""))
+
+    def _record(self, caller, query, task, answer, error, started_at, latency, counters) -> None:
+        response = answer.model_dump_json() if answer is not None else ""
+        (self.recorder or get_telemetry()).record(CallRecord(
+            kind="json",
+            caller=caller,
+            phase=current_span(),
+            task=task.value if task is not None else None,
+            model=self._model(task),
+            started=started_at,
+            latency=latency,
+            prompt_chars=len(query),
+            response_chars=len(response),
+            prompt_tokens=count_tokens(query),
+            response_tokens=count_tokens(response) if response else 0,
+            retries=counters.retries,
+            cache_hits=counters.cache_hits,
+            error=error,
+        ))
@@ -0,0 +1,125 @@
+from typing import Callable, Dict, NamedTuple, Optional, Type
+
+from entities.llm_task import LlmTask
+from graphrag.interfaces.json_generator import JsonGenerator as GraphRagJsonGen, T
+from board.board import JsonGenerator as BoardJsonGen
+from expert_set.interfaces import JsonGenerator as ExpertSetJsonGen
+from recoverer_agent.interfaces import JsonGenerator as RecovJsonGen
+from receptionist_agent.interfaces import JsonGenerator as ReceptJsonGen
+from mocks.user_agent.interfaces import JsonGenerator as UserAgentJsonGen
+from resilience import ConcurrencyCap
+
+from .cached import CachedJsonGenerator, JsonResponseCache
+
+
+class JsonRoute(NamedTuple):
+    """Model and policies of the requests of one task."""
+    model: str
+    max_in_flight: Optional[int] = None
+    """Requests of the task in flight at once, None for no limit besides the provider's."""
+    cache: bool = True
+    """Whether responses of the task are cached, when the router has a cache."""
+
+
+# Cheap, high-volume tasks go to the fast model, decisions over the whole board to the stronger one
+DEFAULT_ROUTES: Dict[Optional[LlmTask], JsonRoute] = {
+    None: JsonRoute("gemini-2.0-flash-lite"),
+    LlmTask.SUMMARIZE: JsonRoute("gemini-2.0-flash-lite", max_in_flight=64),
+    LlmTask.EXTRACT: JsonRoute("gemini-2.0-flash-lite", max_in_flight=64),
+    LlmTask.CONSOLIDATE: JsonRoute("gemini-2.0-flash-lite", max_in_flight=32),
+    LlmTask.DECIDE: JsonRoute("gemini-2.0-flash", max_in_flight=8),
+}
+
+AnyJsonGen = GraphRagJsonGen | BoardJsonGen | ExpertSetJsonGen | RecovJsonGen | ReceptJsonGen | UserAgentJsonGen
+
+
+class RoutingJsonGenerator(
+    GraphRagJsonGen,
+    BoardJsonGen,
+    ExpertSetJsonGen,
+    RecovJsonGen,
+    ReceptJsonGen,
+    UserAgentJsonGen,
+):
+    """
+    Sends each request to the generator of its task, requests without a task or with a task
+    that has no route go to the default (None) route. Routes may cap how many of their
+    requests are in flight, so that a burst of one task does not take all of a model's capacity.
+    The caps are fixed quotas: how much the provider accepts is learnt by the provider's own gate.
+    """
+
+    def __init__(
+        self,
+        routes: Dict[Optional[LlmTask], AnyJsonGen],
+        max_in_flight: Optional[Dict[Optional[LlmTask], int]] = None,
+    ):
+        """
+        Args:
+            routes: Generator of each task, the None key is the default route.
+            max_in_flight: Concurrency cap of each task, applied around its generator. Tasks without
+                one are not capped, e.g. because their generator applies the cap itself.
+        """
+        if None not in routes:
+            raise ValueError("RoutingJsonGenerator needs a default route (None key)")
+        self.routes = routes
+        self._caps = {task: ConcurrencyCap(f"route:{task}", limit) for task, limit in (max_in_flight or {}).items()}
+
+    @classmethod
+    def from_table(
+        cls,
+        table: Dict[Optional[LlmTask], JsonRoute],
+        make_generator: Callable[[str], AnyJsonGen],
+        cache_path: Optional[str] = None,
+    ) -> "RoutingJsonGenerator":
+        """
+        Build a router from a route table, with one generator per model shared by its routes.
+        The caps of cached routes are applied by the cache on misses only, a cache hit does not
+        wait behind provider requests.
+
+        Args:
+            table: Route of each task, the None key is the default route.
+            make_generator: Builds the generator of a model, e.g. `GeminiJsonGenerator`.
+            cache_path: SQLite response cache shared by the routes with `cache`, None for no cache.
+
+        Returns:
+            The routing generator.
+        """
+        generators: Dict[str, AnyJsonGen] = {}
+        cached: Dict[str, AnyJsonGen] = {}
+        cache = JsonResponseCache(cache_path) if cache_path is not None else None
+        routes = {}
+        max_in_flight = {}
+        for task, route in table.items():
+            if route.model not in generators:
+                generators[route.model] = make_generator(route.model)
+            generator = generators[route.model]
+            if cache is not None and route.cache:
+                if route.model not in cached:
+                    cached[route.model] = CachedJsonGenerator(generator, cache, model=route.model)
+                generator = cached[route.model]
+                if route.max_in_flight:
+                    generator.caps[task] = ConcurrencyCap(f"route:{task}", route.max_in_flight)
+            elif route.max_in_flight:
+                max_in_flight[task] = route.max_in_flight
+            routes[task] = generator
+        return cls(routes, max_in_flight)
+
+    def model_for(self, task: Optional[LlmTask]) -> str:
+        """
+        :return: Model answering the requests of a task, as far as its generator tells
+        """
+        return str(getattr(self.routes.get(task, self.routes[None]), "model", ""))
+
+    def generate_json(self, query: str, schema: Type[T], task: Optional[LlmTask] = None) -> T:
+        generator = self.routes.get(task, self.routes[None])
+        cap = self._caps.get(task)
+        if cap is None:
+            return generator.generate_json(query, schema, task)
+        return cap.call(lambda: generator.generate_json(query, schema, task))
+
+    async def agenerate_json(self, query: str, schema: Type[T], task: Optional[LlmTask] = None) -> T:
+        generator = self.routes.get(task, self.routes[None])
+        cap = self._caps.get(task)
+        if cap is None:
+            return await generator.agenerate_json(query, schema, task)
+        return await cap.acall(lambda: generator.agenerate_json(query, schema, task))
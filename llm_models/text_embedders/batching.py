@@ -0,0 +1,26 @@
+from typing import Iterator, List
+
+
+def split_batches(texts: List[str], max_items: int, max_chars: int) -> Iterator[List[str]]:
+    """
+    Split texts into consecutive batches that respect a provider's request limits.
+    A text longer than `max_chars` is sent in a batch of its own.
+
+    Args:
+        texts: Texts to embed, in order.
+        max_items: Maximum number of texts per request.
+        max_chars: Maximum total number of characters per request.
+
+    Yields:
+        Consecutive batches of texts, their concatenation is `texts`.
+    """
+    batch: List[str] = []
+    batch_chars = 0
+    for text in texts:
+        if batch and (len(batch) >= max_items or batch_chars + len(text) > max_chars):
+            yield batch
+            batch, batch_chars = [], 0
+        batch.append(text)
+        batch_chars += len(text)
+    if batch:
+        yield batch
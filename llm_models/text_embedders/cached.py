@@ -0,0 +1,180 @@
+import fcntl
+import hashlib
+import os
+import re
+from contextlib import contextmanager
+from threading import Lock
+from typing import BinaryIO, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from entities.embedding import Embedding
+from graphrag.interfaces.text_embedder import TextEmbedder
+from rag_repo.interfaces import RagRepoTextEmbedder
+from telemetry import note_cache_hits
+
+
+class EmbeddingCacheFile:
+    """
+    Append-only store of float32 vectors of a fixed dimension: the vectors are appended to a
+    raw file read through a memory map, and a small tab separated index maps text hashes to rows.
+    A vector is always written before its index line, so an interrupted write is never indexed.
+    Appends hold an exclusive flock on the index, so several processes can share the directory:
+    a row is taken from the offset the vector is written at, and the index lines other processes
+    appended are read before writing.
+    """
+
+    def __init__(self, directory: str, dim: int):
+        self.dim = dim
+        self._row_bytes = dim * 4
+        self._vectors_path = os.path.join(directory, "vectors.f32")
+        self._index_path = os.path.join(directory, "index.tsv")
+        self._rows: Dict[str, int] = {}
+        self._index_offset = 0
+        self._matrix: Optional[np.memmap] = None
+        self._lock = Lock()
+        os.makedirs(directory, exist_ok=True)
+
+        with self._locked_index() as index:
+            self._read_index(index)
+            # Drop vectors whose index line was never written
+            with open(self._vectors_path, "ab") as f:
+                f.truncate((max(self._rows.values(), default=-1) + 1) * self._row_bytes)
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        with self._lock:
+            row = self._rows.get(key)
+            if row is None:
+                return None
+            if self._matrix is None or row >= self._matrix.shape[0]:
+                rows = os.path.getsize(self._vectors_path) // self._row_bytes
+                self._matrix = np.memmap(self._vectors_path, dtype=np.float32, mode="r", shape=(rows, self.dim))
+            return np.array(self._matrix[row])
+
+    def put(self, key: str, vector: np.ndarray) -> None:
+        vector = np.asarray(vector, dtype=np.float32).reshape(-1)
+        if vector.shape[0] != self.dim:
+            raise ValueError(f"Expected embedding of dimension {self.dim}, got {vector.shape[0]}")
+        with self._lock:
+            if key in self._rows:
+                return
+            with self._locked_index() as index:
+                self._read_index(index)
+                if key in self._rows:
+                    return
+                with open(self._vectors_path, "ab") as f:
+                    # Rows left unindexed by an interrupted writer are skipped, a torn row is cut
+                    end = f.seek(0, os.SEEK_END)
+                    if end % self._row_bytes:
+                        end = f.truncate(end - end % self._row_bytes)
+                        f.seek(end)
+                    row = end // self._row_bytes
+                    f.write(vector.tobytes())
+                index.seek(0, os.SEEK_END)
+                index.write(f"{key}\t{row}\n".encode("utf-8"))
+                index.flush()
+                self._index_offset = index.tell()
+                self._rows[key] = row
+
+    @contextmanager
+    def _locked_index(self) -> Iterator[BinaryIO]:
+        # The index file opened for appending, under an exclusive lock shared with other processes
+        with open(self._index_path, "a+b") as index:
+            fcntl.flock(index, fcntl.LOCK_EX)
+            try:
+                yield index
+            finally:
+                fcntl.flock(index, fcntl.LOCK_UN)
+
+    def _read_index(self, index: BinaryIO) -> None:
+        # Reads the complete lines appended to the index since the last read
+        index.seek(self._index_offset)
+        for line in index:
+            if not line.endswith(b"\n"):
+                break
+            self._index_offset += len(line)
+            parts = line.decode("utf-8").rstrip("\n").split("\t")
+            if len(parts) == 2:
+                self._rows[parts[0]] = int(parts[1])
+
+
+class CachedEmbedder(TextEmbedder, RagRepoTextEmbedder):
+    """
+    Wraps a text embedder with a persistent, content-addressed embedding cache. Vectors are
+    keyed by provider, model, dimensions and the sha256 of the text, so repeated chunks,
+    documents and queries are only sent to the provider once across runs.
+    """
+
+    def __init__(
+        self,
+        embedder: TextEmbedder | RagRepoTextEmbedder,
+        directory: str,
+        model: str = "",
+        provider: Optional[str] = None,
+    ):
+        """
+        Args:
+            embedder: Embedder used on cache misses.
+            directory: Directory where the cache files are kept.
+            model: Name of the embedding model, part of the cache key.
+            provider: Name of the provider, part of the cache key. Defaults to the embedder's class name.
+        """
+        self.embedder = embedder
+        self.directory = directory
+        self.model = model
+        self.provider = provider or type(embedder).__name__
+        self._file: Optional[EmbeddingCacheFile] = None
+        self._lock = Lock()
+
+    @property
+    def dim(self) -> int:
+        return self.embedder.dim
+
+    def embed(self, text: str) -> Embedding:
+        return self.embed_batch([text])[0]
+
+    def embed_batch(self, texts: List[str]) -> List[Embedding]:
+        keys, vectors, missing = self._lookup(texts)
+        if missing:
+            self._store(missing, self.embedder.embed_batch(list(missing.values())), vectors)
+        return [Embedding(vector=vectors[key]) for key in keys]
+
+    async def aembed_batch(self, texts: List[str]) -> List[Embedding]:
+        keys, vectors, missing = self._lookup(texts)
+        if missing:
+            self._store(missing, await self.embedder.aembed_batch(list(missing.values())), vectors)
+        return [Embedding(vector=vectors[key]) for key in keys]
+
+    def _lookup(self, texts: List[str]) -> Tuple[List[str], Dict[str, np.ndarray], Dict[str, str]]:
+        # Cache keys of the texts, the vectors found and the distinct texts missing, by key
+        cache = self._cache()
+        keys = [hashlib.sha256(text.encode("utf-8")).hexdigest() for text in texts]
+        vectors: Dict[str, np.ndarray] = {}
+        missing: Dict[str, str] = {}
+        for key, text in zip(keys, texts):
+            if key in vectors or key in missing:
+                continue
+            vector = cache.get(key)
+            if vector is None:
+                missing[key] = text
+            else:
+                vectors[key] = vector
+        note_cache_hits(sum(key in vectors for key in keys))
+        return keys, vectors, missing
+
+    def _store(self, missing: Dict[str, str], embeddings: List[Embedding], vectors: Dict[str, np.ndarray]) -> None:
+        cache = self._cache()
+        for key, embedding in zip(missing.keys(), embeddings):
+            cache.put(key, embedding.vector)
+            vectors[key] = embedding.vector
+
+    def _cache(self) -> EmbeddingCacheFile:
+        with self._lock:
+            if self._file is None:
+                dim = self.dim
+                namespace = re.sub(r"[^\w.-]+", "_", f"{self.provider}-{self.model}-{dim}")
+                self._file = EmbeddingCacheFile(os.path.join(self.directory, namespace), dim)
+            return self._file
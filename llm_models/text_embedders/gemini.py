@@ -1,5 +1,8 @@
+import asyncio
+import contextvars
 import os
-import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
 from google import genai
 from google.genai import types
 from graphrag.interfaces.text_embedder import TextEmbedder
@@ -7,32 +10,77 @@ from entities.embedding import Embedding
 from rag_repo.interfaces import RagRepoTextEmbedder
 import numpy as np
 from dotenv import load_dotenv
+from resilience import ClientPool, concurrency_limiter, provider_retry_policy
+from .batching import split_batches
 
 load_dotenv()
 
 
 class GeminiEmbedder(TextEmbedder, RagRepoTextEmbedder):
-    def __init__(self, dimensions: int = 10):
-        self.dimensions = dimensions
-        self.api_key = os.getenv("GEMINI_API_KEY_3")
+    # Limits of a single embed_content request with several contents
+    MAX_BATCH_SIZE = 100
+    MAX_BATCH_CHARS = 400_000
 
-        self.client = genai.Client(api_key=self.api_key)
+    def __init__(self, dimensions: int = 10, api_keys: Optional[List[str]] = None):
+        """
+        Args:
+            dimensions: Output dimensionality of the embeddings.
+            api_keys: API keys to spread requests over, defaults to GEMINI_API_KEY_1..3.
+        """
+        self.dimensions = dimensions
+        self.api_keys = api_keys or [os.getenv(f"GEMINI_API_KEY_{i}") for i in (3, 1, 2)]
+        # One persistent client per key, requests go to the least-loaded healthy key
+        self.pool = ClientPool(
+            self.api_keys,
+            lambda key: genai.Client(api_key=key),
+            retry_policy=provider_retry_policy("gemini.embed_content"),
+            concurrency_limiter=concurrency_limiter("gemini.embed_content"),
+        )
 
     @property
     def dim(self) -> int:
         return self.dimensions
 
     def embed(self, text: str) -> Embedding:
-        while True:
-            try:
-                result = self.client.models.embed_content(
-                    model="text-embedding-004",
-                    contents=text,
-                    config=types.EmbedContentConfig(
-                        output_dimensionality=self.dimensions
-                    ),
-                )
-                return Embedding(vector=np.array(result.embeddings[0].values))
-            except Exception as e:
-                print(e)
-                time.sleep(2)
+        return self.embed_batch([text])[0]
+
+    def embed_batch(self, texts: List[str]) -> List[Embedding]:
+        batches = list(split_batches(texts, self.MAX_BATCH_SIZE, self.MAX_BATCH_CHARS))
+        if len(batches) <= 1:
+            return [e for batch in batches for e in self._embed_request(batch)]
+        # Send the batches concurrently, one in flight per key, each in a copy of the caller's
+        # context so that retries are counted against the caller's call
+        with ThreadPoolExecutor(max_workers=len(self.pool.clients)) as executor:
+            futures = [executor.submit(contextvars.copy_context().run, self._embed_request, batch) for batch in batches]
+            return [e for future in futures for e in future.result()]
+
+    def _embed_request(self, texts: List[str]) -> List[Embedding]:
+        def request(client: genai.Client) -> List[Embedding]:
+            result = client.models.embed_content(
+                model="text-embedding-004",
+                contents=texts,
+                config=types.EmbedContentConfig(
+                    output_dimensionality=self.dimensions
+                ),
+            )
+            return [Embedding(vector=np.array(e.values)) for e in result.embeddings]
+
+        return self.pool.call(request)
+
+    async def aembed_batch(self, texts: List[str]) -> List[Embedding]:
+        batches = list(split_batches(texts, self.MAX_BATCH_SIZE, self.MAX_BATCH_CHARS))
+        results = await asyncio.gather(*(self._aembed_request(batch) for batch in batches))
+        return [e for result in results for e in result]
+
+    async def _aembed_request(self, texts: List[str]) -> List[Embedding]:
+        async def request(client: genai.Client) -> List[Embedding]:
+            result = await client.aio.models.embed_content(
+                model="text-embedding-004",
+                contents=texts,
+                config=types.EmbedContentConfig(
+                    output_dimensionality=self.dimensions
+                ),
+            )
+            return [Embedding(vector=np.array(e.values)) for e in result.embeddings]
+
+        return await self.pool.acall(request)
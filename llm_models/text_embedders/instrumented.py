@@ -0,0 +1,80 @@
+import time
+from typing import List, Optional
+
+from entities.embedding import Embedding
+from graphrag.interfaces.text_embedder import TextEmbedder
+from rag_repo.interfaces import RagRepoTextEmbedder
+from telemetry import CallRecord, TelemetryRecorder, call_site, current_span, get_telemetry, instrumented_call
+from text_processing import count_tokens
+
+
+class InstrumentedEmbedder(TextEmbedder, RagRepoTextEmbedder):
+    """
+    Wraps a text embedder to record every request: call site, span, latency, number and size of
+    the texts with their token estimates, retries and texts served from a cache.
+    """
+
+    def __init__(
+        self,
+        embedder: TextEmbedder | RagRepoTextEmbedder,
+        model: Optional[str] = None,
+        recorder: Optional[TelemetryRecorder] = None,
+    ):
+        """
+        Args:
+            embedder: Embedder answering the requests.
+            model: Name of the embedding model, defaults to the embedder's `model` attribute or class name.
+            recorder: Recorder of the calls, defaults to the shared one.
+        """
+        self.embedder = embedder
+        self.model = model or str(getattr(embedder, "model", "") or type(embedder).__name__)
+        self.recorder = recorder
+
+    @property
+    def dim(self) -> int:
+        return self.embedder.dim
+
+    def embed(self, text: str) -> Embedding:
+        return self.embed_batch([text])[0]
+
+    def embed_batch(self, texts: List[str]) -> List[Embedding]:
+        caller = call_site()
+        started_at, started = time.time(), time.perf_counter()
+        error = None
+        with instrumented_call() as counters:
+            try:
+                return self.embedder.embed_batch(texts)
+            except Exception as e:
+                error = type(e).__name__
+                raise
+            finally:
+                self._record(caller, texts, error, started_at, time.perf_counter() - started, counters)
+
+    async def aembed_batch(self, texts: List[str]) -> List[Embedding]:
+        caller = call_site()
+        started_at, started = time.time(), time.perf_counter()
+        error = None
+        with instrumented_call() as counters:
+            try:
+                return await self.embedder.aembed_batch(texts)
+            except Exception as e:
+                error = type(e).__name__
+                raise
+            finally:
+                self._record(caller, texts, error, started_at, time.perf_counter() - started, counters)
+
+    def _record(self, caller, texts, error, started_at, latency, counters) -> None:
+        (self.recorder or get_telemetry()).record(CallRecord(
+            kind="embedding",
+            caller=caller,
+            phase=current_span(),
+            model=self.model,
+            started=started_at,
+            latency=latency,
+            items=len(texts),
+            prompt_chars=sum(len(text) for text in texts),
+            prompt_tokens=sum(count_tokens(text) for text in texts),
+            retries=counters.retries,
+            cache_hits=counters.cache_hits,
+            error=error,
+        ))
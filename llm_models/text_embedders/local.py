@@ -0,0 +1,84 @@
+import hashlib
+import re
+from functools import lru_cache
+from typing import List, Tuple
+
+import numpy as np
+
+from entities.embedding import Embedding
+from graphrag.interfaces.text_embedder import TextEmbedder
+from rag_repo.interfaces import RagRepoTextEmbedder
+
+
+@lru_cache(maxsize=1 << 16)
+def _bucket(feature: str, dimensions: int) -> Tuple[int, float]:
+    # Python's hash is salted per process, a stable hash keeps vectors comparable across runs.
+    # Cached at module level, so embedders sharing a dimension share entries and none is kept alive
+    digest = int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(), "little")
+    return digest % dimensions, (1.0 if digest >> 63 else -1.0)
+
+
+class HashingEmbedder(TextEmbedder, RagRepoTextEmbedder):
+    """
+    Deterministic CPU embedder with no network access: words and word bigrams are hashed
+    into a fixed number of signed buckets, counts are log-scaled and the vectors L2 normalized.
+    Useful for offline runs, benchmarks and as a fast first-stage embedder.
+    """
+
+    _WORDS = re.compile(r"\w+")
+
+    def __init__(self, dimensions: int = 256, bigrams: bool = True):
+        self.dimensions = dimensions
+        self.bigrams = bigrams
+
+    @property
+    def dim(self) -> int:
+        return self.dimensions
+
+    def embed(self, text: str) -> Embedding:
+        return self.embed_batch([text])[0]
+
+    def embed_batch(self, texts: List[str]) -> List[Embedding]:
+        rows, columns, signs = [], [], []
+        for row, text in enumerate(texts):
+            for feature in self._features(text):
+                column, sign = _bucket(feature, self.dimensions)
+                rows.append(row)
+                columns.append(column)
+                signs.append(sign)
+
+        matrix = np.zeros((len(texts), self.dimensions), dtype=np.float32)
+        np.add.at(matrix, (np.array(rows, dtype=np.intp), np.array(columns, dtype=np.intp)), np.array(signs, dtype=np.float32))
+        matrix = np.sign(matrix) * np.log1p(np.abs(matrix))
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        matrix /= np.where(norms == 0, 1, norms)
+        return [Embedding(vector=vector) for vector in matrix]
+
+    def _features(self, text: str) -> List[str]:
+        words = self._WORDS.findall(text.lower())
+        if not self.bigrams:
+            return words
+        return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+
+class SentenceTransformerEmbedder(TextEmbedder, RagRepoTextEmbedder):
+    """Local sentence-transformers model on CPU, requires the optional `sentence-transformers` package."""
+
+    def __init__(self, model_name: str = "sentence-transformers/all-MiniLM-L6-v2", batch_size: int = 64):
+        from sentence_transformers import SentenceTransformer
+
+        self.model = SentenceTransformer(model_name, device="cpu")
+        self.batch_size = batch_size
+
+    @property
+    def dim(self) -> int:
+        return self.model.get_sentence_embedding_dimension()
+
+    def embed(self, text: str) -> Embedding:
+        return self.embed_batch([text])[0]
+
+    def embed_batch(self, texts: List[str]) -> List[Embedding]:
+        if not texts:
+            return []
+        matrix = self.model.encode(texts, batch_size=self.batch_size, convert_to_numpy=True, normalize_embeddings=True)
+        return [Embedding(vector=vector) for vector in matrix]
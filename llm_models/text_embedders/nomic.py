@@ -2,22 +2,29 @@ import openai
 from graphrag.interfaces.text_embedder import TextEmbedder
 from rag_repo.interfaces import RagRepoTextEmbedder
 from entities.embedding import Embedding
-import time
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from typing import List
 import numpy as np
+from resilience import ClientPool, concurrency_limiter, provider_retry_policy
+from .batching import split_batches
 
 
 class NomicAIEmbedder(TextEmbedder, RagRepoTextEmbedder):
+    # Limits of a single embeddings request with list input
+    MAX_BATCH_SIZE = 256
+    MAX_BATCH_CHARS = 400_000
+
     def __init__(self, dimensions: int = 128):
         self.api_keys = ["fw_3ZNnU48srVX34yNW6P4SoZjL", "fw_3ZghXR53MQMWFzcCYBWWLSa9"]
         self.base_url = "https://api.fireworks.ai/inference/v1"
-        self.client = None
-        self.current_key_index = 0
         self.dimensions = dimensions
-
-    def _set_client(self, api_key):
-        self.client = openai.OpenAI(
-            base_url=self.base_url,
-            api_key=api_key,
+        # One persistent client per key, requests go to the least-loaded healthy key
+        self.pool = ClientPool(
+            self.api_keys,
+            lambda key: openai.OpenAI(base_url=self.base_url, api_key=key),
+            retry_policy=provider_retry_policy("fireworks.embeddings"),
+            concurrency_limiter=concurrency_limiter("fireworks.embeddings"),
         )
 
     @property
@@ -25,24 +32,31 @@ class NomicAIEmbedder(TextEmbedder, RagRepoTextEmbedder):
         return self.dimensions
 
     def embed(self, text: str):
-        i = 0
-        while True:
-            api_key = self.api_keys[self.current_key_index]
-            self._set_client(api_key)
-            try:
-                response = self.client.embeddings.create(
-                    model="nomic-ai/nomic-embed-text-v1.5",
-                    input=text,
-                    dimensions=self.dimensions,
-                )
-                return Embedding(vector=np.array(response.data[0].embedding))
-            except Exception as e:
-                time.sleep(2)
-                self.current_key_index = (self.current_key_index + 1) % len(
-                    self.api_keys
-                )
-                i += 1
-                if i >= 80:
-                    raise RuntimeError(
-                        "All API keys failed. Please check your API keys and network connection."
-                    )
+        return self.embed_batch([text])[0]
+
+    def embed_batch(self, texts: List[str]) -> List[Embedding]:
+        batches = list(split_batches(texts, self.MAX_BATCH_SIZE, self.MAX_BATCH_CHARS))
+        if len(batches) <= 1:
+            return [e for batch in batches for e in self._embed_request(batch)]
+        # Send the batches concurrently, one in flight per key, each in a copy of the caller's
+        # context so that retries are counted against the caller's call
+        with ThreadPoolExecutor(max_workers=len(self.pool.clients)) as executor:
+            futures = [executor.submit(contextvars.copy_context().run, self._embed_request, batch) for batch in batches]
+            return [e for future in futures for e in future.result()]
+
+    def _embed_request(self, texts: List[str]) -> List[Embedding]:
+        def request(client: openai.OpenAI) -> List[Embedding]:
+            response = client.embeddings.create(
+                model="nomic-ai/nomic-embed-text-v1.5",
+                input=texts,
+                dimensions=self.dimensions,
+            )
+            data = sorted(response.data, key=lambda d: d.index)
+            return [Embedding(vector=np.array(d.embedding)) for d in data]
+
+        try:
+            return self.pool.call(request)
+        except Exception as e:
+            raise RuntimeError(
+                "All API keys failed. Please check your API keys and network connection."
+            ) from e
@@ -1,47 +1,94 @@
+import os
+
 from board.board import Board
 
 from console_user_api import ConsoleUserApi
 from entities.sota_table import sota_table_to_markdown
 from expert_set import ExpertSet
 from graphrag import GraphRag
-from llm_models import GeminiJsonGenerator, NomicAIEmbedder, JsonGeneratorInspectionWrapper, GeminiEmbedder
+from llm_models import GeminiJsonGenerator, NomicAIEmbedder, JsonGeneratorInspectionWrapper, RoutingJsonGenerator, DEFAULT_ROUTES, BatchJobJsonGenerator, GeminiBatchBackend, GeminiEmbedder, CachedEmbedder, InstrumentedJsonGenerator, InstrumentedEmbedder, HashingEmbedder, SentenceTransformerEmbedder
 from receptionist_agent import ReceptionistAgent
 from recoverer_agent import RecovererAgent
 from vectorial_db import FaissVecDBFactory
 from rag_repo import RagRepoFactory
-from config import _parse_args
+from config import _parse_args, embedder_name, llm_cache_enabled, llm_batch_enabled, llm_summaries_enabled, telemetry_dir
+from content_store import FileContentStore
+from entities import set_content_store
+from text_processing import ChunkCache, set_chunk_cache
+from telemetry import TelemetryRecorder, get_telemetry, set_telemetry
 from doc_recoverers import *
 
 
-_parse_args()
+if __name__ == "__main__":
+    # Chunking workers are spawned and import this module, the run must not start again in them
+    _parse_args()
+
+    set_content_store(FileContentStore(".sota_cache/contents"))
+    set_chunk_cache(ChunkCache(directory=".sota_cache/chunks"))
+    if telemetry_dir() is not None:
+        set_telemetry(TelemetryRecorder(jsonl_path=os.path.join(telemetry_dir(), "calls.jsonl")))
+
+    # Each call site tags its task, cheap high-volume tasks go to the fast model (see DEFAULT_ROUTES)
+    json_gen = InstrumentedJsonGenerator(RoutingJsonGenerator.from_table(
+        DEFAULT_ROUTES,
+        GeminiJsonGenerator,
+        cache_path=".sota_cache/llm_responses.sqlite" if llm_cache_enabled() else None,
+    ))
+
+    # Summaries and feature backfills need no answer right away, in batch mode they go out as batch jobs
+    # and the requests a job fails are sent interactively
+    batch_json_gen = None
+    if llm_batch_enabled():
+        batch_json_gen = BatchJobJsonGenerator(
+            GeminiBatchBackend("gemini-2.0-flash-lite"),
+            model="gemini-2.0-flash-lite",
+            fallback=json_gen,
+        )
 
-json_gen = GeminiJsonGenerator()
+    # Graph descriptions are joined unless LLM summaries are asked for, then they go out as batch jobs in batch mode
+    summary_json_gen = None
+    if llm_summaries_enabled():
+        summary_json_gen = batch_json_gen or json_gen
 
-embedder = GeminiEmbedder(dimensions=128)
-graph_rag = GraphRag(text_embedder=embedder, json_generator=json_gen,low_consume=False,max_tokens=1800)
-board = Board(json_gen, graph_rag)
-scrappers = [
-    SemanticScholarRecoverer(),
-    ArXivRecoverer()
-]
-recoverer = RecovererAgent(json_gen, graph_rag, scrappers, board.knowledge_graph)
-vector_repo_factory = FaissVecDBFactory(embedder.dim)
-knowledge_repo_fatory = RagRepoFactory(embedder, vector_repo_factory)
+    # Gemini embeddings are Matryoshka embeddings: they are stored at full dimension and retrieval
+    # scans their first `search_dims` dimensions before reranking a shortlist at full dimension
+    search_dims = None
+    if embedder_name() == "hashing":
+        embedder = HashingEmbedder(dimensions=128)
+    elif embedder_name() == "sentence-transformers":
+        embedder = SentenceTransformerEmbedder()
+    else:
+        embedder = CachedEmbedder(GeminiEmbedder(dimensions=768), ".sota_cache/embeddings", model="text-embedding-004")
+        search_dims = 64
+    embedder = InstrumentedEmbedder(embedder)
+    graph_rag = GraphRag(text_embedder=embedder, json_generator=json_gen, small_json_generator=summary_json_gen,low_consume=False,max_tokens=1800, search_dims=search_dims)
+    board = Board(json_gen, graph_rag)
+    scrappers = [
+        SemanticScholarRecoverer(),
+        ArXivRecoverer()
+    ]
+    recoverer = RecovererAgent(json_gen, graph_rag, scrappers, board.knowledge_graph)
+    vector_repo_factory = FaissVecDBFactory(embedder.dim, coarse_dim=search_dims)
+    knowledge_repo_fatory = RagRepoFactory(embedder, vector_repo_factory)
 
-user_querier = ConsoleUserApi()
-receptionist = ReceptionistAgent(json_gen, board, recoverer, user_querier)
+    user_querier = ConsoleUserApi()
+    receptionist = ReceptionistAgent(json_gen, board, recoverer, user_querier)
 
-expert_build_commands = receptionist.interact()
-expert_set = ExpertSet(
-    json_gen,
-    expert_build_commands,
-    recoverer,
-    knowledge_repo_fatory,
-    board,
-    user_querier,
-)
+    expert_build_commands = receptionist.interact()
+    expert_set = ExpertSet(
+        json_gen,
+        expert_build_commands,
+        recoverer,
+        knowledge_repo_fatory,
+        board,
+        user_querier,
+        batch_json_generator=batch_json_gen,
+    )
 
-sota = expert_set.build_sota()
+    sota = expert_set.build_sota()
 
-print(sota_table_to_markdown(sota))
+    print(sota_table_to_markdown(sota))
 
+    if telemetry_dir() is not None:
+        get_telemetry().export_jsonl(os.path.join(telemetry_dir(), "totals.jsonl"))
+        get_telemetry().export_prometheus(os.path.join(telemetry_dir(), "metrics.prom"))
@@ -1,4 +1,5 @@
 from abc import ABC, abstractmethod
+from typing import List
 from entities.embedding import Embedding
 
 class RagRepoTextEmbedder(ABC):
@@ -15,6 +16,19 @@ class RagRepoTextEmbedder(ABC):
         """
         pass
 
+    def embed_batch(self, texts: List[str]) -> List[Embedding]:
+        """
+        Embed several texts, with as few remote calls as the implementation allows.
+        The default implementation embeds the texts one by one.
+
+        Args:
+            texts (List[str]): Input text strings to embed.
+
+        Returns:
+            List[Embedding]: The embedding vectors, in the order of the texts.
+        """
+        return [self.embed(text) for text in texts]
+
     @property
     @abstractmethod
     def dim(self) -> int:
@@ -8,6 +8,13 @@ class VectorialDB(ABC):
     def store(self, vector: np.ndarray) -> int:
         pass
 
+    def store_batch(self, vectors: np.ndarray) -> List[int]:
+        """
+        Store the rows of a matrix of vectors, returning their ids in row order.
+        The default implementation stores the vectors one by one.
+        """
+        return [self.store(vector) for vector in vectors]
+
     @abstractmethod
     def get_closest(self, vector: np.ndarray, k: int) -> List[int]:
         pass
@@ -1,4 +1,5 @@
 from typing import Callable, Generic, List, TypeVar
+import numpy as np
 from expert_set.interfaces import KnowledgeRepository, KnowledgeRepositoryFactory
 from rag_repo.interfaces.vectorial_db import VectorialDBFactory
 from .interfaces import RagRepoTextEmbedder, VectorialDB
@@ -18,6 +19,14 @@ class RagRepo(Generic[T], KnowledgeRepository[T]):
         id = self.vector_db.store(embedding.vector)
         self.docs[id] = document
 
+    def store_documents(self, documents: List[T], get_content: Callable[[T], str]) -> None:
+        if not documents:
+            return
+        embeddings = self.text_embedder.embed_batch([get_content(document) for document in documents])
+        ids = self.vector_db.store_batch(np.vstack([embedding.vector for embedding in embeddings]))
+        for id, document in zip(ids, documents):
+            self.docs[id] = document
+
     def query_knowledge(self, query: str, k: int) -> List[T]:
         vector = self.text_embedder.embed(query).vector
         ids = self.vector_db.get_closest(vector, k)
@@ -1,16 +1,18 @@
 from abc import ABC, abstractmethod
-from typing import Type, TypeVar
+from typing import Optional, Type, TypeVar
 from pydantic import BaseModel
+from entities.llm_task import LlmTask
 
 T = TypeVar("T", bound=BaseModel)
 
 class JsonGenerator(ABC):
     @abstractmethod
-    def generate_json(self, query: str, schema: Type[T]) -> T:
+    def generate_json(self, query: str, schema: Type[T], task: Optional[LlmTask] = None) -> T:
         """
         Send a query to the LLM and get back a JSON response.
         :param query: The input prompt or question.
         :param schema: The Pydantic model class to enforce on the response.
+        :param task: Kind of task of the request, lets routing generators pick a model for it.
         :return: A JSON-compatible Python object (dict, list, etc.)
         """
         pass
@@ -1,5 +1,6 @@
 from typing import List
 from board.board import Board, ThesisKnowledgeModel
+from entities.llm_task import LlmTask
 from expert_set.models.build_expert_model import BuildExpertCommand
 from receptionist_agent.interfaces import JsonGenerator, UserAPI, KnowledgeRecoverer
 from receptionist_agent.models import ThesisAssessmentModel, BuildExpertCommandList
@@ -56,7 +57,7 @@ class ReceptionistAgent:
         prompt = update_thesis_knowledge_prompt(self.board.thesis_knowledge, qa_pairs)
 
         updated_knowledge = self.json_generator.generate_json(
-            prompt, ThesisKnowledgeModel
+            prompt, ThesisKnowledgeModel, task=LlmTask.CONSOLIDATE
         )
         self.board.thesis_knowledge = updated_knowledge
         return updated_knowledge
@@ -69,7 +70,7 @@ class ReceptionistAgent:
             Assessment model with the determination
         """
         prompt = thesis_assessment_prompt(self.board.thesis_knowledge, self.messages)
-        assessment = self.json_generator.generate_json(prompt, ThesisAssessmentModel)
+        assessment = self.json_generator.generate_json(prompt, ThesisAssessmentModel, task=LlmTask.DECIDE)
         return assessment
 
     def _generate_experts_list(self) -> BuildExpertCommandList:
@@ -80,7 +81,7 @@ class ReceptionistAgent:
             Model containing a list of experts
         """
         prompt = experts_list_prompt(self.board.thesis_knowledge)
-        experts_list = self.json_generator.generate_json(prompt, BuildExpertCommandList)
+        experts_list = self.json_generator.generate_json(prompt, BuildExpertCommandList, task=LlmTask.DECIDE)
         return experts_list
 
     def interact(self) -> List[BuildExpertCommand]:
@@ -119,7 +120,7 @@ class ReceptionistAgent:
                 self.board.thesis_knowledge, self.messages
             )
             assessment = self.json_generator.generate_json(
-                assessment_prompt, ThesisAssessmentModel
+                assessment_prompt, ThesisAssessmentModel, task=LlmTask.DECIDE
             )
             if assessment.is_sufficient:
                 done_msg = (
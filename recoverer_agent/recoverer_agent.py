@@ -1,8 +1,9 @@
 from typing import List
-from pydantic import  create_model
+from entities.model_registry import dynamic_model, json_schema
 from concurrent.futures import ThreadPoolExecutor
 
 from entities.document import Document
+from entities.llm_task import LlmTask
 from graphrag.knowledge_graph import KnowledgeGraph
 from graphrag.graphrag import GraphRag
 from recoverer_agent.interfaces.doc_recoverer import DocRecoverer
@@ -32,7 +33,7 @@ class RecovererAgent(ReceptionistKR, ExpertSetKR):
             text_units_strs = [tu.text for tu in relevant_text_units]
 
             prompt = is_necessary_search_prompt(query, text_units_strs)
-            result = self.json_generator.generate_json(prompt, BoolAnswerModel)
+            result = self.json_generator.generate_json(prompt, BoolAnswerModel, task=LlmTask.DECIDE)
             print(f"Iteration for {query} ==================================================================================> {i+1}: {result.answer}")
             print(f"Reasoning: {result.reasoning}")
             if (len(relevant_text_units) > 0):
@@ -51,15 +52,15 @@ class RecovererAgent(ReceptionistKR, ExpertSetKR):
                 for s in scrapper_infos:
                     scrapper_fields[s['name']] = (bool, ...)
                     scrapper_fields[f"{s['name']}_query_to_search"] = (str, None)
-                DynamicScrapperSelectionModel = create_model(
+                DynamicScrapperSelectionModel = dynamic_model(
                     'DynamicScrapperSelectionModel',
                     reasoning=(str, ...),
                     **scrapper_fields
                 )
                 print("DynamicScrapperSelectionModel schema:")
-                print(DynamicScrapperSelectionModel.model_json_schema())
+                print(json_schema(DynamicScrapperSelectionModel))
                 selection_prompt = scrapper_selection_prompt(query, scrapper_infos, DynamicScrapperSelectionModel)
-                selection_result = self.json_generator.generate_json(selection_prompt, DynamicScrapperSelectionModel)
+                selection_result = self.json_generator.generate_json(selection_prompt, DynamicScrapperSelectionModel, task=LlmTask.DECIDE)
 
                 def recover_and_update(s):
                     print(f"Processing scraper: {s.name}")
@@ -0,0 +1,30 @@
+from .rate_limiter import RateLimiter
+from .errors import status_code, retry_after, is_key_error
+from .circuit_breaker import CircuitBreaker, CircuitOpenError, circuit_breaker
+from .retry import RetryPolicy, RetryBudget, RetryState, is_retryable, is_throttling, get_retry_budget, set_retry_budget, provider_retry_policy
+from .adaptive_limiter import AdaptiveConcurrencyLimiter, concurrency_limiter
+from .concurrency_cap import ConcurrencyCap
+from .client_pool import ClientPool, PooledClient
+
+__all__ = [
+    "RateLimiter",
+    "ClientPool",
+    "PooledClient",
+    "status_code",
+    "retry_after",
+    "is_key_error",
+    "CircuitBreaker",
+    "CircuitOpenError",
+    "circuit_breaker",
+    "RetryPolicy",
+    "RetryBudget",
+    "RetryState",
+    "is_retryable",
+    "is_throttling",
+    "get_retry_budget",
+    "set_retry_budget",
+    "provider_retry_policy",
+    "AdaptiveConcurrencyLimiter",
+    "concurrency_limiter",
+    "ConcurrencyCap",
+]
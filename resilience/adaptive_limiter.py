@@ -0,0 +1,136 @@
+import asyncio
+import time
+from threading import Condition, Lock
+from typing import Awaitable, Callable, Dict, Optional, TypeVar
+
+from .retry import is_retryable
+
+R = TypeVar("R")
+
+
+class AdaptiveConcurrencyLimiter:
+    """
+    Gate bounding the requests in flight to an endpoint, with a limit adjusted by AIMD:
+    each request that succeeds adds `1 / limit` (about one more slot per round trip), a request
+    that is throttled or fails with a retryable error (429, 5xx, transport errors) multiplies the
+    limit by `backoff`, at most once per round trip. The limit settles around the endpoint's real
+    capacity instead of a fixed worker count.
+    Latency is deliberately not a signal: one gate serves requests of very different sizes
+    (short and long prompts, embedding batches of 1 to 100 texts), so a slow request is no sign
+    of overload.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        initial_limit: int = 8,
+        min_limit: int = 1,
+        max_limit: int = 128,
+        backoff: float = 0.5,
+    ):
+        """
+        Args:
+            name: Name of the gated endpoint.
+            initial_limit: Requests allowed in flight at first.
+            min_limit: Lower bound of the limit.
+            max_limit: Upper bound of the limit.
+            backoff: Factor applied to the limit on throttling or errors.
+        """
+        self.name = name
+        self.limit = float(initial_limit)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.backoff = backoff
+        self.in_flight = 0
+        # Smoothed latency of the requests, spaces the decreases by about one round trip
+        self.round_trip: Optional[float] = None
+        self._last_decrease = 0.0
+        self._condition = Condition(Lock())
+
+    # Seconds between checks for a free slot while an async request waits
+    _SLOT_POLL = 0.02
+
+    def acquire(self) -> float:
+        """Wait for a slot, returning the start time to pass to `release`."""
+        with self._condition:
+            while self.in_flight >= int(self.limit):
+                self._condition.wait()
+            self.in_flight += 1
+        return time.monotonic()
+
+    async def aacquire(self) -> float:
+        """Asynchronous `acquire`, polling for a slot on the event loop."""
+        while True:
+            with self._condition:
+                if self.in_flight < int(self.limit):
+                    self.in_flight += 1
+                    return time.monotonic()
+            await asyncio.sleep(self._SLOT_POLL)
+
+    def release(self, started: float, error: Optional[BaseException] = None) -> None:
+        """
+        Free a slot and adjust the limit from the request's outcome.
+
+        Args:
+            started: Value returned by `acquire`.
+            error: Exception the request raised, if any.
+        """
+        now = time.monotonic()
+        latency = now - started
+        with self._condition:
+            self.in_flight -= 1
+            if error is not None:
+                # A cancelled request says nothing about the endpoint
+                if isinstance(error, Exception) and is_retryable(error):
+                    self._decrease(now)
+            else:
+                self.round_trip = latency if self.round_trip is None else self.round_trip + 0.1 * (latency - self.round_trip)
+                # Only a limit that is actually used is probed upwards, a few callers must not
+                # inflate it to max_limit before a burst arrives
+                if self.in_flight + 1 >= self.limit / 2:
+                    self.limit = min(self.max_limit, self.limit + 1.0 / self.limit)
+            self._condition.notify_all()
+
+    def call(self, request: Callable[[], R]) -> R:
+        """Run a request within a slot of the gate."""
+        started = self.acquire()
+        try:
+            result = request()
+        except BaseException as e:
+            self.release(started, e)
+            raise
+        self.release(started)
+        return result
+
+    async def acall(self, request: Callable[[], Awaitable[R]]) -> R:
+        """Asynchronous `call`."""
+        started = await self.aacquire()
+        try:
+            result = await request()
+        except BaseException as e:
+            self.release(started, e)
+            raise
+        self.release(started)
+        return result
+
+    def _decrease(self, now: float) -> None:
+        # Throttling usually hits a burst of requests at once, back off once per round trip
+        if now - self._last_decrease < (self.round_trip or 0.0):
+            return
+        self._last_decrease = now
+        self.limit = max(float(self.min_limit), self.limit * self.backoff)
+
+
+_limiters: Dict[str, AdaptiveConcurrencyLimiter] = {}
+_limiters_lock = Lock()
+
+
+def concurrency_limiter(endpoint: str, **kwargs) -> AdaptiveConcurrencyLimiter:
+    """
+    The adaptive concurrency gate shared by every call site of an endpoint, created on first
+    use with the given AdaptiveConcurrencyLimiter arguments.
+    """
+    with _limiters_lock:
+        if endpoint not in _limiters:
+            _limiters[endpoint] = AdaptiveConcurrencyLimiter(endpoint, **kwargs)
+        return _limiters[endpoint]
@@ -0,0 +1,90 @@
+import time
+from threading import Lock
+from typing import Dict
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of sending a request to an endpoint whose circuit is open."""
+
+
+class CircuitBreaker:
+    """
+    Stops sending requests to an endpoint after `failure_threshold` consecutive failures.
+    While open, requests fail immediately with CircuitOpenError. After `reset_timeout` seconds a
+    single probe request is let through (half-open): its success closes the circuit, its failure
+    opens it again.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        """
+        Args:
+            name: Name of the protected endpoint, used in error messages.
+            failure_threshold: Consecutive failures that open the circuit.
+            reset_timeout: Seconds the circuit stays open before a probe request is allowed.
+        """
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = Lock()
+
+    def allow(self) -> bool:
+        """Whether a request may be sent now, reserving the probe when half-open."""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN:
+                if time.monotonic() - self._opened_at < self.reset_timeout:
+                    return False
+                self.state = self.HALF_OPEN
+                self._probing = False
+            if self._probing:
+                return False
+            self._probing = True
+            return True
+
+    def check(self) -> None:
+        """Raise CircuitOpenError if a request may not be sent now."""
+        if not self.allow():
+            raise CircuitOpenError(f"Circuit for {self.name} is open after repeated failures")
+
+    def release_probe(self) -> None:
+        """Give back the probe of a half-open circuit whose request was abandoned, e.g. cancelled."""
+        with self._lock:
+            if self.state == self.HALF_OPEN:
+                self._probing = False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.state = self.CLOSED
+            self._failures = 0
+            self._probing = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self.state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self._opened_at = time.monotonic()
+                self._probing = False
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = Lock()
+
+
+def circuit_breaker(endpoint: str, failure_threshold: int = 5, reset_timeout: float = 30.0) -> CircuitBreaker:
+    """
+    The circuit breaker shared by every client of an endpoint, created on first use.
+    """
+    with _breakers_lock:
+        if endpoint not in _breakers:
+            _breakers[endpoint] = CircuitBreaker(endpoint, failure_threshold, reset_timeout)
+        return _breakers[endpoint]
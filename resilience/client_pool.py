@@ -0,0 +1,249 @@
+import asyncio
+import logging
+import random
+import time
+from contextlib import contextmanager
+from threading import Condition
+from typing import Awaitable, Callable, Generic, Iterator, List, Optional, TypeVar
+
+from .adaptive_limiter import AdaptiveConcurrencyLimiter
+from .errors import is_key_error, retry_after, status_code
+from .retry import RetryPolicy
+
+C = TypeVar("C")
+R = TypeVar("R")
+
+logger = logging.getLogger(__name__)
+
+
+class PooledClient(Generic[C]):
+    """A persistent client for one API key, with its load and health."""
+
+    def __init__(self, key: str, client: C):
+        self.key = key
+        self.client = client
+        self.in_flight = 0
+        self.consecutive_failures = 0
+        self.cooldown_until = 0.0
+        self.requests = 0
+        self.rate_limited = 0
+        # Set once the provider rejected the key itself, it is never leased again
+        self.rejected: Optional[BaseException] = None
+
+    def available(self, now: float) -> bool:
+        return self.rejected is None and now >= self.cooldown_until
+
+
+class ClientPool(Generic[C]):
+    """
+    Keeps one long-lived client per API key and dispatches each request to the healthy key
+    with the fewest requests in flight. Keys answering 429 cool down for the time the provider
+    asks for, keys failing repeatedly cool down with exponential backoff, so throughput scales
+    with the number of keys instead of rotating through them one at a time. A key the provider
+    rejects (invalid, revoked or without access) is ejected and the request goes to another key;
+    only once every key is rejected do calls raise.
+    With `max_in_flight_per_key`, requests wait for a free slot rather than overloading a key.
+    With a `concurrency_limiter`, requests also pass through the endpoint's adaptive gate, which
+    learns from their throttling and errors how many may be in flight across all keys.
+    """
+
+    # Seconds between checks for a free slot while an async request waits
+    _SLOT_POLL = 0.05
+
+    def __init__(
+        self,
+        keys: List[str],
+        make_client: Callable[[str], C],
+        rate_limit_cooldown: float = 30.0,
+        failure_cooldown: float = 1.0,
+        max_failure_cooldown: float = 60.0,
+        max_in_flight_per_key: Optional[int] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+        concurrency_limiter: Optional[AdaptiveConcurrencyLimiter] = None,
+    ):
+        """
+        Args:
+            keys: API keys, empty ones are ignored.
+            make_client: Builds the persistent client of a key.
+            rate_limit_cooldown: Seconds a key rests after a 429 without Retry-After.
+            failure_cooldown: Seconds a key rests after its first consecutive failure, doubled on each further one.
+            max_failure_cooldown: Upper bound for the failure cool-down.
+            max_in_flight_per_key: Maximum concurrent requests per key, None for no limit.
+            retry_policy: Decides whether a failed request is retried on another lease (attempts,
+                deadline, retry budget, circuit breaker). Without it requests are retried up to
+                the `max_attempts` of each call.
+            concurrency_limiter: Adaptive gate shared by every request to the endpoint.
+        """
+        keys = [key for key in keys if key]
+        if not keys:
+            raise ValueError("ClientPool needs at least one API key")
+        self.clients: List[PooledClient[C]] = [PooledClient(key, make_client(key)) for key in keys]
+        self.rate_limit_cooldown = rate_limit_cooldown
+        self.failure_cooldown = failure_cooldown
+        self.max_failure_cooldown = max_failure_cooldown
+        self.max_in_flight_per_key = max_in_flight_per_key
+        self.retry_policy = retry_policy
+        self.concurrency_limiter = concurrency_limiter
+        self._condition = Condition()
+
+    @contextmanager
+    def lease(self) -> Iterator[PooledClient[C]]:
+        """
+        Borrow the least-loaded available client, waiting for a cool-down to end or a slot to free up
+        if every key is resting or busy.
+        """
+        with self._condition:
+            while True:
+                pooled, wait = self._try_lease()
+                if pooled is not None:
+                    break
+                self._condition.wait(wait)
+        try:
+            yield pooled
+        finally:
+            self._release(pooled)
+
+    async def acall(self, request: Callable[[C], Awaitable[R]], max_attempts: Optional[int] = None) -> R:
+        """
+        Asynchronous `call`, for requests sent with the clients' async APIs.
+        Waiting for a cool-down happens on the event loop instead of blocking a thread.
+        """
+        state = self.retry_policy.start() if self.retry_policy is not None else None
+        attempt = 0
+        while True:
+            attempt += 1
+            if state is not None:
+                await state.abefore_attempt()
+            while True:
+                with self._condition:
+                    pooled, wait = self._try_lease()
+                if pooled is not None:
+                    break
+                # A slot freed by another request is only noticed by polling on the event loop
+                await asyncio.sleep(min(wait, self._SLOT_POLL) if wait is not None else self._SLOT_POLL)
+            try:
+                result = await self._asend(request, pooled)
+            except Exception as e:
+                self._failed(pooled, e, state, attempt, max_attempts)
+                continue
+            except BaseException:
+                if state is not None:
+                    state.abandoned()
+                raise
+            else:
+                self.report_success(pooled)
+                if state is not None:
+                    state.succeeded()
+                return result
+            finally:
+                self._release(pooled)
+
+    def _try_lease(self):
+        # Takes the least-loaded available client with a free slot, otherwise returns how long until
+        # a cool-down ends, None when only a released slot can help. Raises once every key is rejected
+        if all(c.rejected is not None for c in self.clients):
+            raise self.clients[-1].rejected
+        now = time.monotonic()
+        resting = [c for c in self.clients if c.rejected is None and not c.available(now)]
+        available = [c for c in self.clients if c.available(now) and self._has_slot(c)]
+        if not available:
+            wait = min(c.cooldown_until for c in resting) - now if resting else None
+            return None, wait
+        pooled = min(available, key=lambda c: (c.in_flight, c.consecutive_failures))
+        pooled.in_flight += 1
+        pooled.requests += 1
+        return pooled, 0.0
+
+    def _has_slot(self, pooled: PooledClient[C]) -> bool:
+        return self.max_in_flight_per_key is None or pooled.in_flight < self.max_in_flight_per_key
+
+    def _release(self, pooled: PooledClient[C]) -> None:
+        with self._condition:
+            pooled.in_flight -= 1
+            self._condition.notify_all()
+
+    def call(self, request: Callable[[C], R], max_attempts: Optional[int] = None) -> R:
+        """
+        Run a request on pooled clients, retrying failures on the healthiest key.
+
+        Args:
+            request: Sends the request with the given client.
+            max_attempts: Number of attempts before the last error is raised, None to retry forever.
+                Ignored when the pool has a retry policy.
+
+        Returns:
+            The result of the first successful attempt.
+        """
+        state = self.retry_policy.start() if self.retry_policy is not None else None
+        attempt = 0
+        while True:
+            attempt += 1
+            if state is not None:
+                state.before_attempt()
+            with self.lease() as pooled:
+                try:
+                    result = self._send(request, pooled)
+                except Exception as e:
+                    self._failed(pooled, e, state, attempt, max_attempts)
+                    continue
+                except BaseException:
+                    if state is not None:
+                        state.abandoned()
+                    raise
+                self.report_success(pooled)
+                if state is not None:
+                    state.succeeded()
+                return result
+
+    def _send(self, request: Callable[[C], R], pooled: PooledClient[C]) -> R:
+        # The gate is passed once a key is leased, so it only times the request itself
+        if self.concurrency_limiter is None:
+            return request(pooled.client)
+        return self.concurrency_limiter.call(lambda: request(pooled.client))
+
+    async def _asend(self, request: Callable[[C], Awaitable[R]], pooled: PooledClient[C]) -> R:
+        if self.concurrency_limiter is None:
+            return await request(pooled.client)
+        return await self.concurrency_limiter.acall(lambda: request(pooled.client))
+
+    def _failed(self, pooled: PooledClient[C], error: Exception, state, attempt: int, max_attempts: Optional[int]) -> None:
+        # Rests the key unless the error is not the key's fault, then raises if the call gives up.
+        # The wait before the next attempt is the key's cool-down, not the policy's backoff.
+        if is_key_error(error):
+            # Says nothing about the endpoint: the attempt is not counted against the call
+            self.reject_key(pooled, error)
+            if state is not None:
+                state.discarded()
+            return
+        if state is None or self.retry_policy.retryable(error):
+            self.report_failure(pooled, error)
+        if state is not None:
+            state.failed(error)
+        elif max_attempts is not None and attempt >= max_attempts:
+            raise error
+
+    def report_success(self, pooled: PooledClient[C]) -> None:
+        with self._condition:
+            pooled.consecutive_failures = 0
+
+    def reject_key(self, pooled: PooledClient[C], error: BaseException) -> None:
+        """Eject a key the provider rejected, waking up the requests waiting for a key."""
+        with self._condition:
+            if pooled.rejected is None:
+                logger.warning("Ejecting API key ...%s: %s", pooled.key[-4:], error)
+            pooled.rejected = error
+            self._condition.notify_all()
+
+    def report_failure(self, pooled: PooledClient[C], error: BaseException) -> None:
+        now = time.monotonic()
+        with self._condition:
+            if status_code(error) == 429:
+                pooled.rate_limited += 1
+                wait = retry_after(error)
+                pooled.cooldown_until = now + (wait if wait is not None else self.rate_limit_cooldown)
+            else:
+                pooled.consecutive_failures += 1
+                wait = min(self.failure_cooldown * 2 ** (pooled.consecutive_failures - 1), self.max_failure_cooldown)
+                # Jitter so that keys failing together do not come back together
+                pooled.cooldown_until = now + random.uniform(wait / 2, wait)
+            self._condition.notify_all()
@@ -0,0 +1,64 @@
+import asyncio
+from threading import Condition, Lock
+from typing import Awaitable, Callable, TypeVar
+
+R = TypeVar("R")
+
+
+class ConcurrencyCap:
+    """
+    Fixed bound on the requests in flight, shared by sync and async callers. Unlike
+    AdaptiveConcurrencyLimiter it never learns from the requests, it is a static quota.
+    """
+
+    # Seconds between checks for a free slot while an async request waits
+    _SLOT_POLL = 0.02
+
+    def __init__(self, name: str, limit: int):
+        """
+        Args:
+            name: Name of what is capped.
+            limit: Requests allowed in flight at once.
+        """
+        if limit < 1:
+            raise ValueError(f"ConcurrencyCap {name} needs a limit of at least 1, got {limit}")
+        self.name = name
+        self.limit = limit
+        self.in_flight = 0
+        self._condition = Condition(Lock())
+
+    def acquire(self) -> None:
+        with self._condition:
+            while self.in_flight >= self.limit:
+                self._condition.wait()
+            self.in_flight += 1
+
+    async def aacquire(self) -> None:
+        """Asynchronous `acquire`, polling for a slot on the event loop."""
+        while True:
+            with self._condition:
+                if self.in_flight < self.limit:
+                    self.in_flight += 1
+                    return
+            await asyncio.sleep(self._SLOT_POLL)
+
+    def release(self) -> None:
+        with self._condition:
+            self.in_flight -= 1
+            self._condition.notify()
+
+    def call(self, request: Callable[[], R]) -> R:
+        """Run a request within a slot."""
+        self.acquire()
+        try:
+            return request()
+        finally:
+            self.release()
+
+    async def acall(self, request: Callable[[], Awaitable[R]]) -> R:
+        """Asynchronous `call`."""
+        await self.aacquire()
+        try:
+            return await request()
+        finally:
+            self.release()
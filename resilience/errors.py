@@ -0,0 +1,38 @@
+from typing import Optional
+
+
+def status_code(error: BaseException) -> Optional[int]:
+    """HTTP status of an error raised by a provider SDK, if it carries one."""
+    for attribute in ("status_code", "code", "status"):
+        value = getattr(error, attribute, None)
+        if isinstance(value, int):
+            return value
+    response = getattr(error, "response", None)
+    value = getattr(response, "status_code", None)
+    return value if isinstance(value, int) else None
+
+
+# Statuses of requests refused because of the API key itself, e.g. revoked or without access
+KEY_ERROR_STATUS = frozenset({401, 403})
+
+
+def is_key_error(error: BaseException) -> bool:
+    """
+    Whether an error rejects the API key rather than the request: a 401 or 403, or a 400 whose
+    message reports an invalid key (Gemini answers API_KEY_INVALID with a 400).
+    """
+    status = status_code(error)
+    if status in KEY_ERROR_STATUS:
+        return True
+    return status == 400 and "API_KEY_INVALID" in str(error)
+
+
+def retry_after(error: BaseException) -> Optional[float]:
+    """Seconds the provider asked to wait, from the Retry-After header of the error's response."""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    try:
+        value = headers.get("Retry-After") or headers.get("retry-after")
+        return float(value) if value is not None else None
+    except (TypeError, ValueError, AttributeError):
+        return None
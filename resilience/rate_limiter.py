@@ -0,0 +1,94 @@
+import asyncio
+import time
+from threading import Condition
+from typing import Optional
+
+
+class _Bucket:
+    """Token bucket refilled continuously at `rate` per second, up to `capacity`."""
+
+    def __init__(self, capacity: float, rate: float):
+        self.capacity = capacity
+        self.rate = rate
+        self.level = capacity
+        self.updated = time.monotonic()
+
+    def refill(self, now: float) -> None:
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float) -> float:
+        # A request bigger than the whole bucket waits for a full bucket and overdraws it
+        missing = min(amount, self.capacity) - self.level
+        return max(0.0, missing / self.rate)
+
+
+class RateLimiter:
+    """
+    Thread-safe token-bucket rate limiter for a provider's requests-per-minute and, optionally,
+    tokens-per-minute limits. Callers block only while the limits are exhausted, so concurrent
+    callers proceed at the full allowed throughput and bursts up to a minute's budget go through.
+    """
+
+    def __init__(self, requests_per_minute: float, tokens_per_minute: Optional[float] = None):
+        """
+        Args:
+            requests_per_minute: Maximum number of requests per minute.
+            tokens_per_minute: Maximum number of tokens per minute, None for no token limit.
+        """
+        self._requests = _Bucket(requests_per_minute, requests_per_minute / 60)
+        self._tokens = _Bucket(tokens_per_minute, tokens_per_minute / 60) if tokens_per_minute else None
+        self._condition = Condition()
+
+    def acquire(self, tokens: int = 0) -> None:
+        """
+        Block until a request of an estimated number of tokens fits in the limits, and take it.
+
+        Args:
+            tokens: Estimated tokens of the request, ignored without a token limit.
+        """
+        with self._condition:
+            while True:
+                wait = self._try_acquire(tokens)
+                if wait <= 0:
+                    return
+                self._condition.wait(wait)
+
+    async def aacquire(self, tokens: int = 0) -> None:
+        """
+        Asynchronous `acquire`, waits on the event loop instead of blocking a thread.
+        """
+        while True:
+            with self._condition:
+                wait = self._try_acquire(tokens)
+            if wait <= 0:
+                return
+            await asyncio.sleep(wait)
+
+    def _try_acquire(self, tokens: int) -> float:
+        # Takes the request if it fits, otherwise returns how long until it may fit
+        now = time.monotonic()
+        self._requests.refill(now)
+        wait = self._requests.wait_time(1)
+        if self._tokens is not None:
+            self._tokens.refill(now)
+            wait = max(wait, self._tokens.wait_time(tokens))
+        if wait <= 0:
+            self._requests.level -= 1
+            if self._tokens is not None:
+                self._tokens.level -= tokens
+        return wait
+
+    def adjust(self, tokens: int) -> None:
+        """
+        Correct the token budget once the actual usage of a request is known.
+
+        Args:
+            tokens: Actual tokens minus the estimate passed to `acquire`, may be negative.
+        """
+        if self._tokens is None or not tokens:
+            return
+        with self._condition:
+            self._tokens.refill(time.monotonic())
+            self._tokens.level = min(self._tokens.capacity, self._tokens.level - tokens)
+            self._condition.notify_all()
@@ -0,0 +1,272 @@
+import asyncio
+import random
+import time
+from collections import deque
+from threading import Lock
+from typing import Awaitable, Callable, Optional, TypeVar
+
+from telemetry import note_retry
+
+from .circuit_breaker import CircuitBreaker, CircuitOpenError, circuit_breaker
+from .errors import retry_after, status_code
+
+R = TypeVar("R")
+
+RETRYABLE_STATUS = frozenset({408, 425, 429, 500, 502, 503, 504})
+
+
+def is_throttling(error: BaseException) -> bool:
+    """Whether an error is the provider asking to slow down: a 429, or any response with Retry-After."""
+    return status_code(error) == 429 or retry_after(error) is not None
+
+
+def is_retryable(error: BaseException) -> bool:
+    """
+    Whether an error is worth retrying: throttling, server errors and transport errors
+    (those without an HTTP status). Client errors and invalid values are not.
+    """
+    status = status_code(error)
+    if status is not None:
+        return status in RETRYABLE_STATUS
+    return not isinstance(error, (ValueError, TypeError, KeyError, AttributeError))
+
+
+class RetryBudget:
+    """
+    Caps retries process-wide to `ratio` of the requests sent in the last `window` seconds, plus
+    `min_per_second` retries per second, so that during an outage clients stop multiplying the
+    load instead of every caller retrying in lockstep.
+    """
+
+    def __init__(self, ratio: float = 0.2, min_per_second: float = 1.0, window: float = 10.0):
+        """
+        Args:
+            ratio: Retries allowed per request sent.
+            min_per_second: Retries always allowed per second, for low traffic.
+            window: Seconds over which requests and retries are counted.
+        """
+        self.ratio = ratio
+        self.min_per_second = min_per_second
+        self.window = window
+        self._requests: deque = deque()
+        self._retries: deque = deque()
+        self._lock = Lock()
+
+    def record_request(self) -> None:
+        with self._lock:
+            self._requests.append(time.monotonic())
+
+    def try_retry(self) -> bool:
+        """Withdraw a retry from the budget, False when it is exhausted."""
+        now = time.monotonic()
+        with self._lock:
+            for events in (self._requests, self._retries):
+                while events and events[0] < now - self.window:
+                    events.popleft()
+            if len(self._retries) >= self.min_per_second * self.window + self.ratio * len(self._requests):
+                return False
+            self._retries.append(now)
+            return True
+
+
+_retry_budget = RetryBudget()
+
+
+def set_retry_budget(budget: RetryBudget) -> None:
+    """Set the budget shared by retry policies that are not given one."""
+    global _retry_budget
+    _retry_budget = budget
+
+
+def get_retry_budget() -> RetryBudget:
+    """
+    :return: The retry budget shared by default across every client
+    """
+    return _retry_budget
+
+
+class RetryState:
+    """Attempts of one call under a RetryPolicy."""
+
+    def __init__(self, policy: "RetryPolicy"):
+        self.policy = policy
+        self.attempt = 0
+        # Attempts the provider throttled, not counted against a patient policy's attempts
+        self.throttled = 0
+        self.started = time.monotonic()
+
+    def before_attempt(self) -> None:
+        """Count an attempt, raise CircuitOpenError if the endpoint's circuit is open."""
+        breaker = self.policy.circuit_breaker
+        if breaker is not None and not breaker.allow():
+            raise CircuitOpenError(f"Circuit for {breaker.name} is open after repeated failures")
+        self.attempt += 1
+        self.policy.budget.record_request()
+
+    async def abefore_attempt(self) -> None:
+        """Asynchronous `before_attempt`."""
+        self.before_attempt()
+
+    def abandoned(self) -> None:
+        """The attempt was given up without an outcome (e.g. cancelled), free the breaker's probe."""
+        if self.policy.circuit_breaker is not None:
+            self.policy.circuit_breaker.release_probe()
+
+    def discarded(self) -> None:
+        """The attempt never reached the endpoint (e.g. its API key was rejected): it is not counted."""
+        self.attempt -= 1
+        self.abandoned()
+
+    def succeeded(self) -> None:
+        if self.policy.circuit_breaker is not None:
+            self.policy.circuit_breaker.record_success()
+
+    def failed(self, error: BaseException) -> float:
+        """
+        Record a failed attempt and return the delay before the next one. Raise `error` when it is
+        not retryable, the attempts or the deadline are exhausted, or the retry budget is spent.
+        A patient policy does not count throttled attempts and waits out a spent budget when
+        throttled, within its deadline.
+        """
+        policy = self.policy
+        retryable = policy.retryable(error)
+        throttled = is_throttling(error)
+        if policy.circuit_breaker is not None:
+            # Throttling is handled by key cool-downs and the concurrency gate, and like an error
+            # that is not worth retrying (e.g. a 400) it shows the endpoint is up
+            if retryable and not throttled:
+                policy.circuit_breaker.record_failure()
+            else:
+                policy.circuit_breaker.record_success()
+        patient = policy.patient and throttled
+        if patient:
+            self.throttled += 1
+        counted = self.attempt - (self.throttled if policy.patient else 0)
+        if not retryable or (policy.max_attempts is not None and not patient and counted >= policy.max_attempts):
+            raise error
+        delay = policy.backoff(self.attempt, error)
+        if policy.deadline is not None and time.monotonic() - self.started + delay > policy.deadline:
+            raise error
+        if not policy.budget.try_retry():
+            if not patient:
+                raise error
+            # Retrying anyway, but as slowly as the policy allows, to shed load
+            delay = max(delay, policy.max_delay)
+        note_retry()
+        return delay
+
+
+class RetryPolicy:
+    """
+    Retries failed requests with capped exponential backoff and jitter, honouring the
+    provider's Retry-After, within a number of attempts, a per-call deadline and the shared
+    retry budget. An optional circuit breaker fails calls fast while its endpoint is down.
+    A patient policy keeps waiting while the provider throttles: throttled attempts do not count
+    against `max_attempts` and a spent retry budget slows them down instead of failing them.
+    The deadline still bounds every call.
+    """
+
+    def __init__(
+        self,
+        max_attempts: Optional[int] = 6,
+        base_delay: float = 1.0,
+        max_delay: float = 60.0,
+        deadline: Optional[float] = 300.0,
+        retryable: Callable[[BaseException], bool] = is_retryable,
+        budget: Optional[RetryBudget] = None,
+        circuit_breaker: Optional[CircuitBreaker] = None,
+        patient: bool = False,
+    ):
+        """
+        Args:
+            max_attempts: Attempts per call, the first one included, None for no limit.
+            base_delay: Backoff before the first retry, doubled on each further one.
+            max_delay: Upper bound of the backoff.
+            deadline: Seconds after which a call stops retrying, None for no deadline.
+            retryable: Whether an error may be retried.
+            budget: Retry budget, defaults to the shared one.
+            circuit_breaker: Breaker of the endpoint the calls go to.
+            patient: Keep retrying throttled attempts within the deadline, see the class docstring.
+        """
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.deadline = deadline
+        self.retryable = retryable
+        self._budget = budget
+        self.circuit_breaker = circuit_breaker
+        self.patient = patient
+
+    @property
+    def budget(self) -> RetryBudget:
+        return self._budget or get_retry_budget()
+
+    def backoff(self, attempt: int, error: Optional[BaseException] = None) -> float:
+        """
+        Delay before retrying after the given failed attempt: the Retry-After the provider sent,
+        otherwise an exponential backoff with equal jitter, so that retries of concurrent callers spread out.
+        """
+        requested = retry_after(error) if error is not None else None
+        if requested is not None:
+            return min(requested, self.max_delay) + random.uniform(0.0, 0.1 * self.base_delay)
+        # The exponent is bounded, throttled attempts of a patient policy are not
+        cap = min(self.max_delay, self.base_delay * 2 ** min(attempt - 1, 32))
+        return cap / 2 + random.uniform(0.0, cap / 2)
+
+    def start(self) -> RetryState:
+        """Start a call whose attempts are driven by the caller, e.g. over a client pool."""
+        return RetryState(self)
+
+    def call(self, request: Callable[[], R]) -> R:
+        """
+        Run a request, retrying it as the policy allows.
+
+        Args:
+            request: Sends the request.
+
+        Returns:
+            The result of the first successful attempt.
+        """
+        state = self.start()
+        while True:
+            state.before_attempt()
+            try:
+                result = request()
+            except Exception as e:
+                time.sleep(state.failed(e))
+                continue
+            except BaseException:
+                state.abandoned()
+                raise
+            state.succeeded()
+            return result
+
+    async def acall(self, request: Callable[[], Awaitable[R]]) -> R:
+        """
+        Asynchronous `call`, waiting between attempts on the event loop.
+        """
+        state = self.start()
+        while True:
+            await state.abefore_attempt()
+            try:
+                result = await request()
+            except Exception as e:
+                await asyncio.sleep(state.failed(e))
+                continue
+            except BaseException:
+                state.abandoned()
+                raise
+            state.succeeded()
+            return result
+
+
+def provider_retry_policy(endpoint: str) -> RetryPolicy:
+    """
+    Default policy of the LLM and embedding clients: patient while the provider throttles, but
+    bounded to 8 failed attempts and 10 minutes per call, behind the endpoint's circuit breaker,
+    so that an outage fails the calls instead of hanging the build.
+
+    Args:
+        endpoint: Name of the endpoint's circuit breaker.
+    """
+    return RetryPolicy(max_attempts=8, deadline=600.0, circuit_breaker=circuit_breaker(endpoint), patient=True)
@@ -0,0 +1,18 @@
+from .recorder import CallRecord, CallStats, TelemetryRecorder, LATENCY_BUCKETS, get_telemetry, set_telemetry
+from .context import CallCounters, instrumented_call, note_retry, note_cache_hits, span, current_span, call_site
+
+__all__ = [
+    "CallRecord",
+    "CallStats",
+    "TelemetryRecorder",
+    "LATENCY_BUCKETS",
+    "get_telemetry",
+    "set_telemetry",
+    "CallCounters",
+    "instrumented_call",
+    "note_retry",
+    "note_cache_hits",
+    "span",
+    "current_span",
+    "call_site",
+]
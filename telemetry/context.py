@@ -0,0 +1,117 @@
+import sys
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from threading import Lock
+from typing import Iterator, Optional
+
+from .recorder import CallRecord, get_telemetry
+
+# Modules whose frames are plumbing between a call site and the provider, never a call site
+_PLUMBING = (
+    "llm_models",
+    "telemetry",
+    "resilience",
+    "concurrent.futures",
+    "threading",
+    "asyncio",
+    "contextlib",
+    "contextvars",
+    "functools",
+)
+
+
+class CallCounters:
+    """Events noted during one instrumented call, by code further down the call (retries, caches)."""
+
+    def __init__(self):
+        self.retries = 0
+        self.cache_hits = 0
+        self._lock = Lock()
+
+    def add(self, retries: int = 0, cache_hits: int = 0) -> None:
+        with self._lock:
+            self.retries += retries
+            self.cache_hits += cache_hits
+
+
+_current_call: ContextVar[Optional[CallCounters]] = ContextVar("telemetry_call", default=None)
+_current_span: ContextVar[Optional[str]] = ContextVar("telemetry_span", default=None)
+
+
+@contextmanager
+def instrumented_call() -> Iterator[CallCounters]:
+    """Counters of the events noted until the block exits, in this context and the ones copied from it."""
+    counters = CallCounters()
+    token = _current_call.set(counters)
+    try:
+        yield counters
+    finally:
+        _current_call.reset(token)
+
+
+def note_retry() -> None:
+    """Count a retry against the instrumented call in progress, if any."""
+    counters = _current_call.get()
+    if counters is not None:
+        counters.add(retries=1)
+
+
+def note_cache_hits(hits: int = 1) -> None:
+    """Count responses served from a cache for the instrumented call in progress, if any."""
+    counters = _current_call.get()
+    if counters is not None and hits:
+        counters.add(cache_hits=hits)
+
+
+def current_span() -> Optional[str]:
+    """
+    :return: Name of the innermost span the code runs in, nested spans joined with "/"
+    """
+    return _current_span.get()
+
+
+@contextmanager
+def span(name: str) -> Iterator[None]:
+    """
+    Time a phase of the code. Its duration is recorded by the telemetry recorder, and the calls
+    made during it are labelled with its name.
+    """
+    parent = _current_span.get()
+    full_name = f"{parent}/{name}" if parent else name
+    token = _current_span.set(full_name)
+    started_at = time.time()
+    started = time.perf_counter()
+    error = None
+    try:
+        yield
+    except BaseException as e:
+        error = type(e).__name__
+        raise
+    finally:
+        _current_span.reset(token)
+        get_telemetry().record(CallRecord(
+            kind="span",
+            caller=call_site(),
+            phase=full_name,
+            started=started_at,
+            latency=time.perf_counter() - started,
+            error=error,
+        ))
+
+
+def call_site() -> str:
+    """
+    :return: "module:function" of the innermost caller outside the LLM and telemetry plumbing,
+        "unknown" when the stack only holds plumbing, e.g. a worker thread running a request
+    """
+    frame = sys._getframe(1)
+    while frame is not None:
+        module = frame.f_globals.get("__name__", "")
+        if not module.startswith(_PLUMBING) and ".interfaces" not in module:
+            code = frame.f_code
+            # Code defined inside a function (lambdas, closures) is attributed to that function
+            function = getattr(code, "co_qualname", code.co_name).split(".<locals>")[0]
+            return f"{module}:{function}"
+        frame = frame.f_back
+    return "unknown"
@@ -0,0 +1,250 @@
+import json
+import os
+from threading import Lock
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+# Upper bounds of the latency histogram buckets, in seconds
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+
+class CallRecord(NamedTuple):
+    """One instrumented call: an LLM request, an embedding request or a timed span."""
+    kind: str
+    """"json", "embedding" or "span"."""
+    caller: str
+    """"module:function" the call was made from."""
+    phase: Optional[str] = None
+    """Span the call was made in."""
+    task: Optional[str] = None
+    model: str = ""
+    started: float = 0.0
+    """Wall-clock start time, in seconds since the epoch."""
+    latency: float = 0.0
+    items: int = 1
+    """Texts of an embedding request, 1 otherwise."""
+    prompt_chars: int = 0
+    response_chars: int = 0
+    prompt_tokens: int = 0
+    response_tokens: int = 0
+    retries: int = 0
+    cache_hits: int = 0
+    error: Optional[str] = None
+    """Type of the exception the call raised."""
+
+
+StatsKey = Tuple[str, str, Optional[str], Optional[str], str]
+
+
+class CallStats:
+    """Totals of the calls of one kind, call site, phase, task and model."""
+
+    FIELDS = ("kind", "caller", "phase", "task", "model")
+
+    def __init__(self, key: StatsKey):
+        self.key = key
+        self.calls = 0
+        self.errors = 0
+        self.items = 0
+        self.latency_total = 0.0
+        self.latency_max = 0.0
+        self.latency_buckets = [0] * len(LATENCY_BUCKETS)
+        self.prompt_chars = 0
+        self.response_chars = 0
+        self.prompt_tokens = 0
+        self.response_tokens = 0
+        self.retries = 0
+        self.cache_hits = 0
+
+    def add(self, record: CallRecord) -> None:
+        self.calls += 1
+        self.errors += record.error is not None
+        self.items += record.items
+        self.latency_total += record.latency
+        self.latency_max = max(self.latency_max, record.latency)
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if record.latency <= bound:
+                self.latency_buckets[i] += 1
+                break
+        self.prompt_chars += record.prompt_chars
+        self.response_chars += record.response_chars
+        self.prompt_tokens += record.prompt_tokens
+        self.response_tokens += record.response_tokens
+        self.retries += record.retries
+        self.cache_hits += record.cache_hits
+
+    def to_dict(self) -> dict:
+        return {
+            **dict(zip(self.FIELDS, self.key)),
+            "calls": self.calls,
+            "errors": self.errors,
+            "items": self.items,
+            "latency_total": round(self.latency_total, 6),
+            "latency_mean": round(self.latency_total / self.calls, 6) if self.calls else 0.0,
+            "latency_max": round(self.latency_max, 6),
+            "prompt_chars": self.prompt_chars,
+            "response_chars": self.response_chars,
+            "prompt_tokens": self.prompt_tokens,
+            "response_tokens": self.response_tokens,
+            "retries": self.retries,
+            "cache_hits": self.cache_hits,
+        }
+
+
+class TelemetryRecorder:
+    """
+    Aggregates call records by kind, call site, phase, task and model, and optionally appends
+    every record to a JSONL file as it comes. The totals can be printed as a report, or
+    exported as JSONL or in the Prometheus text exposition format.
+    """
+
+    def __init__(self, jsonl_path: Optional[str] = None):
+        """
+        Args:
+            jsonl_path: File every call record is appended to, None to only keep the totals.
+        """
+        self.jsonl_path = jsonl_path
+        self._stats: Dict[StatsKey, CallStats] = {}
+        self._lock = Lock()
+        self._file = None
+        if jsonl_path is not None:
+            directory = os.path.dirname(jsonl_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._file = open(jsonl_path, "a", encoding="utf-8", buffering=1)
+
+    def record(self, record: CallRecord) -> None:
+        key = (record.kind, record.caller, record.phase, record.task, record.model)
+        with self._lock:
+            stats = self._stats.get(key)
+            if stats is None:
+                stats = self._stats[key] = CallStats(key)
+            stats.add(record)
+            if self._file is not None:
+                self._file.write(json.dumps(record._asdict(), ensure_ascii=False) + "\n")
+
+    def stats(self) -> List[CallStats]:
+        """
+        :return: Totals of each kind, call site, phase, task and model, by decreasing total latency
+        """
+        with self._lock:
+            stats = list(self._stats.values())
+        return sorted(stats, key=lambda s: -s.latency_total)
+
+    def report(self) -> str:
+        """
+        :return: A table of the totals, LLM and embedding calls first, then the spans
+        """
+        stats = self.stats()
+        if not stats:
+            return "No LLM or embedding calls recorded."
+        header = ("kind", "caller", "phase", "task", "model", "calls", "err", "retries", "cached",
+                  "mean s", "max s", "total s", "tokens in", "tokens out")
+        rows = [header]
+        for s in sorted(stats, key=lambda s: s.key[0] == "span"):
+            kind, caller, phase, task, model = s.key
+            rows.append((
+                kind, caller, phase or "", task or "", model, str(s.calls), str(s.errors), str(s.retries),
+                str(s.cache_hits), f"{s.latency_total / s.calls:.2f}", f"{s.latency_max:.2f}",
+                f"{s.latency_total:.1f}", str(s.prompt_tokens), str(s.response_tokens),
+            ))
+        widths = [max(len(row[i]) for row in rows) for i in range(len(header))]
+        lines = ["  ".join(cell.ljust(width) for cell, width in zip(row, widths)).rstrip() for row in rows]
+        lines.insert(1, "  ".join("-" * width for width in widths))
+        return "\n".join(lines)
+
+    def export_jsonl(self, path: str) -> None:
+        """Write the totals to a JSONL file, one line per kind, call site, phase, task and model."""
+        with open(path, "w", encoding="utf-8") as f:
+            for stats in self.stats():
+                f.write(json.dumps(stats.to_dict(), ensure_ascii=False) + "\n")
+
+    def prometheus_text(self) -> str:
+        """
+        :return: The totals in the Prometheus text exposition format. Spans have metrics of their
+            own: their durations include the calls made within them, which would otherwise be counted twice
+        """
+        all_stats = self.stats()
+        stats = [s for s in all_stats if s.key[0] != "span"]
+        spans = [s for s in all_stats if s.key[0] == "span"]
+        counters = (
+            ("llm_calls_total", "Calls made.", lambda s: s.calls),
+            ("llm_errors_total", "Calls that raised.", lambda s: s.errors),
+            ("llm_items_total", "Texts embedded, or requests made.", lambda s: s.items),
+            ("llm_prompt_tokens_total", "Estimated tokens sent.", lambda s: s.prompt_tokens),
+            ("llm_response_tokens_total", "Estimated tokens received.", lambda s: s.response_tokens),
+            ("llm_retries_total", "Retried attempts.", lambda s: s.retries),
+            ("llm_cache_hits_total", "Responses served from a cache.", lambda s: s.cache_hits),
+        )
+        span_counters = (
+            ("span_calls_total", "Spans entered.", lambda s: s.calls),
+            ("span_errors_total", "Spans left with an exception.", lambda s: s.errors),
+        )
+        lines = []
+        self._counters(lines, counters, stats, CallStats.FIELDS)
+        self._histogram(lines, "llm_latency_seconds", "Latency of the calls.", stats, CallStats.FIELDS)
+        self._counters(lines, span_counters, spans, self._SPAN_FIELDS)
+        self._histogram(lines, "span_duration_seconds", "Duration of the spans.", spans, self._SPAN_FIELDS)
+        return "\n".join(lines) + "\n"
+
+    def export_prometheus(self, path: str) -> None:
+        """Write the totals to a file in the Prometheus text exposition format, e.g. for a textfile collector."""
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(self.prometheus_text())
+
+    def reset(self) -> None:
+        with self._lock:
+            self._stats.clear()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    # Labels of the span metrics, the other fields are the same for every span
+    _SPAN_FIELDS = ("caller", "phase")
+
+    @classmethod
+    def _counters(cls, lines: List[str], counters, stats: List[CallStats], fields) -> None:
+        for name, help_text, value in counters:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} counter")
+            lines.extend(f"{name}{{{cls._labels(s, fields)}}} {value(s)}" for s in stats)
+
+    @classmethod
+    def _histogram(cls, lines: List[str], name: str, help_text: str, stats: List[CallStats], fields) -> None:
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} histogram")
+        for s in stats:
+            labels = cls._labels(s, fields)
+            cumulative = 0
+            for bound, count in zip(LATENCY_BUCKETS, s.latency_buckets):
+                cumulative += count
+                lines.append(f'{name}_bucket{{{labels},le="{bound:g}"}} {cumulative}')
+            lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {s.calls}')
+            lines.append(f"{name}_sum{{{labels}}} {s.latency_total:.6f}")
+            lines.append(f"{name}_count{{{labels}}} {s.calls}")
+
+    @staticmethod
+    def _labels(stats: CallStats, fields=CallStats.FIELDS) -> str:
+        def escape(value: str) -> str:
+            return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+        values = dict(zip(CallStats.FIELDS, stats.key))
+        return ",".join(f'{field}="{escape(values[field] or "")}"' for field in fields)
+
+
+_telemetry = TelemetryRecorder()
+
+
+def set_telemetry(recorder: TelemetryRecorder) -> None:
+    """Set the recorder every instrumented call is recorded by."""
+    global _telemetry
+    _telemetry = recorder
+
+
+def get_telemetry() -> TelemetryRecorder:
+    """
+    :return: The recorder every instrumented call is recorded by, keeping only totals by default
+    """
+    return _telemetry
@@ -4,12 +4,15 @@ from entities.sota_table import sota_table_to_markdown
 from expert_set import ExpertSet
 from expert_set.interfaces import user_querier
 from graphrag import GraphRag
-from llm_models import GeminiJsonGenerator, JsonGeneratorInspectionWrapper, GeminiEmbedder
+from llm_models import GeminiJsonGenerator, JsonGeneratorInspectionWrapper, CachedJsonGenerator, GeminiEmbedder, CachedEmbedder, HashingEmbedder, SentenceTransformerEmbedder
 from receptionist_agent import ReceptionistAgent
 from recoverer_agent import RecovererAgent
 from vectorial_db import FaissVecDBFactory
 from rag_repo import RagRepoFactory
-from config import _parse_args
+from config import _parse_args, embedder_name, llm_cache_enabled
+from content_store import FileContentStore
+from entities import set_content_store
+from text_processing import ChunkCache, set_chunk_cache
 from doc_recoverers import *
 from console_user_api import ConsoleUserApi
 from mocks import RecovererAgentMock, ReceptionistAgentMock
@@ -21,50 +24,62 @@ from mocks.user_agent.user_agent_configs import (
 
 )
 
-_parse_args()
+if __name__ == "__main__":
+    # Chunking workers are spawned and import this module, the run must not start again in them
+    _parse_args()
 
-json_gen = GeminiJsonGenerator()
-json_gen = JsonGeneratorInspectionWrapper(json_gen)
+    set_content_store(FileContentStore(".sota_cache/contents"))
+    set_chunk_cache(ChunkCache(directory=".sota_cache/chunks"))
 
-embedder = GeminiEmbedder()
+    json_gen = GeminiJsonGenerator()
+    if llm_cache_enabled():
+        json_gen = CachedJsonGenerator(json_gen, ".sota_cache/llm_responses.sqlite")
+    json_gen = JsonGeneratorInspectionWrapper(json_gen)
 
-graph_rag = GraphRag(embedder, json_gen, json_gen)
-board = Board(json_gen, graph_rag)
-scrappers = [
-    SemanticScholarRecoverer(),
-    ArXivRecoverer(),
-    PubMedRecoverer(),
-    DOIRecoverer(),
-]
-# recoverer = RecovererAgent(json_gen, graph_rag, scrappers, board.knowledge_graph)
-recoverer = RecovererAgentMock()
+    if embedder_name() == "hashing":
+        embedder = HashingEmbedder()
+    elif embedder_name() == "sentence-transformers":
+        embedder = SentenceTransformerEmbedder()
+    else:
+        embedder = CachedEmbedder(GeminiEmbedder(), ".sota_cache/embeddings", model="text-embedding-004")
 
-researcher_config = UNSURE_CANCER_RESEARCHER
-# researcher_config = VAGUE_AI_RESEARCHER
-# researcher_config = DIRECT_CS_STUDENT
+    graph_rag = GraphRag(embedder, json_gen, json_gen)
+    board = Board(json_gen, graph_rag)
+    scrappers = [
+        SemanticScholarRecoverer(),
+        ArXivRecoverer(),
+        PubMedRecoverer(),
+        DOIRecoverer(),
+    ]
+    # recoverer = RecovererAgent(json_gen, graph_rag, scrappers, board.knowledge_graph)
+    recoverer = RecovererAgentMock()
 
-# user_querier = UserAgent(
-#     researcher_config.paper_description,
-#     researcher_config.personality_description,
-#     json_gen,
-# )
-user_querier = ConsoleUserApi()
-vector_repo_factory = FaissVecDBFactory(embedder.dim)
-knowledge_repo_fatory = RagRepoFactory(embedder, vector_repo_factory)
+    researcher_config = UNSURE_CANCER_RESEARCHER
+    # researcher_config = VAGUE_AI_RESEARCHER
+    # researcher_config = DIRECT_CS_STUDENT
 
-# receptionist = ReceptionistAgent(json_gen, board, recoverer, user_querier)
-receptionist = ReceptionistAgentMock()
+    # user_querier = UserAgent(
+    #     researcher_config.paper_description,
+    #     researcher_config.personality_description,
+    #     json_gen,
+    # )
+    user_querier = ConsoleUserApi()
+    vector_repo_factory = FaissVecDBFactory(embedder.dim)
+    knowledge_repo_fatory = RagRepoFactory(embedder, vector_repo_factory)
 
-expert_build_commands = receptionist.interact()
-expert_set = ExpertSet(
-    json_gen,
-    expert_build_commands,
-    recoverer,
-    knowledge_repo_fatory,
-    board,
-    user_querier,
-)
+    # receptionist = ReceptionistAgent(json_gen, board, recoverer, user_querier)
+    receptionist = ReceptionistAgentMock()
+
+    expert_build_commands = receptionist.interact()
+    expert_set = ExpertSet(
+        json_gen,
+        expert_build_commands,
+        recoverer,
+        knowledge_repo_fatory,
+        board,
+        user_querier,
+    )
 
-sota = expert_set.build_sota()
+    sota = expert_set.build_sota()
 
-print(sota_table_to_markdown(sota))
+    print(sota_table_to_markdown(sota))
@@ -0,0 +1,26 @@
+from .spacy_provider import NlpPipeline, get_nlp, pipeline_name
+from .chunk_cache import ChunkCache, ChunkKey, get_chunk_cache, set_chunk_cache
+from .token_counter import (
+    TokenCounter,
+    TiktokenCounter,
+    ApproximateTokenCounter,
+    get_token_counter,
+    set_token_counter,
+    count_tokens,
+)
+
+__all__ = [
+    "NlpPipeline",
+    "get_nlp",
+    "pipeline_name",
+    "ChunkCache",
+    "ChunkKey",
+    "get_chunk_cache",
+    "set_chunk_cache",
+    "TokenCounter",
+    "TiktokenCounter",
+    "ApproximateTokenCounter",
+    "get_token_counter",
+    "set_token_counter",
+    "count_tokens"
+]
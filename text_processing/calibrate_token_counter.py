@@ -0,0 +1,66 @@
+"""
+Calibration of ApproximateTokenCounter against the tokenizers of the models the pipeline calls,
+which are only reachable through the providers' APIs: Gemini's count_tokens endpoint, and the
+prompt token usage Fireworks reports for a Llama completion of a single token.
+
+Usage: python -m text_processing.calibrate_token_counter [path/to/contents] [samples]
+The sample texts are cut from the documents of a FileContentStore directory, by default the one
+main.py fills (.sota_cache/contents). Prints the (chars_per_token, scale) of each model family,
+to be copied into ApproximateTokenCounter.CALIBRATIONS.
+"""
+import glob
+import os
+import random
+import sys
+from typing import Callable, List
+
+from dotenv import load_dotenv
+from google import genai
+from openai import OpenAI
+
+from text_processing.token_counter import ApproximateTokenCounter
+
+# Characters per sample, about the size of a chunk of the budget main.py uses
+SAMPLE_CHARS = 6000
+GEMINI_MODEL = "gemini-2.0-flash-lite"
+LLAMA_MODEL = "accounts/fireworks/models/llama4-scout-instruct-basic"
+
+
+def load_samples(directory: str, samples: int) -> List[str]:
+    texts = []
+    for path in glob.glob(os.path.join(directory, "**", "*.txt"), recursive=True):
+        with open(path, "r", encoding="utf-8") as f:
+            content = f.read()
+        texts.extend(content[start:start + SAMPLE_CHARS] for start in range(0, len(content) - SAMPLE_CHARS + 1, SAMPLE_CHARS))
+    random.Random(0).shuffle(texts)
+    return texts[:samples]
+
+
+def gemini_reference() -> Callable[[str], int]:
+    client = genai.Client(api_key=os.getenv("GEMINI_API_KEY_1"))
+    return lambda text: client.models.count_tokens(model=GEMINI_MODEL, contents=text).total_tokens
+
+
+def llama_reference() -> Callable[[str], int]:
+    client = OpenAI(base_url="https://api.fireworks.ai/inference/v1", api_key=os.getenv("FIREWORKS_API_KEY"))
+
+    def prompt_tokens(text: str) -> int:
+        response = client.chat.completions.create(model=LLAMA_MODEL, messages=[{"role": "user", "content": text}], max_tokens=1)
+        return response.usage.prompt_tokens
+
+    # The chat template adds the same tokens to every prompt
+    overhead = prompt_tokens("")
+    return lambda text: prompt_tokens(text) - overhead
+
+
+if __name__ == "__main__":
+    load_dotenv()
+    directory = sys.argv[1] if len(sys.argv) > 1 else ".sota_cache/contents"
+    samples = load_samples(directory, int(sys.argv[2]) if len(sys.argv) > 2 else 200)
+    if not samples:
+        sys.exit(f"No document of at least {SAMPLE_CHARS} characters in {directory}")
+
+    for family, reference in (("gemini", gemini_reference), ("llama", llama_reference)):
+        chars_per_token, _ = ApproximateTokenCounter.CALIBRATIONS[family]
+        counter = ApproximateTokenCounter(chars_per_token).calibrate(samples, reference())
+        print(f'"{family}": ({counter.chars_per_token:g}, {counter.scale:.2f}),')
@@ -0,0 +1,119 @@
+import json
+import os
+import tempfile
+from collections import OrderedDict
+from threading import Lock
+from typing import Callable, List, NamedTuple, Optional, Sequence, Tuple
+
+from entities.document import Document, content_hash
+
+Span = Tuple[int, ...]
+
+
+class ChunkKey(NamedTuple):
+    """Identifies the chunking of a content: chunk boundaries only depend on these values."""
+    content: str
+    """Content-address of the chunked text."""
+    chunker: str
+    """Name of the chunking algorithm, including its NLP pipeline configuration."""
+    window: int
+    overlap: int
+
+    @classmethod
+    def for_document(cls, document: Document, chunker: str, window: int, overlap: int) -> "ChunkKey":
+        # Content handles of the configured store are content-addressed, so a document
+        # chunked under another id or title still hits the cache
+        return cls(document.content_handle or content_hash(document.content), chunker, window, overlap)
+
+
+class ChunkCache:
+    """
+    Cache of chunk spans (tuples of character offsets and counts), bounded by the number of
+    spans kept in memory and optionally persisted to disk as one JSON file per key.
+    Only offsets are cached; the chunk text is sliced from the document content when needed.
+    """
+
+    def __init__(self, max_spans: int = 1_000_000, directory: Optional[str] = None):
+        """
+        Args:
+            max_spans: Upper bound for the number of spans kept in memory.
+            directory: Directory where the chunkings are persisted, None to keep them only in memory.
+        """
+        self.max_spans = max_spans
+        self.directory = directory
+        self._cache: "OrderedDict[ChunkKey, List[Span]]" = OrderedDict()
+        self._cached_spans = 0
+        self._lock = Lock()
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def get(self, key: ChunkKey) -> Optional[List[Span]]:
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return self._cache[key]
+
+        if not self.directory:
+            return None
+        path = self._path(key)
+        if not os.path.exists(path):
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            spans = [tuple(span) for span in json.load(f)]
+        self._remember(key, spans)
+        return spans
+
+    def put(self, key: ChunkKey, spans: Sequence[Span]) -> None:
+        spans = [tuple(span) for span in spans]
+        self._remember(key, spans)
+        if self.directory:
+            path = self._path(key)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Write to a temporary file first so readers never see a partial chunking
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(spans, f)
+            os.replace(tmp_path, path)
+
+    def get_or_compute(self, key: ChunkKey, compute: Callable[[], Sequence[Span]]) -> List[Span]:
+        """
+        Cached spans for the key, computing and storing them on a miss.
+        """
+        spans = self.get(key)
+        if spans is None:
+            spans = [tuple(span) for span in compute()]
+            self.put(key, spans)
+        return spans
+
+    def _remember(self, key: ChunkKey, spans: List[Span]) -> None:
+        size = max(len(spans), 1)
+        if size > self.max_spans:
+            return
+        with self._lock:
+            if key in self._cache:
+                return
+            self._cache[key] = spans
+            self._cached_spans += size
+            while self._cached_spans > self.max_spans:
+                _, evicted = self._cache.popitem(last=False)
+                self._cached_spans -= max(len(evicted), 1)
+
+    def _path(self, key: ChunkKey) -> str:
+        name = content_hash(json.dumps(list(key)))
+        return os.path.join(self.directory, name[:2], name[2:] + ".json")
+
+
+_chunk_cache = ChunkCache()
+
+
+def set_chunk_cache(cache: ChunkCache) -> None:
+    """Set the cache shared by every chunker."""
+    global _chunk_cache
+    _chunk_cache = cache
+
+
+def get_chunk_cache() -> ChunkCache:
+    """
+    :return: The cache currently shared by every chunker
+    """
+    return _chunk_cache
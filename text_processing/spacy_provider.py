@@ -0,0 +1,72 @@
+from enum import Enum
+from threading import Lock
+from typing import Dict, Optional, Tuple
+
+import config
+
+SPACY_MODEL = "en_core_web_sm"
+
+# Every trained component of the model, each pipeline excludes the ones it does not need
+_MODEL_COMPONENTS = ["tok2vec", "tagger", "parser", "senter", "attribute_ruler", "lemmatizer", "ner"]
+
+
+class NlpPipeline(str, Enum):
+    """Pipeline configurations handed out by `get_nlp`."""
+
+    SENTENCES = "sentences"
+    """Tokenization and sentence boundaries."""
+
+    TOKENS = "tokens"
+    """Tokenization only."""
+
+
+_pipelines: Dict[Tuple[NlpPipeline, bool], "spacy.Language"] = {}
+_lock = Lock()
+
+
+def get_nlp(pipeline: NlpPipeline = NlpPipeline.SENTENCES, fast: Optional[bool] = None) -> "spacy.Language":
+    """
+    Shared spaCy pipeline, loaded on first use and cached per configuration.
+
+    Args:
+        pipeline (NlpPipeline): Components the pipeline must provide.
+        fast (Optional[bool]): Use a blank English pipeline with the rule-based sentencizer
+            instead of the trained model. Defaults to the `--fast-nlp` command line flag.
+
+    Returns:
+        spacy.Language: the pipeline for the configuration.
+    """
+    if fast is None:
+        fast = config.fast_nlp()
+    key = (NlpPipeline(pipeline), fast)
+    with _lock:
+        if key not in _pipelines:
+            _pipelines[key] = _load(*key)
+        return _pipelines[key]
+
+
+def pipeline_name(pipeline: NlpPipeline = NlpPipeline.SENTENCES, fast: Optional[bool] = None) -> str:
+    """
+    Name of the pipeline `get_nlp` returns for a configuration, e.g. to key results that depend on it.
+    """
+    if fast is None:
+        fast = config.fast_nlp()
+    return f"{NlpPipeline(pipeline).value}:{'sentencizer' if fast else SPACY_MODEL}"
+
+
+def _load(pipeline: NlpPipeline, fast: bool) -> "spacy.Language":
+    # spaCy itself is only imported by the first caller that needs a pipeline
+    import spacy
+
+    if fast:
+        nlp = spacy.blank("en")
+        if pipeline == NlpPipeline.SENTENCES:
+            nlp.add_pipe("sentencizer")
+        return nlp
+
+    keep = ["senter"] if pipeline == NlpPipeline.SENTENCES else []
+    nlp = spacy.load(SPACY_MODEL, exclude=[c for c in _MODEL_COMPONENTS if c not in keep])
+    for name in keep:
+        if name in nlp.disabled:
+            nlp.enable_pipe(name)
+    return nlp
@@ -0,0 +1,147 @@
+import math
+import re
+from abc import ABC, abstractmethod
+from threading import Lock
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+
+class TokenCounter(ABC):
+    """Counts tokens the way an LLM tokenizer would, to budget chunks and prompts."""
+
+    @property
+    @abstractmethod
+    def name(self) -> str:
+        """Identifies the counter, e.g. to key results that depend on its counts."""
+        pass
+
+    @abstractmethod
+    def count(self, text: str) -> int:
+        pass
+
+
+class TiktokenCounter(TokenCounter):
+    """
+    Exact counts with a local BPE tokenizer. `tiktoken` is optional and not in requirements.txt:
+    its encodings are OpenAI's, exact for OpenAI models only. For the Gemini and Llama models
+    this pipeline calls they are an approximation like `ApproximateTokenCounter`, so the counter
+    is only used when set explicitly with `set_token_counter`.
+    """
+
+    def __init__(self, encoding: str = "cl100k_base"):
+        import tiktoken
+
+        self.encoding = encoding
+        self._encoding = tiktoken.get_encoding(encoding)
+        self._name = f"tiktoken:{encoding}"
+
+    def __reduce__(self):
+        # The tokenizer itself cannot be pickled, worker processes load it again from its name
+        return type(self), (self.encoding,)
+
+    @property
+    def name(self) -> str:
+        return self._name
+
+    def count(self, text: str) -> int:
+        return len(self._encoding.encode(text, disallowed_special=()))
+
+
+class ApproximateTokenCounter(TokenCounter):
+    """
+    Regex based approximation of BPE token counts: short words are one token, long words
+    split every `chars_per_token` characters, numbers every three digits and every
+    punctuation mark is a token of its own. `scale` corrects the remaining bias against
+    a model's tokenizer, see `for_model` and `calibrate`.
+    """
+
+    _PIECES = re.compile(r"[^\W\d_]+|\d+|[^\w\s]|\n+")
+
+    # (chars_per_token, scale) of each model family, fitted offline on English prose to the
+    # providers' published ratios since their tokenizers are only reachable through their APIs.
+    # Gemini: about 4 characters and 0.6 to 0.8 words per token, the unscaled counter gives 4.0
+    # characters and 0.63 words, the conservative end. Llama: about 0.75 words per token.
+    # Refit against the tokenizers themselves with `python -m text_processing.calibrate_token_counter`.
+    CALIBRATIONS: Dict[str, Tuple[float, float]] = {
+        "gemini": (6.0, 1.0),
+        "llama": (6.0, 0.84),
+    }
+
+    def __init__(self, chars_per_token: float = 6.0, scale: float = 1.0):
+        self.chars_per_token = chars_per_token
+        self.scale = scale
+
+    @classmethod
+    def for_model(cls, model: str) -> "ApproximateTokenCounter":
+        """
+        Counter calibrated for a model, e.g. "gemini-2.0-flash-lite" or "llama4-scout-instruct-basic".
+
+        Args:
+            model: Model name, matched on the families of `CALIBRATIONS`.
+
+        Returns:
+            ApproximateTokenCounter: the family's calibration, Gemini's for unknown models.
+        """
+        family = next((family for family in cls.CALIBRATIONS if family in model.lower()), "gemini")
+        return cls(*cls.CALIBRATIONS[family])
+
+    def calibrate(self, texts: Iterable[str], reference: Callable[[str], int], quantile: float = 0.9) -> "ApproximateTokenCounter":
+        """
+        Counter with this one's `chars_per_token` whose scale undercounts at most `1 - quantile`
+        of the texts against a reference count, e.g. a tokenizer or a provider's token count.
+
+        Args:
+            texts: Sample texts, of about the size of the chunks and prompts being budgeted.
+            reference: Exact token count of a text.
+            quantile: Share of the texts the calibrated counter must not undercount.
+
+        Returns:
+            ApproximateTokenCounter: the calibrated counter.
+        """
+        raw = ApproximateTokenCounter(self.chars_per_token)
+        ratios = sorted(reference(text) / raw.count(text) for text in texts if raw.count(text))
+        if not ratios:
+            return raw
+        return ApproximateTokenCounter(self.chars_per_token, ratios[min(len(ratios) - 1, int(quantile * len(ratios)))])
+
+    @property
+    def name(self) -> str:
+        return f"approximate:{self.chars_per_token:g}:{self.scale:.3f}"
+
+    def count(self, text: str) -> int:
+        total = 0
+        for piece in self._PIECES.findall(text):
+            first = piece[0]
+            if first.isdigit():
+                total += math.ceil(len(piece) / 3)
+            elif first.isalpha():
+                total += math.ceil(len(piece) / self.chars_per_token)
+            else:
+                total += 1
+        return math.ceil(total * self.scale)
+
+
+_token_counter: Optional[TokenCounter] = None
+_lock = Lock()
+
+
+def set_token_counter(counter: TokenCounter) -> None:
+    """Set the counter used for every token budget."""
+    global _token_counter
+    _token_counter = counter
+
+
+def get_token_counter() -> TokenCounter:
+    """
+    :return: The counter used for every token budget, by default the approximation calibrated
+        for the Gemini models the pipeline calls
+    """
+    global _token_counter
+    with _lock:
+        if _token_counter is None:
+            _token_counter = ApproximateTokenCounter.for_model("gemini")
+        return _token_counter
+
+
+def count_tokens(text: str) -> int:
+    """Number of tokens of a text according to the configured counter."""
+    return get_token_counter().count(text)
@@ -1,4 +1,4 @@
-from typing import List
+from typing import List, Optional
 import faiss
 import numpy as np
 
@@ -6,9 +6,20 @@ from rag_repo.interfaces.vectorial_db import VectorialDB, VectorialDBFactory
 
 
 class FaissVectorialDB(VectorialDB):
-    def __init__(self, dim: int):
+    def __init__(self, dim: int, coarse_dim: Optional[int] = None, shortlist_factor: int = 10):
+        """
+        Args:
+            dim: Dimension of the stored vectors.
+            coarse_dim: When set, `get_closest` first searches a second index over the normalized
+                first `coarse_dim` dimensions of the vectors (Matryoshka prefixes) and reranks the
+                `shortlist_factor * k` candidates by exact L2 distance at full dimension.
+            shortlist_factor: Candidates kept by the coarse search, per requested neighbour.
+        """
         self.dim = dim
         self.index = faiss.IndexFlatL2(dim)
+        self.coarse_dim = coarse_dim if coarse_dim and coarse_dim < dim else None
+        self.coarse_index = faiss.IndexFlatIP(self.coarse_dim) if self.coarse_dim else None
+        self.shortlist_factor = shortlist_factor
         self.next_id = 0
 
     def store(self, vector: np.ndarray) -> int:
@@ -16,19 +27,48 @@ class FaissVectorialDB(VectorialDB):
             raise ValueError(f"Expected 1D vector of dimension {self.dim}, got shape {vector.shape}")
         vec_id = self.next_id
         self.next_id += 1
-        self.index.add(np.array([vector]))
+        self._add(np.array([vector]))
         return vec_id
 
+    def store_batch(self, vectors: np.ndarray) -> List[int]:
+        vectors = np.asarray(vectors)
+        if vectors.ndim != 2 or vectors.shape[1] != self.dim:
+            raise ValueError(f"Expected 2D matrix with rows of dimension {self.dim}, got shape {vectors.shape}")
+        first_id = self.next_id
+        self.next_id += len(vectors)
+        self._add(vectors)
+        return list(range(first_id, self.next_id))
+
     def get_closest(self, vector: np.ndarray, k: int) -> List[int]:
         if vector.ndim != 1 or vector.shape[0] != self.dim:
             raise ValueError(f"Expected 1D vector of dimension {self.dim}, got shape {vector.shape}")
-        _, indices = self.index.search(np.array([vector]), k)
-        indices = indices[0].tolist()
-        return [i for i in indices if i != -1]
+        shortlist = k * self.shortlist_factor
+        if self.coarse_index is None or shortlist >= self.next_id:
+            _, indices = self.index.search(np.array([vector]), k)
+            indices = indices[0].tolist()
+            return [i for i in indices if i != -1]
+
+        _, candidates = self.coarse_index.search(self._prefix(np.array([vector])), shortlist)
+        candidates = candidates[0][candidates[0] != -1]
+        full = self.index.reconstruct_batch(candidates)
+        distances = np.sum((full - np.asarray(vector, dtype=np.float32)) ** 2, axis=1)
+        return candidates[np.argsort(distances, kind="stable")[:k]].tolist()
+
+    def _add(self, vectors: np.ndarray):
+        vectors = np.asarray(vectors, dtype=np.float32)
+        self.index.add(vectors)
+        if self.coarse_index is not None:
+            self.coarse_index.add(self._prefix(vectors))
+
+    def _prefix(self, vectors: np.ndarray) -> np.ndarray:
+        prefix = np.ascontiguousarray(np.asarray(vectors, dtype=np.float32)[:, :self.coarse_dim])
+        return prefix / (np.linalg.norm(prefix, axis=1, keepdims=True) + 1e-8)
 
 class FaissVecDBFactory(VectorialDBFactory):
-    def __init__(self, dim: int) -> None:
+    def __init__(self, dim: int, coarse_dim: Optional[int] = None, shortlist_factor: int = 10) -> None:
         self.dim = dim
+        self.coarse_dim = coarse_dim
+        self.shortlist_factor = shortlist_factor
 
     def create_vectorial_db(self) -> VectorialDB:
-        return FaissVectorialDB(self.dim)
+        return FaissVectorialDB(self.dim, coarse_dim=self.coarse_dim, shortlist_factor=self.shortlist_factor)